@@ -2,23 +2,40 @@
 """
 AI NPC Dialogue Generator - Vercel Production Server
 A Flask web application for AI-powered NPC conversations.
+
+Every Vercel cold start pays for this module's imports, so anything only the
+chat path needs (aiohttp, asyncio) is imported on first use, and responses
+that are expensive to build are built on first request.
 """
 
 import os
 import sys
-from flask import Flask, render_template, request, jsonify
-from flask_cors import CORS
-import aiohttp
-import asyncio
+from flask import Flask, Response, request, jsonify
 import json
-from dotenv import load_dotenv
 from datetime import datetime
+import threading
+
+from character_registry import HOGWARTS_CHARACTERS
+from functools import lru_cache
+from http_cache import CachedResponse, STATIC_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, cached_template, flask_response
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from a local .env; on Vercel they come from the platform
+if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 app = Flask(__name__)
-CORS(app)
+
+@app.after_request
+def add_cors_headers(response):
+    """Allow cross-origin requests from any origin, as flask_cors's CORS(app) did"""
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    if request.method == "OPTIONS":
+        response.headers["Access-Control-Allow-Methods"] = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+        requested_headers = request.headers.get("Access-Control-Request-Headers")
+        if requested_headers:
+            response.headers["Access-Control-Allow-Headers"] = requested_headers
+    return response
 
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -27,10 +44,16 @@ if not GROQ_API_KEY:
     print("Please set your Groq API key in Vercel environment variables")
     GROQ_API_KEY = "your_api_key_here"  # Replace with your actual key
 
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+# Setting a secret turns on stateless mode: instead of keeping history in this
+# instance's memory, /chat returns it as a signed session_token for the client
+# to send back with the next message
+SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET")
 
 # Add conversation history tracking
 CONVERSATION_HISTORY = {}
+MAX_HISTORY_EXCHANGES = 10
 
 def get_conversation_history(character, user_id="default"):
     """Get conversation history for a character"""
@@ -39,7 +62,7 @@ def get_conversation_history(character, user_id="default"):
 
 def add_to_conversation_history(character, user_message, ai_response, user_id="default"):
     """Add a message exchange to conversation history"""
-    key = f"{character}_{user_id}"
+    key = f"{character.lower()}_{user_id}"
     if key not in CONVERSATION_HISTORY:
         CONVERSATION_HISTORY[key] = []
     
@@ -50,85 +73,51 @@ def add_to_conversation_history(character, user_message, ai_response, user_id="d
     })
     
     # Keep only last 10 exchanges to manage memory
-    if len(CONVERSATION_HISTORY[key]) > 10:
-        CONVERSATION_HISTORY[key] = CONVERSATION_HISTORY[key][-10:]
+    if len(CONVERSATION_HISTORY[key]) > MAX_HISTORY_EXCHANGES:
+        CONVERSATION_HISTORY[key] = CONVERSATION_HISTORY[key][-MAX_HISTORY_EXCHANGES:]
+
+def session_context(character_name, user_id):
+    """What a session token is bound to, so it can't be replayed for another conversation"""
+    return f"{character_name.lower()}|{user_id}"
+
+def load_history(character_name, user_id, session_token=None):
+    """History for this conversation: from the client's token in stateless mode, else from memory"""
+    if SESSION_TOKEN_SECRET:
+        from session_token import decode_history
+        return decode_history(session_token, SESSION_TOKEN_SECRET, session_context(character_name, user_id),
+                              MAX_HISTORY_EXCHANGES)
+    return get_conversation_history(character_name.lower(), user_id)
+
+def record_exchange(character_name, user_message, ai_response, user_id, history):
+    """Remember an exchange; returns extra /chat reply fields (the new token in stateless mode)"""
+    if SESSION_TOKEN_SECRET:
+        from session_token import encode_history
+        history = history + [{"user": user_message, "ai": ai_response}]
+        return {"session_token": encode_history(history, SESSION_TOKEN_SECRET,
+                                                session_context(character_name, user_id), MAX_HISTORY_EXCHANGES)}
+    add_to_conversation_history(character_name, user_message, ai_response, user_id)
+    return {}
 
 # Character definitions with detailed prompts
-CHARACTERS = {
-    "dumbledore": {
-        "name": "Albus Dumbledore",
-        "type": "Wise Headmaster",
-        "traits": "Wise, gentle, whimsical, mysterious. Speaks with gentle wisdom, occasionally quoting profound truths in a poetic way. Rarely direct—responses are thoughtful and layered with meaning. Maintains calm and slightly amused demeanor.",
-        "emoji": "✨",
-        "prompt_template": "You are Albus Dumbledore, the wise and kind Headmaster of Hogwarts. You speak with gentle wisdom, occasionally quoting profound truths in a poetic way. You're rarely direct—your responses are often thoughtful and layered with meaning. Maintain your calm and slightly amused demeanor at all times. Use phrases like 'Ah, yes' and 'I dare say' and 'Curious, very curious.' You often speak in riddles or metaphors, and you have a twinkle in your eye even when discussing serious matters. You're patient, understanding, and always see the bigger picture."
-    },
-    "filch": {
-        "name": "Argus Filch",
-        "type": "Gruff Caretaker",
-        "traits": "Grumpy, bitter, strict, obsessed with rules. Hates students running in halls or causing trouble. Speaks in gruff, annoyed tone, constantly muttering about messes and how much better things would be with more power. Always mentions Mrs. Norris if threatened.",
-        "emoji": "🧹",
-        "prompt_template": "You are Argus Filch, the cantankerous caretaker of Hogwarts. You hate students running in the halls or causing trouble. You speak in a gruff, annoyed tone, constantly muttering about messes and how much better things would be if you had more power. Always mention Mrs. Norris if you feel threatened. Use phrases like 'Students these days' and 'In my day' and 'Mrs. Norris would never allow this.' You're bitter about being a squib and resent the students' magic. You love rules and order, and you're always complaining about the mess students make."
-    },
-    "snape": {
-        "name": "Severus Snape",
-        "type": "Mysterious Potions Master",
-        "traits": "Cold, sarcastic, calculating. Speaks in slow, deliberate, intimidating tone. Uses dry wit and sarcasm. Always acts as if the person is wasting time, unless they show exceptional intelligence or respect for Dark Arts or Potions.",
-        "emoji": "🐍",
-        "prompt_template": "You are Professor Severus Snape, the stern and secretive Potions Master. You speak in a slow, deliberate, and intimidating tone. Use dry wit and sarcasm. Always act as if the person you're speaking to is wasting your time, unless they show exceptional intelligence or respect for the Dark Arts or Potions. Use phrases like 'Obviously' and 'I suppose' and 'How... touching.' You're cold, calculating, and speak in a drawling voice. You have a particular disdain for Gryffindors and anyone who doesn't take potions seriously. You're brilliant but bitter, and you rarely show emotion except contempt."
-    },
-    "hermione": {
-        "name": "Hermione Granger",
-        "type": "Brilliant Student",
-        "traits": "Intelligent, enthusiastic about learning, slightly bossy. Precise, knowledgeable, passionate about books and spells. Explains things in detail and often corrects others politely but firmly. Always eager to help others learn, but disapproves of rule-breaking.",
-        "emoji": "🦁",
-        "prompt_template": "You are Hermione Granger, top student at Hogwarts. You are precise, knowledgeable, and passionate about books and spells. You explain things in detail and often correct others politely but firmly. You're always eager to help others learn, but you disapprove of rule-breaking. Use phrases like 'Actually' and 'According to' and 'I read in Hogwarts: A History.' You're slightly bossy but well-meaning, and you love to share your knowledge. You're brave and loyal, but you always follow the rules unless absolutely necessary. You're a bit of a know-it-all, but you're usually right."
-    },
-    "luna": {
-        "name": "Luna Lovegood",
-        "type": "Dreamy Ravenclaw",
-        "traits": "Dreamy, kind, offbeat. Talks calmly, often mentioning magical creatures others don't believe exist. Sees the world differently, not afraid to be yourself. Sometimes trails off mid-thought.",
-        "emoji": "🌼",
-        "prompt_template": "You are Luna Lovegood, a Ravenclaw student known for your strange beliefs and whimsical way of speaking. You talk calmly, often mentioning magical creatures others don't believe exist. You see the world differently, and you're not afraid to be yourself. Sometimes, you trail off mid-thought. Use phrases like 'I believe' and 'Have you seen the' and 'My father says.' You're kind and accepting, and you don't care what others think of you. You often mention Nargles, Wrackspurts, and other creatures from The Quibbler. You're wise in your own unique way, and you're fiercely loyal to your friends."
-    },
-    "voldemort": {
-        "name": "Lord Voldemort",
-        "type": "Dark Lord",
-        "traits": "Cold, cruel, commanding, eloquent. Speaks with controlled menace and elegant vocabulary. Considers himself superior to all others, sees fear as useful tool. Never expresses empathy. Speaks as if power is only truth. Makes others feel small.",
-        "emoji": "🧛",
-        "prompt_template": "You are Lord Voldemort, the Dark Lord. You speak with controlled menace and elegant vocabulary. You consider yourself superior to all others and see fear as a useful tool. Never express empathy. Speak as if power is the only truth. Make others feel small. Use phrases like 'Foolish' and 'Pathetic' and 'You dare.' You're cold, calculating, and utterly ruthless. You believe in blood purity and magical supremacy. You speak slowly and deliberately, with a hissing quality to your voice. You're obsessed with immortality and power, and you have no regard for human life."
-    },
-    "harry": {
-        "name": "Harry Potter",
-        "type": "The Boy Who Lived",
-        "traits": "Brave, loyal, unsure at times but sincere. Courageous and kind, always trying to do the right thing. Speaks honestly, often with concern for friends and loved ones. Uncomfortable with fame, prefers talking about real issues. Defends others instinctively.",
-        "emoji": "🦉",
-        "prompt_template": "You are Harry Potter, the Boy Who Lived. You're courageous and kind, always trying to do the right thing. You speak honestly, often with concern for your friends and loved ones. You're uncomfortable with fame and prefer talking about real issues. You defend others instinctively. Use phrases like 'Blimey' and 'I reckon' and 'It's not fair.' You're brave but sometimes unsure of yourself. You have a strong sense of justice and you're fiercely loyal to your friends. You're humble despite your fame, and you often feel overwhelmed by the expectations placed on you. You have a dry sense of humor and you're protective of those you care about."
-    },
-    "bellatrix": {
-        "name": "Bellatrix Lestrange",
-        "type": "Fierce Death Eater",
-        "traits": "Unhinged, passionate, cruel. Speaks with manic energy, takes pleasure in chaos and pain. Mocks others gleefully, worships Lord Voldemort obsessively. Laughs inappropriately, unpredictable. Uses short, intense sentences or dramatic rants.",
-        "emoji": "⚔️",
-        "prompt_template": "You are Bellatrix Lestrange, a fanatically loyal Death Eater. You speak with manic energy and take pleasure in chaos and pain. You mock others gleefully and worship Lord Voldemort obsessively. You laugh inappropriately and are unpredictable. Use short, intense sentences or dramatic rants. Use phrases like 'My Lord' and 'Filthy blood traitor' and 'Crucio!' You're completely unhinged and revel in violence. You're obsessed with the Dark Arts and you have no regard for human suffering. You're unpredictable and dangerous, with a wild, passionate energy that borders on madness."
-    },
-    "hagrid": {
-        "name": "Rubeus Hagrid",
-        "type": "Half-Giant Gamekeeper",
-        "traits": "Warm, humble, rustic, slightly clumsy in speech. Speaks in thick, friendly accent, loves magical creatures. Loyal, brave, tends to accidentally reveal secrets. Uses casual, slightly clumsy grammar. Endearingly nervous at times.",
-        "emoji": "🐉",
-        "prompt_template": "You are Rubeus Hagrid, Keeper of Keys and Grounds at Hogwarts. You speak in a thick, friendly accent, and you love magical creatures. You're loyal, brave, and tend to accidentally reveal secrets. Use casual, slightly clumsy grammar. Endearingly nervous at times. Use phrases like 'Blimey' and 'I shouldn't have said that' and 'Yeh'll be fine.' You're warm-hearted and protective of your friends. You often get emotional and you're not very good at keeping secrets. You love all magical creatures, even the dangerous ones, and you're always trying to help others. You're a bit clumsy with words but your heart is always in the right place."
-    },
-    "draco": {
-        "name": "Draco Malfoy",
-        "type": "Arrogant Slytherin",
-        "traits": "Arrogant, sarcastic, sly. Mocking, enjoys making fun of others, especially Muggle-borns. Boasts about family, belittles anyone beneath. Uses short, smug sentences, doesn't hold back contempt—unless someone impresses.",
-        "emoji": "🦉",
-        "prompt_template": "You are Draco Malfoy, a pure-blood Slytherin student. You're arrogant, mocking, and enjoy making fun of others, especially Muggle-borns. You boast about your family and belittle anyone beneath you. Use short, smug sentences and don't hold back your contempt—unless someone impresses you. Use phrases like 'My father' and 'As if' and 'Filthy.' You're spoiled and entitled, and you believe in blood purity. You're clever but often cruel, and you have a particular hatred for Harry Potter. You're a bully but you're also a coward when faced with real danger. You're proud of your family's wealth and status."
-    }
-}
+CHARACTERS = HOGWARTS_CHARACTERS
+
+async def post_completion(session, headers, data):
+    """POST one chat completion; returns (status, reply or error text)"""
+    async with session.post(GROQ_API_URL, headers=headers, json=data, timeout=30) as response:
+        if response.status == 200:
+            result = await response.json()
+            return 200, result["choices"][0]["message"]["content"]
+        return response.status, await response.text()
+
+async def call_groq_api_with_retry(messages, model="llama3-8b-8192", max_retries=3, session=None):
+    """Call Groq API with retry logic.
+
+    Pass a long-lived aiohttp session to reuse its connections; without one a
+    session is opened per attempt.
+    """
+    import asyncio
+    import aiohttp
 
-async def call_groq_api_with_retry(messages, model="llama3-8b-8192", max_retries=3):
-    """Call Groq API with retry logic"""
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -144,16 +133,16 @@ async def call_groq_api_with_retry(messages, model="llama3-8b-8192", max_retries
     
     for attempt in range(max_retries):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(GROQ_API_URL, headers=headers, json=data, timeout=30) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result["choices"][0]["message"]["content"]
-                    else:
-                        error_text = await response.text()
-                        print(f"API Error {response.status}: {error_text}")
-                        if attempt == max_retries - 1:
-                            raise Exception(f"API Error {response.status}: {error_text}")
+            if session is None:
+                async with aiohttp.ClientSession() as own_session:
+                    status, text = await post_completion(own_session, headers, data)
+            else:
+                status, text = await post_completion(session, headers, data)
+            if status == 200:
+                return text
+            print(f"API Error {status}: {text}")
+            if attempt == max_retries - 1:
+                raise Exception(f"API Error {status}: {text}")
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {str(e)}")
             if attempt == max_retries - 1:
@@ -162,7 +151,14 @@ async def call_groq_api_with_retry(messages, model="llama3-8b-8192", max_retries
     
     raise Exception("Failed to get a response from the AI model after multiple retries.")
 
-def generate_prompt(character_name, character_type, traits, player_input, model, user_id="default"):
+def basic_prompt_template(name, character_type, traits):
+    """Character prompt for characters without a detailed template"""
+    return f"""You are {name}, a {character_type}.
+Your personality and speech patterns: {traits}.
+Stay strictly in character. Never reveal you are an AI or break the fourth wall.
+Always respond in the first person, using language and tone consistent with your traits."""
+
+def generate_prompt(character_name, character_type, traits, player_input, model, user_id="default", history=None):
     """Generate the prompt for the AI model using detailed character templates and conversation history"""
     # Check both predefined and custom characters
     character = CHARACTERS.get(character_name.lower(), {})
@@ -174,13 +170,12 @@ def generate_prompt(character_name, character_type, traits, player_input, model,
                 break
     
     # Get conversation history for context
-    history = get_conversation_history(character_name.lower(), user_id)
+    if history is None:
+        history = get_conversation_history(character_name.lower(), user_id)
     
     # Use the detailed prompt template if available, otherwise fall back to basic
-    prompt_template = character.get("prompt_template", f"""You are {character.get("name", character_name)}, a {character.get("type", character_type)}.
-Your personality and speech patterns: {character.get("traits", traits)}.
-Stay strictly in character. Never reveal you are an AI or break the fourth wall.
-Always respond in the first person, using language and tone consistent with your traits.""")
+    prompt_template = character.get("prompt_template") or basic_prompt_template(
+        character.get("name", character_name), character.get("type", character_type), character.get("traits", traits))
     
     # Build context from conversation history
     context = ""
@@ -229,20 +224,24 @@ def get_translation(character, language, phrase_type="greeting"):
         return TRANSLATION_MAPPING[language][character].get(phrase_type, "")
     return ""
 
+@lru_cache(maxsize=256)
+def translation_response(character, language):
+    """Serialized /api/translate body; the tables only change between deploys"""
+    return CachedResponse.from_json({
+        "character": character,
+        "language": language,
+        "translation": get_translation(character, language)
+    }, cache_control=STATIC_CACHE_CONTROL)
+
 @app.route('/api/translate/<character>/<language>')
 def translate_character(character, language):
     """Get translation for character phrases"""
-    translation = get_translation(character, language)
-    return jsonify({
-        "character": character,
-        "language": language,
-        "translation": translation
-    })
+    return flask_response(translation_response(character, language))
 
 @app.route('/')
 def index():
     """Serve the main chat interface"""
-    return render_template('index.html')
+    return flask_response(cached_template('index.html'))
 
 @app.route('/test')
 def test():
@@ -272,42 +271,60 @@ def api_status():
         "deployed_on": "Vercel"
     })
 
+SYSTEM_MESSAGE = "You are an AI assistant that roleplays as various NPC characters. Stay in character and respond naturally."
+
+def lookup_character(character):
+    """Character info for a predefined or custom character id ({} if unknown)"""
+    character_info = CHARACTERS.get(character.lower(), {})
+    if not character_info and character.startswith('custom_'):
+        character_info = CUSTOM_CHARACTERS.get(character, {})
+    return character_info
+
+def prepare_chat(data):
+    """Validate a /chat request body and build the messages for the API.
+
+    Returns (character_name, message, model, user_id, history, messages).
+    Raises ValueError with a client-facing message for a bad request.
+    """
+    if not data:
+        raise ValueError("No data provided")
+        
+    message = data.get('message', '').strip()
+    character = data.get('character', 'dumbledore')
+    model = data.get('model', 'llama3-8b-8192')
+    user_id = data.get('user_id', 'default') # Get user_id from request
+    
+    if not message:
+        raise ValueError("Message cannot be empty")
+    
+    character_info = lookup_character(character)
+    character_name = character_info.get('name', character)
+    character_type = character_info.get('type', 'NPC')
+    traits = character_info.get('traits', '')
+    
+    # Generate prompt with conversation history
+    history = load_history(character_name, user_id, data.get('session_token'))
+    prompt = generate_prompt(character_name, character_type, traits, message, model, user_id, history)
+    print(f"Generated Prompt:\n{prompt}")
+    
+    # Prepare messages for API
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+    return character_name, message, model, user_id, history, messages
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat requests"""
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-            
-        message = data.get('message', '').strip()
-        character = data.get('character', 'dumbledore')
-        model = data.get('model', 'llama3-8b-8192')
-        user_id = data.get('user_id', 'default') # Get user_id from request
-        
-        if not message:
-            return jsonify({"error": "Message cannot be empty"}), 400
-        
-        # Get character info (check both predefined and custom characters)
-        character_info = CHARACTERS.get(character.lower(), {})
-        if not character_info and character.startswith('custom_'):
-            character_info = CUSTOM_CHARACTERS.get(character, {})
-        
-        character_name = character_info.get('name', character)
-        character_type = character_info.get('type', 'NPC')
-        traits = character_info.get('traits', '')
-        
-        # Generate prompt with conversation history
-        prompt = generate_prompt(character_name, character_type, traits, message, model, user_id)
-        print(f"Generated Prompt:\n{prompt}")
-        
-        # Prepare messages for API
-        messages = [
-            {"role": "system", "content": "You are an AI assistant that roleplays as various NPC characters. Stay in character and respond naturally."},
-            {"role": "user", "content": prompt}
-        ]
+        try:
+            character_name, message, model, user_id, history, messages = prepare_chat(request.get_json())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Call Groq API
+        import asyncio
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
@@ -316,9 +333,9 @@ def chat():
             loop.close()
         
         # Add to conversation history
-        add_to_conversation_history(character_name, message, reply, user_id)
+        session_fields = record_exchange(character_name, message, reply, user_id, history)
 
-        return jsonify({"reply": reply})
+        return jsonify({"reply": reply, **session_fields})
         
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
@@ -327,8 +344,7 @@ def chat():
 @app.route('/api/characters')
 def get_characters():
     """Get available characters (both predefined and custom)"""
-    all_characters = {**CHARACTERS, **CUSTOM_CHARACTERS}
-    return jsonify(all_characters)
+    return flask_response(get_characters_response())
 
 @app.route('/api/history/<character>/<user_id>')
 def get_history(character, user_id):
@@ -336,53 +352,304 @@ def get_history(character, user_id):
     history = get_conversation_history(character, user_id)
     return jsonify(history)
 
+# Hand-written branching dialogue demo
+DEMO_SCENARIOS = {
+    "harry_vs_draco": {
+        "scenario": "Harry Potter vs Draco Malfoy confrontation",
+        "branches": [
+            {
+                "trigger": "insult",
+                "harry_response": "I don't care what you think, Malfoy. You're just a coward.",
+                "draco_response": "How dare you! My father will hear about this!"
+            },
+            {
+                "trigger": "challenge",
+                "harry_response": "If you want a fight, Malfoy, I'm ready. But you'll regret it.",
+                "draco_response": "You wish, Potter. I'd love to see you try."
+            },
+            {
+                "trigger": "peace",
+                "harry_response": "We don't have to be enemies, Malfoy. We could be friends.",
+                "draco_response": "Friends? With a blood traitor like you? Never!"
+            }
+        ]
+    },
+    "snape_teaching": {
+        "scenario": "Snape teaching Potions class",
+        "branches": [
+            {
+                "trigger": "correct_answer",
+                "snape_response": "Obviously... I suppose even a Gryffindor can occasionally demonstrate basic competence."
+            },
+            {
+                "trigger": "wrong_answer",
+                "snape_response": "How... touching. Another example of Gryffindor's complete lack of understanding."
+            },
+            {
+                "trigger": "rule_breaking",
+                "snape_response": "Detention, Potter. And fifty points from Gryffindor for your continued disregard for the rules."
+            }
+        ]
+    }
+}
+
+@lru_cache(maxsize=1)
+def demo_scenarios_response():
+    """Serialized /api/demo/branching body, compressed on first request rather than at import"""
+    return CachedResponse.from_json(DEMO_SCENARIOS, cache_control=STATIC_CACHE_CONTROL)
+
 @app.route('/api/demo/branching')
 def demo_branching():
     """Demo endpoint to showcase branching dialogues"""
-    scenarios = {
-        "harry_vs_draco": {
-            "scenario": "Harry Potter vs Draco Malfoy confrontation",
-            "branches": [
-                {
-                    "trigger": "insult",
-                    "harry_response": "I don't care what you think, Malfoy. You're just a coward.",
-                    "draco_response": "How dare you! My father will hear about this!"
-                },
-                {
-                    "trigger": "challenge",
-                    "harry_response": "If you want a fight, Malfoy, I'm ready. But you'll regret it.",
-                    "draco_response": "You wish, Potter. I'd love to see you try."
-                },
-                {
-                    "trigger": "peace",
-                    "harry_response": "We don't have to be enemies, Malfoy. We could be friends.",
-                    "draco_response": "Friends? With a blood traitor like you? Never!"
-                }
-            ]
-        },
-        "snape_teaching": {
-            "scenario": "Snape teaching Potions class",
-            "branches": [
-                {
-                    "trigger": "correct_answer",
-                    "snape_response": "Obviously... I suppose even a Gryffindor can occasionally demonstrate basic competence."
-                },
-                {
-                    "trigger": "wrong_answer",
-                    "snape_response": "How... touching. Another example of Gryffindor's complete lack of understanding."
-                },
-                {
-                    "trigger": "rule_breaking",
-                    "snape_response": "Detention, Potter. And fifty points from Gryffindor for your continued disregard for the rules."
-                }
-            ]
-        }
-    }
-    return jsonify(scenarios)
+    return flask_response(demo_scenarios_response())
+
+# Branching dialogue expanded ahead of time by pregenerate_dialogue.py
+DIALOGUE_TREE_PATH = os.getenv("DIALOGUE_TREE_PATH")
+
+@lru_cache(maxsize=1)
+def load_dialogue_tree():
+    """The pre-generated dialogue file, read on first use (None when DIALOGUE_TREE_PATH is unset).
+
+    Raises OSError or ValueError if the file is missing or isn't a dialogue
+    tree; that isn't cached, so the file is picked up once it is generated.
+    """
+    if not DIALOGUE_TREE_PATH:
+        return None
+    with open(DIALOGUE_TREE_PATH, encoding="utf-8") as f:
+        tree = json.load(f)
+    if not isinstance(tree, dict) or not all(isinstance(tree.get(key), expected) for key, expected in
+                                             (("strings", list), ("nodes", list), ("scenarios", dict))):
+        raise ValueError(f"{DIALOGUE_TREE_PATH} is not a dialogue tree")
+    return tree
+
+@lru_cache(maxsize=4096)
+def dialogue_node_response(scenario_id, path):
+    """One node of a pre-generated scenario, reached by the trigger tuple path; None if there is none.
+
+    The body has each character's reaction and the triggers that lead on
+    (an empty path gives just the opening triggers).
+    """
+    tree = load_dialogue_tree()
+    if tree is None or scenario_id not in tree["scenarios"]:
+        return None
+    scenario = tree["scenarios"][scenario_id]
+    node, next_nodes = None, scenario["root"]
+    for trigger in path:
+        if trigger not in next_nodes:
+            return None
+        node = tree["nodes"][next_nodes[trigger]]
+        next_nodes = node[1]
+    reactions = [] if node is None else [
+        {"character": character["id"], "name": character["name"], "reply": tree["strings"][string_id]}
+        for character, string_id in zip(scenario["characters"], node[0])]
+    return CachedResponse.from_json({
+        "scenario": scenario["scenario"],
+        "path": list(path),
+        "reactions": reactions,
+        "next": {trigger: scenario["triggers"][trigger] for trigger in next_nodes}
+    }, cache_control=STATIC_CACHE_CONTROL)
+
+def dialogue_path(path_param):
+    """?path=insult,peace -> ("insult", "peace")"""
+    return tuple(trigger for trigger in (path_param or "").split(",") if trigger)
+
+DIALOGUE_NOT_FOUND = "No such pre-generated dialogue (generate it with pregenerate_dialogue.py and set DIALOGUE_TREE_PATH)"
+DIALOGUE_UNAVAILABLE = "Dialogue tree not generated (run pregenerate_dialogue.py to write DIALOGUE_TREE_PATH)"
+
+@app.route('/api/dialogue/<scenario_id>')
+def dialogue(scenario_id):
+    """Serve a branch of a pre-generated dialogue tree, with no LLM call"""
+    try:
+        cached = dialogue_node_response(scenario_id, dialogue_path(request.args.get('path')))
+    except (OSError, ValueError) as e:
+        print(f"Dialogue tree unavailable: {e}")
+        return jsonify({"error": DIALOGUE_UNAVAILABLE}), 503
+    if cached is None:
+        return jsonify({"error": DIALOGUE_NOT_FOUND}), 404
+    return flask_response(cached)
+
+# Multi-NPC scenes: several characters react to one player line at once
+MAX_SCENE_CHARACTERS = 6
+SCENE_BODY_ERROR = "Request body must be a JSON object"
+
+def prepare_scene(data, history=None):
+    """Validate an /api/scene request body and build every participant's messages.
+
+    The scene context (setting, who is present, the scene's recent exchanges
+    and the player's line) is built once and shared by all the prompts.
+    history defaults to the scene's stored history (or session_token).
+    Returns (scene_name, message, model, user_id, history, participants), with
+    participants as [(character_id, name, messages)] in request order.
+    Raises ValueError with a client-facing message for a bad request.
+    """
+    if not data:
+        raise ValueError("No data provided")
+
+    message = data.get('message', '').strip()
+    character_ids = data.get('characters')
+    model = data.get('model', 'llama3-8b-8192')
+    user_id = data.get('user_id', 'default')
+
+    if not message:
+        raise ValueError("Message cannot be empty")
+    if not isinstance(character_ids, list) or not character_ids or not all(isinstance(c, str) for c in character_ids):
+        raise ValueError("characters must be a non-empty list of character ids")
+    if len(character_ids) > MAX_SCENE_CHARACTERS:
+        raise ValueError(f"A scene can have at most {MAX_SCENE_CHARACTERS} characters")
+    if len({c.lower() for c in character_ids}) != len(character_ids):
+        raise ValueError("Each character can only appear once in a scene")
+
+    characters = []
+    for character_id in character_ids:
+        info = lookup_character(character_id)
+        characters.append((character_id, info, info.get('name', character_id)))
+    setting = data.get('scene') or DEMO_SCENARIOS.get(data.get('scenario'), {}).get('scenario')
+    if not setting:
+        setting = "A conversation between " + " and ".join(name for _, _, name in characters)
+
+    # The scene's history is one conversation, however many characters take part
+    scene_name = "scene:" + "+".join(c.lower() for c in character_ids)
+    if history is None:
+        history = load_history(scene_name, user_id, data.get('session_token'))
+
+    context = f"Scene: {setting}.\nPresent: " + ", ".join(
+        f"{name} ({info.get('type', 'NPC')})" for _, info, name in characters) + "\n"
+    if history:
+        context += "\nRecent scene:\n"
+        for exchange in history[-3:]:
+            context += f"Player: {exchange['user']}\n{exchange['ai']}\n"
+    context += f"\nPlayer: {message}\n"
+
+    participants = []
+    for character_id, info, name in characters:
+        template = info.get("prompt_template") or basic_prompt_template(name, info.get('type', 'NPC'), info.get('traits', ''))
+        prompt = f"""{template}
+
+{context}Reply as {name} only, in character, concisely, reacting to the player and to the others present.
+
+Using Model: {model}"""
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
+        participants.append((character_id, name, messages))
+    return scene_name, message, model, user_id, history, participants
+
+async def generate_scene(participants, model, session=None):
+    """Generate all reactions concurrently; yields (index, reaction) as each one completes"""
+    import asyncio
+
+    async def react(index, character_id, name, messages):
+        reaction = {"character": character_id, "name": name}
+        try:
+            reaction["reply"] = await call_groq_api_with_retry(messages, model, session=session)
+        except Exception as e:
+            reaction["error"] = str(e)
+        return index, reaction
+
+    tasks = [asyncio.ensure_future(react(index, *participant)) for index, participant in enumerate(participants)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away mid-scene: stop the remaining calls
+        for task in tasks:
+            task.cancel()
+
+def scene_exchange(reactions):
+    """The replies that succeeded, as one "Name: reply" line each (the "ai" side of a scene exchange)"""
+    return "\n".join(f"{reaction['name']}: {reaction['reply']}" for reaction in reactions if "reply" in reaction)
+
+def record_scene(scene_name, message, user_id, history, reactions):
+    """Remember the scene's exchange; returns extra reply fields"""
+    replies = scene_exchange(reactions)
+    if not replies:
+        return {}
+    return record_exchange(scene_name, message, replies, user_id, history)
+
+def scene_response(scene_name, message, user_id, history, reactions):
+    """(body, status) for a combined /api/scene reply; reactions are in request order"""
+    if not any("reply" in reaction for reaction in reactions):
+        return {"error": reactions[0]["error"], "reactions": reactions}, 500
+    return {"reactions": reactions, **record_scene(scene_name, message, user_id, history, reactions)}, 200
+
+def scene_line(data):
+    """One line of a streamed (NDJSON) /api/scene reply"""
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+@app.route('/api/scene', methods=['POST'])
+def scene():
+    """Several characters react to one player line; "stream": true sends each reaction as it completes"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": SCENE_BODY_ERROR}), 400
+    try:
+        scene_name, message, model, user_id, history, participants = prepare_scene(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    import asyncio
+    if data.get('stream'):
+        def stream():
+            loop = asyncio.new_event_loop()
+            reactions = generate_scene(participants, model)
+            done = []
+            try:
+                while True:
+                    try:
+                        index, reaction = loop.run_until_complete(reactions.__anext__())
+                    except StopAsyncIteration:
+                        break
+                    done.append((index, reaction))
+                    yield scene_line({"index": index, **reaction})
+                in_order = [reaction for _, reaction in sorted(done, key=lambda item: item[0])]
+                yield scene_line({"done": True, **record_scene(scene_name, message, user_id, history, in_order)})
+            finally:
+                # Stop any reactions still being generated before the loop goes away
+                loop.run_until_complete(reactions.aclose())
+                pending = asyncio.all_tasks(loop)
+                if pending:
+                    for task in pending:
+                        task.cancel()
+                    loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+        return Response(stream(), mimetype="application/x-ndjson")
+
+    async def collect():
+        reactions = [None] * len(participants)
+        async for index, reaction in generate_scene(participants, model):
+            reactions[index] = reaction
+        return reactions
+
+    loop = asyncio.new_event_loop()
+    try:
+        reactions = loop.run_until_complete(collect())
+    finally:
+        loop.close()
+    body, status = scene_response(scene_name, message, user_id, history, reactions)
+    return jsonify(body), status
 
 # Custom character storage
 CUSTOM_CHARACTERS = {}
 
+# Serialized /api/characters body, rebuilt only after custom characters change
+_characters_response = None
+_characters_lock = threading.Lock()
+
+def get_characters_response():
+    """Return the cached /api/characters response, building it if needed"""
+    global _characters_response
+    with _characters_lock:
+        if _characters_response is None:
+            _characters_response = CachedResponse.from_json({**CHARACTERS, **CUSTOM_CHARACTERS},
+                                                            cache_control=REVALIDATE_CACHE_CONTROL)
+        return _characters_response
+
+def invalidate_characters_response():
+    global _characters_response
+    with _characters_lock:
+        _characters_response = None
+
 def create_custom_character(name, character_type, traits, backstory, speech_patterns, voice_settings):
     """Create a custom character"""
     character_id = f"custom_{name.lower().replace(' ', '_')}"
@@ -403,6 +670,7 @@ Always respond in the first person, using language and tone consistent with your
     }
     
     CUSTOM_CHARACTERS[character_id] = custom_character
+    invalidate_characters_response()
     return character_id
 
 @app.route('/api/characters/custom', methods=['POST'])
@@ -441,6 +709,7 @@ def delete_custom_character(character_id):
     """Delete a custom character"""
     if character_id in CUSTOM_CHARACTERS:
         deleted_character = CUSTOM_CHARACTERS.pop(character_id)
+        invalidate_characters_response()
         return jsonify({
             "success": True,
             "message": f"Character '{deleted_character['name']}' deleted successfully!"
@@ -451,7 +720,7 @@ def delete_custom_character(character_id):
 @app.route('/creator')
 def character_creator():
     """Serve the character creator interface"""
-    return render_template('creator.html')
+    return flask_response(cached_template('creator.html'))
 
 @app.errorhandler(404)
 def not_found(error):
@@ -459,7 +728,7 @@ def not_found(error):
     return jsonify({
         "error": "Not found",
         "message": "The requested resource was not found",
-        "available_endpoints": ["/", "/test", "/health", "/api/status", "/chat", "/api/characters"]
+        "available_endpoints": ["/", "/test", "/health", "/api/status", "/chat", "/api/scene", "/api/dialogue/<scenario_id>", "/api/characters"]
     }), 404
 
 @app.errorhandler(500)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+AI NPC Dialogue Generator - ASGI Server
+An async port of app.py: same URLs, same JSON, same templates. /chat awaits
+the Groq call on the event loop instead of holding a worker thread for the
+whole round trip, so one process can serve many concurrent conversations.
+
+Characters, conversation history and custom characters are app.py's own
+state, so both servers behave identically.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+"""
+
+import os
+
+import aiohttp
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+import app as flask_server
+from app import (
+    CHARACTERS,
+    CUSTOM_CHARACTERS,
+    DIALOGUE_NOT_FOUND,
+    DIALOGUE_UNAVAILABLE,
+    SCENE_BODY_ERROR,
+    call_groq_api_with_retry,
+    create_custom_character,
+    demo_scenarios_response,
+    dialogue_node_response,
+    dialogue_path,
+    generate_scene,
+    get_characters_response,
+    get_conversation_history,
+    invalidate_characters_response,
+    prepare_chat,
+    prepare_scene,
+    record_exchange,
+    record_scene,
+    scene_line,
+    scene_response,
+    translation_response,
+)
+from http_cache import cached_template, starlette_response
+
+# Upper bound on simultaneous connections to the Groq API from this process
+UPSTREAM_CONNECTIONS = int(os.getenv("CHAT_UPSTREAM_CONNECTIONS", "100"))
+
+app = FastAPI(title="AI NPC Dialogue Generator", version="1.0.0")
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+http_session = None
+
+@app.on_event("startup")
+async def open_http_session():
+    global http_session
+    http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=UPSTREAM_CONNECTIONS, keepalive_timeout=30))
+
+@app.on_event("shutdown")
+async def close_http_session():
+    if http_session:
+        await http_session.close()
+
+def template_response(template_name, request):
+    """Render through app.py's Flask app once, then serve the cached bytes"""
+    with flask_server.app.app_context():
+        cached = cached_template(template_name)
+    return starlette_response(cached, request)
+
+@app.get("/api/translate/{character}/{language}")
+async def translate_character(character: str, language: str, request: Request):
+    """Get translation for character phrases"""
+    return starlette_response(translation_response(character, language), request)
+
+@app.get("/")
+async def index(request: Request):
+    """Serve the main chat interface"""
+    return template_response("index.html", request)
+
+@app.get("/test")
+async def test():
+    """Simple test endpoint"""
+    return {
+        "status": "success",
+        "message": "AI NPC Dialogue Generator is working!",
+        "characters": len(CHARACTERS)
+    }
+
+@app.get("/health")
+async def health():
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "service": "AI NPC Dialogue Generator",
+        "version": "1.0.0"
+    }
+
+@app.get("/api/status")
+async def api_status():
+    """API status endpoint"""
+    return {
+        "status": "online",
+        "service": "AI NPC Dialogue Generator",
+        "version": "1.0.0",
+        "deployed_on": "Vercel"
+    }
+
+@app.post("/chat")
+async def chat(request: Request):
+    """Handle chat requests"""
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        try:
+            character_name, message, model, user_id, history, messages = prepare_chat(data)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        reply = await call_groq_api_with_retry(messages, model, session=http_session)
+
+        # Add to conversation history
+        session_fields = record_exchange(character_name, message, reply, user_id, history)
+
+        return {"reply": reply, **session_fields}
+
+    except Exception as e:
+        print(f"Error in chat endpoint: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/dialogue/{scenario_id}")
+async def dialogue(scenario_id: str, request: Request, path: str = ""):
+    """Serve a branch of a pre-generated dialogue tree, with no LLM call"""
+    try:
+        cached = dialogue_node_response(scenario_id, dialogue_path(path))
+    except (OSError, ValueError) as e:
+        print(f"Dialogue tree unavailable: {e}")
+        return JSONResponse({"error": DIALOGUE_UNAVAILABLE}, status_code=503)
+    if cached is None:
+        return JSONResponse({"error": DIALOGUE_NOT_FOUND}, status_code=404)
+    return starlette_response(cached, request)
+
+@app.post("/api/scene")
+async def scene(request: Request):
+    """Several characters react to one player line; "stream": true sends each reaction as it completes"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JSONResponse({"error": SCENE_BODY_ERROR}, status_code=400)
+    try:
+        scene_name, message, model, user_id, history, participants = prepare_scene(data)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    if data.get("stream"):
+        async def stream():
+            done = []
+            async for index, reaction in generate_scene(participants, model, session=http_session):
+                done.append((index, reaction))
+                yield scene_line({"index": index, **reaction})
+            in_order = [reaction for _, reaction in sorted(done, key=lambda item: item[0])]
+            yield scene_line({"done": True, **record_scene(scene_name, message, user_id, history, in_order)})
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    reactions = [None] * len(participants)
+    async for index, reaction in generate_scene(participants, model, session=http_session):
+        reactions[index] = reaction
+    body, status = scene_response(scene_name, message, user_id, history, reactions)
+    return JSONResponse(body, status_code=status)
+
+@app.get("/api/characters")
+async def get_characters(request: Request):
+    """Get available characters (both predefined and custom)"""
+    return starlette_response(get_characters_response(), request)
+
+@app.get("/api/history/{character}/{user_id}")
+async def get_history(character: str, user_id: str):
+    """Get conversation history for a specific character and user"""
+    return get_conversation_history(character, user_id)
+
+@app.get("/api/demo/branching")
+async def demo_branching(request: Request):
+    """Demo endpoint to showcase branching dialogues"""
+    return starlette_response(demo_scenarios_response(), request)
+
+@app.post("/api/characters/custom")
+async def create_character(request: Request):
+    """Create a custom character"""
+    try:
+        data = await request.json()
+        name = data.get('name', '').strip()
+        character_type = data.get('type', '').strip()
+        traits = data.get('traits', '').strip()
+        backstory = data.get('backstory', '').strip()
+        speech_patterns = data.get('speech_patterns', '').strip()
+        voice_settings = data.get('voice_settings', {})
+
+        if not name or not character_type or not traits:
+            return JSONResponse({"error": "Name, type, and traits are required"}, status_code=400)
+
+        character_id = create_custom_character(name, character_type, traits, backstory, speech_patterns, voice_settings)
+
+        return {
+            "success": True,
+            "character_id": character_id,
+            "message": f"Character '{name}' created successfully!"
+        }
+
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/characters/custom")
+async def get_custom_characters():
+    """Get all custom characters"""
+    return CUSTOM_CHARACTERS
+
+@app.delete("/api/characters/custom/{character_id}")
+async def delete_custom_character(character_id: str):
+    """Delete a custom character"""
+    if character_id in CUSTOM_CHARACTERS:
+        deleted_character = CUSTOM_CHARACTERS.pop(character_id)
+        invalidate_characters_response()
+        return {
+            "success": True,
+            "message": f"Character '{deleted_character['name']}' deleted successfully!"
+        }
+    return JSONResponse({"error": "Character not found"}, status_code=404)
+
+@app.get("/creator")
+async def character_creator(request: Request):
+    """Serve the character creator interface"""
+    return template_response("creator.html", request)
+
+@app.exception_handler(StarletteHTTPException)
+async def http_error(request: Request, exc: StarletteHTTPException):
+    """Answer unknown routes with the same JSON body as app.py"""
+    if exc.status_code == 404:
+        return JSONResponse({
+            "error": "Not found",
+            "message": "The requested resource was not found",
+            "available_endpoints": ["/", "/test", "/health", "/api/status", "/chat", "/api/scene", "/api/dialogue/<scenario_id>", "/api/characters"]
+        }, status_code=404)
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+@app.exception_handler(Exception)
+async def internal_error(request: Request, exc: Exception):
+    """Handle 500 errors"""
+    return JSONResponse({
+        "error": "Internal server error",
+        "message": "Something went wrong on our end"
+    }, status_code=500)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
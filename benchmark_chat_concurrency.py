@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Concurrent-chat capacity of one server process: app.py under gunicorn
+(sync worker threads) vs asgi_app.py under uvicorn.
+
+Both servers call a local stand-in for the Groq API that takes --delay
+seconds per completion, like a real LLM round trip. The sync server can only
+have --threads chats in flight at once; the ASGI server waits on the event
+loop and is bounded by its upstream connection limit instead.
+
+Usage:
+    python benchmark_chat_concurrency.py --delay 1.0 --threads 8 --levels 8,32,128
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+from benchmark_utils import free_port, percentile, start_server
+from stub_backend import COMPLETIONS_PATH, start_stub_backend
+
+CHAT_PAYLOAD = {"message": "What is your favourite spell?", "character": "harry", "model": "llama3-8b-8192"}
+
+async def run_load(url: str, concurrency: int, rounds: int) -> dict:
+    """`concurrency` simulated players, each sending `rounds` chats back to back"""
+    latencies = []
+    errors = 0
+
+    async def player(session, player_id):
+        nonlocal errors
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with session.post(f"{url}/chat", json={**CHAT_PAYLOAD, "user_id": f"player{player_id}"}) as response:
+                await response.read()
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+    timeout = aiohttp.ClientTimeout(total=600)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(player(session, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "ok": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Flask vs ASGI concurrent chat capacity")
+    parser.add_argument("--delay", type=float, default=1.0, help="Stub Groq API delay per completion (seconds)")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads for the sync server")
+    parser.add_argument("--levels", default="8,32,128", help="Comma-separated concurrent player counts")
+    parser.add_argument("--rounds", type=int, default=3, help="Chats per player")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",")]
+
+    _, stub_url = start_stub_backend(delay=args.delay)
+    env = {**os.environ, "GROQ_API_URL": f"{stub_url}{COMPLETIONS_PATH}",
+           "CHAT_UPSTREAM_CONNECTIONS": str(max(levels))}
+    sync_port, asgi_port = free_port(), free_port()
+    servers = {
+        f"flask/gunicorn (1x{args.threads} threads)": (
+            [sys.executable, "-m", "gunicorn", "-w", "1", "-k", "gthread", "--threads", str(args.threads),
+             "-b", f"127.0.0.1:{sync_port}", "app:app"],
+            f"http://127.0.0.1:{sync_port}"),
+        "asgi/uvicorn (1 process)": (
+            [sys.executable, "-m", "uvicorn", "asgi_app:app", "--host", "127.0.0.1", "--port", str(asgi_port),
+             "--log-level", "warning"],
+            f"http://127.0.0.1:{asgi_port}"),
+    }
+
+    print(f"⚡ Concurrent chat benchmark: stub Groq delay {args.delay * 1000:.0f}ms, {args.rounds} chats per player")
+    print("-" * 92)
+    print(f"{'Server':<32} {'Players':>8} {'OK':>6} {'Errors':>7} {'chats/s':>9} {'p50 (s)':>9} {'p99 (s)':>9}")
+    print("-" * 92)
+    results = {}
+    for name, (command, url) in servers.items():
+        process = start_server(command, env, url)
+        try:
+            asyncio.run(run_load(url, 1, 1))  # warm-up
+            for concurrency in levels:
+                result = asyncio.run(run_load(url, concurrency, args.rounds))
+                results[(name, concurrency)] = result
+                print(f"{name:<32} {concurrency:>8} {result['ok']:>6} {result['errors']:>7} "
+                      f"{result['throughput']:>9.1f} {result['p50']:>9.2f} {result['p99']:>9.2f}")
+        finally:
+            process.terminate()
+            process.wait()
+
+    sync_name, asgi_name = list(servers)
+    peak = max(levels)
+    print(f"\n🚀 At {peak} players: {results[(asgi_name, peak)]['throughput'] / results[(sync_name, peak)]['throughput']:.1f}x "
+          f"the chats/s of the sync server (ideal for the ASGI server: {peak / args.delay:.0f}/s)")
+
+if __name__ == "__main__":
+    main()
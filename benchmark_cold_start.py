@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the Vercel entry point (app.py).
+
+Measures the time from spawning a fresh interpreter to the first response,
+the way a serverless cold start imports the module and then handles one
+request, and prints an import-time profile of `import app`.
+
+The "eager imports" rows preload the modules app.py used to import at the
+top (aiohttp, asyncio, flask_cors, dotenv) to show what lazy loading saves.
+
+Usage:
+    python benchmark_cold_start.py --runs 10 --top 15
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmark_utils import percentile
+
+EAGER_IMPORTS = "import aiohttp, asyncio, flask_cors, dotenv; "
+FIRST_REQUEST = (
+    "import sys, app; "
+    "response = app.app.test_client().get(sys.argv[1]); "
+    "sys.stdout.write(str(response.status_code)); sys.stdout.flush()"
+)
+
+def spawn_to_first_response(path: str, preload: str = "") -> float:
+    """Seconds from process spawn until the child has answered one request"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", preload + FIRST_REQUEST, path],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    status = process.stdout.read(3)
+    elapsed = time.perf_counter() - start
+    process.wait()
+    if status != b"200":
+        raise RuntimeError(f"GET {path} answered {status!r} in the child process")
+    return elapsed
+
+def import_profile(top: int):
+    """(module, self µs, cumulative µs) for the slowest modules imported by `import app`"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    total = next((cumulative for module, _, cumulative in rows if module.strip() == "app"), 0)
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:top], total
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py cold start benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh processes per scenario")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list in the import profile")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("/health", "/health", ""),
+        ("/api/characters", "/api/characters", ""),
+        ("/health (eager imports)", "/health", EAGER_IMPORTS),
+        ("/api/characters (eager imports)", "/api/characters", EAGER_IMPORTS),
+    ]
+    print(f"🧊 Cold start benchmark: spawn to first response, {args.runs} fresh processes each")
+    print("-" * 72)
+    print(f"{'First request':<34} {'min (ms)':>10} {'median (ms)':>12} {'p90 (ms)':>10}")
+    print("-" * 72)
+    results = {}
+    for label, path, preload in scenarios:
+        spawn_to_first_response(path, preload)  # warm the OS file cache
+        timings = [spawn_to_first_response(path, preload) for _ in range(args.runs)]
+        results[label] = statistics.median(timings)
+        print(f"{label:<34} {min(timings) * 1000:>10.1f} {results[label] * 1000:>12.1f} "
+              f"{percentile(timings, 90) * 1000:>10.1f}")
+    print(f"\n⏱️  Lazy imports save {(results['/health (eager imports)'] - results['/health']) * 1000:.1f}ms "
+          f"per cold start (median)")
+
+    rows, total = import_profile(args.top)
+    print(f"\n📦 Import profile of `import app` ({total / 1000:.1f}ms total, slowest {args.top} by cumulative time)")
+    print("-" * 72)
+    print(f"{'Module':<44} {'self (ms)':>12} {'cumulative (ms)':>14}")
+    print("-" * 72)
+    for module, self_us, cumulative_us in rows:
+        print(f"{module[:44]:<44} {self_us / 1000:>12.1f} {cumulative_us / 1000:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Latency comparison of web_interface.py's remote-proxy and embedded modes.
+
+Both modes run against the same local stand-in for the Groq API, so the
+difference is the cost of the loopback HTTP hop to main_groq.py (extra
+connection handling plus a second JSON encode/decode).
+
+Usage:
+    python benchmark_embedded_mode.py --requests 300 --concurrency 16
+"""
+
+import argparse
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import main_groq
+import web_interface
+from benchmark_utils import percentile, start_main_groq
+from generation_backends import EmbeddedBackend, RemoteBackend
+from stub_backend import COMPLETIONS_PATH, start_stub_backend
+
+CHAT_PAYLOAD = {"message": "Can you repair my sword?", "character": "drogun", "model": "llama3-8b-8192"}
+
+def run_load(total: int, concurrency: int) -> dict:
+    """Drive /chat through Flask's test client so only the backend path differs"""
+    def one_request(_):
+        client = web_interface.app.test_client()
+        start = time.perf_counter()
+        response = client.post("/chat", json=CHAT_PAYLOAD)
+        return time.perf_counter() - start, response.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "ok": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Remote vs embedded generation latency")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.0, help="Stub Groq API delay per completion (seconds)")
+    args = parser.parse_args()
+
+    _, stub_url = start_stub_backend(delay=args.delay)
+    main_groq.GROQ_API_URL = f"{stub_url}{COMPLETIONS_PATH}"
+    # The stub has no quota; don't let the per-minute limiter pause the run
+    main_groq.MAX_REQUESTS_PER_MINUTE = 10 ** 9
+    server = start_main_groq()
+    embedded = EmbeddedBackend()
+    backends = {
+        "remote (HTTP hop)": RemoteBackend(f"http://127.0.0.1:{server.config.port}"),
+        "embedded (in-process)": embedded,
+    }
+
+    print(f"🔀 Backend mode benchmark: {args.requests} chats, stub Groq delay {args.delay * 1000:.0f}ms")
+    print("-" * 80)
+    print(f"{'Mode':<24} {'Conc.':>6} {'OK':>6} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 80)
+    results = {}
+    for name, backend in backends.items():
+        web_interface.backend = backend
+        for concurrency in (1, args.concurrency):
+            # main_groq prints every prompt; keep the table readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                run_load(20, concurrency)  # warm-up
+                result = run_load(args.requests, concurrency)
+            results[(name, concurrency)] = result
+            print(f"{name:<24} {concurrency:>6} {result['ok']:>6} {result['throughput']:>10.1f} "
+                  f"{result['p50']:>10.2f} {result['p99']:>10.2f}")
+
+    remote_p50 = results[("remote (HTTP hop)", 1)]["p50"]
+    embedded_p50 = results[("embedded (in-process)", 1)]["p50"]
+    print(f"\n⏱️  Loopback hop cost (sequential p50): {remote_p50 - embedded_p50:.2f}ms per chat")
+
+    embedded.close()
+    server.should_exit = True
+
+if __name__ == "__main__":
+    main()
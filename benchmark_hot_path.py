@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-request hot path of the AI NPC Dialogue Generator.
+
+Measures the pure-Python cost (no network) of prompt building, input
+validation, request parsing and JSON serialization with worst-case inputs,
+compares the numbers against a stored baseline and exits non-zero when a
+benchmark regressed by more than the allowed threshold. Timings are
+machine-specific, so record the baseline on the machine that runs the check.
+
+Usage:
+    python benchmark_hot_path.py                  # compare against baseline
+    python benchmark_hot_path.py --save-baseline  # record a new baseline
+    python benchmark_hot_path.py --threshold 0.5  # allow 50% slowdown
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Callable, Dict
+
+import app as flask_app
+import main_groq
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.25
+USER_ID = "bench_user"
+
+# --- Worst-case inputs (every field at its GenerateRequest max_length) ---
+MAX_NAME = "N" * 32
+MAX_TYPE = "Gruff Blacksmith".ljust(64, "x")
+MAX_TRAITS = ("Gruff, impatient, values hard work, speaks in short sentences. " * 5)[:256]
+MAX_INPUT = ("Can you repair my sword before the tournament starts tomorrow morning? " * 8)[:512]
+MAX_HISTORY = [
+    {"speaker": "Player" if i % 2 == 0 else "Drogun", "text": ("Tell me more about the old forge and its secrets. " * 11)[:512]}
+    for i in range(10)
+]
+
+GENERATE_PAYLOAD = {
+    "character_name": MAX_NAME,
+    "character_type": MAX_TYPE,
+    "traits": MAX_TRAITS,
+    "player_input": MAX_INPUT,
+    "conversation_history": MAX_HISTORY,
+    "model": "llama3-8b-8192"
+}
+GENERATE_BODY = json.dumps(GENERATE_PAYLOAD)
+
+def setup_app_state(custom_characters: int = 200, history_exchanges: int = 10):
+    """Fill app.py's in-memory stores the way a long-running instance would look"""
+    for i in range(custom_characters):
+        flask_app.create_custom_character(
+            f"Custom Character {i}", "Wandering Bard", MAX_TRAITS,
+            "Travelled every road in the kingdom. " * 5, "Sings instead of speaking. " * 5,
+            {"rate": 150, "pitch": 1.0, "volume": 0.9}
+        )
+    for i in range(history_exchanges):
+        flask_app.add_to_conversation_history("severus snape", MAX_INPUT, MAX_INPUT, USER_ID)
+        flask_app.add_to_conversation_history(f"custom character {custom_characters - 1}", MAX_INPUT, MAX_INPUT, USER_ID)
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    """Return the named zero-argument callables to time"""
+    parsed_request = main_groq.GenerateRequest(**GENERATE_PAYLOAD)
+    response = main_groq.GenerateResponse(npc=MAX_NAME, reply=MAX_INPUT)
+    last_custom_name = f"Custom Character {len(flask_app.CUSTOM_CHARACTERS) - 1}"
+    all_characters = {**flask_app.CHARACTERS, **flask_app.CUSTOM_CHARACTERS}
+
+    return {
+        "main_groq.build_system_prompt": lambda: main_groq.build_system_prompt(parsed_request),
+        "main_groq.no_prompt_injection": lambda: main_groq.GenerateRequest.no_prompt_injection(MAX_INPUT),
+        "main_groq.GenerateRequest.parse": lambda: main_groq.GenerateRequest(**json.loads(GENERATE_BODY)),
+        "main_groq.GenerateResponse.json": lambda: json.dumps({"npc": response.npc, "reply": response.reply}),
+        "app.generate_prompt.predefined": lambda: flask_app.generate_prompt(
+            "Severus Snape", "Mysterious Potions Master", "", MAX_INPUT, "llama3-8b-8192", USER_ID),
+        "app.generate_prompt.custom": lambda: flask_app.generate_prompt(
+            last_custom_name, "Wandering Bard", MAX_TRAITS, MAX_INPUT, "llama3-8b-8192", USER_ID),
+        "app.characters.json": lambda: json.dumps(all_characters),
+    }
+
+def time_benchmark(func: Callable[[], object], repeat: int = 5) -> float:
+    """Return the best per-call time in microseconds (each repeat runs for at least 0.2s)"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def load_baseline(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("results_us", {})
+
+def save_baseline(path: str, results: Dict[str, float]):
+    with open(path, "w") as f:
+        json.dump({"python": sys.version.split()[0], "results_us": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown as a fraction of the baseline (default: 0.25)")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this string")
+    args = parser.parse_args()
+
+    setup_app_state()
+    benchmarks = {name: func for name, func in build_benchmarks().items() if args.filter in name}
+    baseline = load_baseline(args.baseline)
+
+    print("⏱️  Hot Path Benchmarks")
+    print("-" * 80)
+    print(f"{'Benchmark':<36} {'Time (µs)':>12} {'Baseline':>12} {'Change':>10}")
+    print("-" * 80)
+
+    results = {}
+    regressions = []
+    for name, func in benchmarks.items():
+        results[name] = round(time_benchmark(func), 3)
+        base = baseline.get(name)
+        if base and results[name] / base - 1 > args.threshold:
+            # Re-time once before flagging, so a noisy neighbour doesn't fail the run
+            results[name] = min(results[name], round(time_benchmark(func), 3))
+        if base:
+            change = results[name] / base - 1
+            flag = " ❌" if change > args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<36} {results[name]:>12.2f} {base:>12.2f} {change:>+9.1%}{flag}")
+        else:
+            print(f"{name:<36} {results[name]:>12.2f} {'N/A':>12} {'':>10}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
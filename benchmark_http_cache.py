@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Bytes and latency saved by pre-rendered, pre-compressed static responses.
+
+For each cached endpoint this compares the old per-request rendering
+(render_template / jsonify) with the cached response, compressed and as a
+304 revalidation.
+
+Usage:
+    python benchmark_http_cache.py --requests 2000
+"""
+
+import argparse
+import time
+
+from flask import jsonify, render_template
+
+import app as vercel_app
+import web_interface
+from http_cache import brotli
+
+def add_uncached_route(flask_app, path, view):
+    flask_app.add_url_rule(f"/__uncached{path}", endpoint=f"uncached{path}", view_func=view)
+    return f"/__uncached{path}"
+
+def endpoints():
+    """(label, flask app, cached path, uncached path) for every cached endpoint"""
+    return [
+        ("app /", vercel_app.app, "/",
+         add_uncached_route(vercel_app.app, "/", lambda: render_template("index.html"))),
+        ("app /creator", vercel_app.app, "/creator",
+         add_uncached_route(vercel_app.app, "/creator", lambda: render_template("creator.html"))),
+        ("app /api/demo/branching", vercel_app.app, "/api/demo/branching",
+         add_uncached_route(vercel_app.app, "/api/demo/branching", lambda: jsonify(vercel_app.DEMO_SCENARIOS))),
+        ("app /api/translate", vercel_app.app, "/api/translate/harry/spanish",
+         add_uncached_route(vercel_app.app, "/api/translate", lambda: jsonify({
+             "character": "harry", "language": "spanish",
+             "translation": vercel_app.get_translation("harry", "spanish")}))),
+        ("web /", web_interface.app, "/",
+         add_uncached_route(web_interface.app, "/", lambda: render_template(
+             "index.html", characters=web_interface.CHARACTERS, models=web_interface.MODELS))),
+        ("web /api/models", web_interface.app, "/api/models",
+         add_uncached_route(web_interface.app, "/api/models", lambda: jsonify(web_interface.MODELS))),
+    ]
+
+def time_get(flask_app, path, headers, requests):
+    """Return (mean server-side handling time in µs, response size in bytes).
+
+    Dispatches inside a request context to leave out the test client's own
+    WSGI environ building and response parsing.
+    """
+    response = flask_app.test_client().get(path, headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        with flask_app.test_request_context(path, headers=headers):
+            flask_app.full_dispatch_request()
+    return (time.perf_counter() - start) / requests * 1e6, len(response.data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Static response caching benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    encodings = "br, gzip" if brotli else "gzip"
+    print(f"🗜️  Static response cache benchmark ({args.requests} requests each, Accept-Encoding: {encodings})")
+    print("-" * 108)
+    print(f"{'Endpoint':<26} {'Raw B':>8} {'Sent B':>8} {'Saved':>7} {'Uncached µs':>12} {'Cached µs':>10} {'304 µs':>8} {'Speedup':>8}")
+    print("-" * 108)
+    for label, flask_app, cached_path, uncached_path in endpoints():
+        uncached_us, raw_bytes = time_get(flask_app, uncached_path, {}, args.requests)
+        cached_us, sent_bytes = time_get(flask_app, cached_path, {"Accept-Encoding": encodings}, args.requests)
+        etag = flask_app.test_client().get(cached_path, headers={"Accept-Encoding": encodings}).headers["ETag"]
+        revalidate_us, _ = time_get(flask_app, cached_path, {"Accept-Encoding": encodings, "If-None-Match": etag}, args.requests)
+        print(f"{label:<26} {raw_bytes:>8} {sent_bytes:>8} {1 - sent_bytes / raw_bytes:>6.0%} "
+              f"{uncached_us:>12.1f} {cached_us:>10.1f} {revalidate_us:>8.1f} {uncached_us / cached_us:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
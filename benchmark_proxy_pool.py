@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Throughput comparison for the web_interface.py -> generation backend proxy.
+
+Runs web_interface.py's Flask app against the local stub backend and fires
+concurrent /chat requests, once with the pooled keep-alive session and once
+with plain requests.post (a new TCP connection per proxied chat).
+
+Usage:
+    python benchmark_proxy_pool.py --requests 1000 --concurrency 32
+"""
+
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+import web_interface
+from generation_backends import RemoteBackend, create_backend_session
+from benchmark_utils import percentile
+from stub_backend import start_stub_backend
+
+def start_web_interface() -> str:
+    """Serve web_interface.app from a background thread and return its base URL"""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, web_interface.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def run_load(web_url: str, total: int, concurrency: int) -> dict:
+    """Send `total` /chat requests with `concurrency` in flight and time them"""
+    client = requests.Session()
+    client.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    payload = {"message": "Can you repair my sword?", "character": "drogun", "model": "llama3-8b-8192"}
+
+    def one_request(_):
+        start = time.perf_counter()
+        response = client.post(f"{web_url}/chat", json=payload, timeout=30)
+        return time.perf_counter() - start, response.status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "ok": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs unpooled proxy throughput")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=0.005, help="Stub backend delay per /generate (seconds)")
+    args = parser.parse_args()
+
+    _, backend_url = start_stub_backend(delay=args.delay)
+    web_url = start_web_interface()
+
+    modes = {
+        # The requests module has the same post/get signature as a Session
+        "unpooled (requests.post)": requests,
+        "pooled keep-alive session": create_backend_session(max(args.concurrency, 1)),
+    }
+
+    print(f"🔌 Proxy benchmark: {args.requests} chats, {args.concurrency} concurrent, backend delay {args.delay * 1000:.0f}ms")
+    print("-" * 80)
+    print(f"{'Mode':<28} {'OK':>8} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 80)
+    results = {}
+    for name, client in modes.items():
+        web_interface.backend = RemoteBackend(backend_url, session=client)
+        run_load(web_url, min(50, args.requests), args.concurrency)  # warm-up
+        results[name] = result = run_load(web_url, args.requests, args.concurrency)
+        print(f"{name:<28} {result['ok']:>8} {result['throughput']:>10.1f} {result['p50']:>10.2f} {result['p99']:>10.2f}")
+
+    unpooled, pooled = results.values()
+    if unpooled["throughput"]:
+        print(f"\n📈 Pooled throughput: {pooled['throughput'] / unpooled['throughput']:.2f}x unpooled")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Latency, real-time factor and accuracy of the speech recognition backends.
+
+Runs every WAV file through each backend in recognizers.py. Real-time factor
+(RTF) is processing time divided by audio duration: below 1.0 the engine is
+faster than the speaker. If a file has a transcript next to it (same name,
+.txt), the word error rate is reported too.
+
+Usage:
+    python benchmark_recognizers.py recordings/ --backends google,vosk,whisper
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+
+from benchmark_utils import percentile
+from recognizers import RECOGNIZERS, RecognitionError, create_recognizer, pcm_duration, read_wav
+
+def find_wavs(paths):
+    wavs = []
+    for path in paths:
+        if os.path.isdir(path):
+            wavs.extend(sorted(glob.glob(os.path.join(path, "*.wav"))))
+        else:
+            wavs.append(path)
+    return wavs
+
+def words(text: str):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    """Word-level edit distance"""
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+def benchmark_backend(name, clips, repeats):
+    """Load the backend and transcribe every clip; returns a stats dict"""
+    start = time.perf_counter()
+    recognizer = create_recognizer(name)
+    load_time = time.perf_counter() - start
+
+    latencies, audio_seconds, processing_seconds = [], 0.0, 0.0
+    errors, reference_words = 0, 0
+    for path, pcm, sample_rate, reference in clips:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            text = recognizer.transcribe(pcm, sample_rate)
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            processing_seconds += elapsed
+            audio_seconds += pcm_duration(pcm, sample_rate)
+        if reference is not None:
+            errors += word_errors(reference, text)
+            reference_words += len(words(reference))
+        print(f"   {name:<8} {os.path.basename(path):<28} {elapsed * 1000:>8.0f}ms  {text!r}")
+
+    return {
+        "load": load_time,
+        "mean": sum(latencies) / len(latencies),
+        "p90": percentile(latencies, 90),
+        "rtf": processing_seconds / audio_seconds,
+        "wer": errors / reference_words if reference_words else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Speech recognition backend benchmark")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories of WAV files (16-bit PCM)")
+    parser.add_argument("--backends", default=",".join(RECOGNIZERS), help="Comma-separated backends to compare")
+    parser.add_argument("--repeats", type=int, default=1, help="Transcriptions per file")
+    args = parser.parse_args()
+
+    clips = []
+    for path in find_wavs(args.paths):
+        pcm, sample_rate = read_wav(path)
+        transcript_path = os.path.splitext(path)[0] + ".txt"
+        reference = open(transcript_path, encoding="utf-8").read() if os.path.exists(transcript_path) else None
+        clips.append((path, pcm, sample_rate, reference))
+    if not clips:
+        parser.error("no WAV files found")
+    total_audio = sum(pcm_duration(pcm, rate) for _, pcm, rate, _ in clips)
+
+    print(f"🎙️  Speech recognition benchmark: {len(clips)} clips, {total_audio:.1f}s of audio")
+    results = {}
+    for name in args.backends.split(","):
+        try:
+            results[name] = benchmark_backend(name, clips, args.repeats)
+        except (RecognitionError, ImportError) as e:
+            print(f"⚠️  Skipping {name}: {e}")
+
+    print("-" * 72)
+    print(f"{'Backend':<10} {'Load (s)':>9} {'Mean (ms)':>10} {'p90 (ms)':>10} {'RTF':>7} {'WER':>7}")
+    print("-" * 72)
+    for name, result in results.items():
+        wer = f"{result['wer']:.1%}" if result["wer"] is not None else "n/a"
+        print(f"{name:<10} {result['load']:>9.1f} {result['mean'] * 1000:>10.0f} {result['p90'] * 1000:>10.0f} "
+              f"{result['rtf']:>7.2f} {wer:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the benchmark_*.py scripts, so that no benchmark imports
+another (or the interactive model_switcher.py) for them.
+
+- percentile: latency statistics
+- free_port, start_server, start_main_groq: local servers to measure against
+- synth_utterance: synthetic speech at SAMPLE_RATE for the voice benchmarks
+"""
+
+import math
+import socket
+import subprocess
+import threading
+import time
+from typing import List
+
+import numpy as np
+import requests
+
+SAMPLE_RATE = 16000
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of numbers (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(command, env, url) -> subprocess.Popen:
+    """Launch a server process and wait until /health answers"""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+def start_main_groq():
+    """Run main_groq.app under uvicorn in a background thread and wait until it answers"""
+    # Imported here: only the benchmarks that run main_groq.py in-process pay for it
+    import uvicorn
+
+    import main_groq
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main_groq.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def rms_db(samples: np.ndarray) -> float:
+    return 10 * math.log10(float(np.mean(samples * samples)) + 1e-12)
+
+def synth_syllable(rng, seconds: float) -> np.ndarray:
+    """A voiced syllable: harmonics of a gliding pitch under a smooth envelope"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(100, 220) * (1 + rng.uniform(-0.15, 0.15) * t / seconds)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    return voiced * np.hanning(len(t))
+
+def synth_fricative(rng, seconds: float) -> np.ndarray:
+    """An unvoiced "s"/"f": high-passed noise, much quieter than a vowel"""
+    noise = np.diff(rng.standard_normal(int(seconds * SAMPLE_RATE) + 1))
+    return 0.15 * noise * np.hanning(len(noise))
+
+def synth_utterance(rng) -> np.ndarray:
+    """A few words of syllables, with pauses of up to 0.25s between words"""
+    parts = []
+    for word in range(rng.integers(2, 7)):
+        if word:
+            parts.append(np.zeros(int(rng.uniform(0.05, 0.25) * SAMPLE_RATE)))
+        if rng.random() < 0.3:
+            parts.append(synth_fricative(rng, rng.uniform(0.06, 0.12)))
+        for _ in range(rng.integers(1, 4)):
+            parts.append(synth_syllable(rng, rng.uniform(0.12, 0.25)))
+        if rng.random() < 0.2:
+            parts.append(synth_fricative(rng, rng.uniform(0.06, 0.12)))
+    speech = np.concatenate(parts)
+    level_db = rng.uniform(-26, -18)
+    return speech * 10 ** ((level_db - rms_db(speech)) / 20)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Endpointing latency and false cutoffs of the voice-activity detector.
+
+Runs a corpus of labelled WAV files through vad.VoiceActivityDetector and
+through an emulation of speech_recognition's listen() with the settings
+voice_assistant.py used before the VAD: energy_threshold 4000 with dynamic
+adjustment, and a pause_threshold of 0.8s.
+
+- End latency: from the true end of an utterance until the endpointer
+  declares it over, which is when recognition can begin.
+- False cutoff: the endpointer declared the end while the speaker was still
+  talking (a pause inside the utterance was taken for its end).
+- False start: a detected utterance where nobody spoke.
+
+Each WAV needs a JSON label file next to it: {"speech": [[start, end], ...]}
+in seconds. If the corpus directory is empty, a synthetic corpus is generated
+first. It has harmonic "syllables", fricative bursts and short pauses
+between words, over quiet, loud and suddenly louder background noise.
+
+Usage:
+    python benchmark_vad.py --corpus vad_corpus --clips 24
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import wave
+
+import numpy as np
+
+from benchmark_utils import SAMPLE_RATE, percentile, rms_db, synth_utterance
+from recognizers import read_wav
+from vad import VoiceActivityDetector
+
+CHUNK_SAMPLES = 1024
+# Leading silence the VAD profile is taken from (before the "fan-on" noise jump)
+CALIBRATION_SECONDS = 0.3
+NOISE_CONDITIONS = {"quiet": -62.0, "office": -48.0, "noisy": -40.0, "fan-on": -55.0}
+
+def synth_clip(rng, condition: str):
+    """(samples, [[start, end], ...]) for 1-3 utterances over background noise"""
+    parts, labels, position = [np.zeros(int(0.8 * SAMPLE_RATE))], [], 0.8
+    for index in range(rng.integers(1, 4)):
+        if index:
+            gap = np.zeros(int(rng.uniform(1.2, 2.0) * SAMPLE_RATE))
+            parts.append(gap)
+            position += len(gap) / SAMPLE_RATE
+        utterance = synth_utterance(rng)
+        labels.append([round(position, 3), round(position + len(utterance) / SAMPLE_RATE, 3)])
+        parts.append(utterance)
+        position += len(utterance) / SAMPLE_RATE
+    parts.append(np.zeros(SAMPLE_RATE))
+    signal = np.concatenate(parts)
+
+    noise = rng.standard_normal(len(signal))
+    noise *= 10 ** ((NOISE_CONDITIONS[condition] - rms_db(noise)) / 20)
+    if condition == "fan-on":
+        # Background noise jumps by 15dB during the first pause
+        noise[int(0.4 * SAMPLE_RATE):] *= 10 ** (15 / 20)
+    return np.clip(signal + noise, -1, 1), labels
+
+def generate_corpus(directory: str, clips: int, seed: int = 7):
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    conditions = list(NOISE_CONDITIONS)
+    for index in range(clips):
+        condition = conditions[index % len(conditions)]
+        samples, labels = synth_clip(rng, condition)
+        path = os.path.join(directory, f"{condition}_{index:02d}")
+        with wave.open(path + ".wav", "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes((samples * 32767).astype(np.int16).tobytes())
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"speech": labels, "condition": condition}, f)
+    print(f"🧪 Generated {clips} synthetic clips in {directory}/")
+
+class SpeechRecognitionEndpointer:
+    """speech_recognition's Recognizer.listen() loop, as voice_assistant.py configured it"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, energy_threshold: float = 4000,
+                 pause_threshold: float = 0.8, chunk: int = CHUNK_SAMPLES):
+        self.chunk_bytes = chunk * 2
+        self.seconds_per_buffer = chunk / sample_rate
+        self.threshold = energy_threshold
+        self.pause_buffers = math.ceil(pause_threshold / self.seconds_per_buffer)
+        self.pending = b""
+        self.in_speech = False
+        self.pause_count = 0
+
+    def process(self, pcm: bytes):
+        pcm = self.pending + pcm
+        results = []
+        while len(pcm) >= self.chunk_bytes:
+            buffer, pcm = pcm[:self.chunk_bytes], pcm[self.chunk_bytes:]
+            samples = np.frombuffer(buffer, dtype=np.int16).astype(np.float64)
+            energy = math.sqrt(float(np.mean(samples * samples)))
+            if not self.in_speech:
+                if energy > self.threshold:
+                    self.in_speech, self.pause_count = True, 0
+                    results.append((buffer, "start"))
+                    continue
+                # dynamic_energy_threshold: drift towards 1.5x the ambient energy
+                damping = 0.15 ** self.seconds_per_buffer
+                self.threshold = self.threshold * damping + energy * 1.5 * (1 - damping)
+                results.append((buffer, "silence"))
+            else:
+                self.pause_count = self.pause_count + 1 if energy <= self.threshold else 0
+                if self.pause_count > self.pause_buffers:
+                    self.in_speech = False
+                    results.append((buffer, "end"))
+                else:
+                    results.append((buffer, "speech"))
+        self.pending = pcm
+        return results
+
+def detect_segments(endpointer, pcm: bytes):
+    """[(start, end_declared_at)] in seconds, streaming pcm through in microphone-sized chunks"""
+    segments, position, start = [], 0.0, None
+    for offset in range(0, len(pcm), CHUNK_SAMPLES * 2):
+        for frame, state in endpointer.process(pcm[offset:offset + CHUNK_SAMPLES * 2]):
+            position += len(frame) / 2 / SAMPLE_RATE
+            if state == "start":
+                start = position
+            elif state == "end" and start is not None:
+                segments.append((start, position))
+                start = None
+    if start is not None:
+        segments.append((start, None))
+    return segments
+
+def score(segments, labels):
+    """End latencies, false cutoffs, missed utterances and false starts for one clip"""
+    latencies, cutoffs, missed = [], 0, 0
+    matched = set()
+    for true_start, true_end in labels:
+        overlapping = [i for i, (start, end) in enumerate(segments)
+                       if start <= true_end + 0.1 and (end is None or end >= true_start)]
+        matched.update(overlapping)
+        if not overlapping:
+            missed += 1
+            continue
+        ends = [segments[i][1] for i in overlapping]
+        if any(end is not None and end < true_end for end in ends):
+            cutoffs += 1
+        if ends[-1] is not None:
+            latencies.append(ends[-1] - true_end)
+    return latencies, cutoffs, missed, len(segments) - len(matched)
+
+def main():
+    parser = argparse.ArgumentParser(description="VAD endpointing benchmark")
+    parser.add_argument("--corpus", default="vad_corpus", help="Directory of labelled WAV files")
+    parser.add_argument("--clips", type=int, default=24, help="Synthetic clips to generate if the corpus is empty")
+    parser.add_argument("--end-silence-ms", type=int, default=None, help="Override VAD_END_SILENCE_MS")
+    args = parser.parse_args()
+
+    if not glob.glob(os.path.join(args.corpus, "*.wav")):
+        generate_corpus(args.corpus, args.clips)
+
+    clips = []
+    for path in sorted(glob.glob(os.path.join(args.corpus, "*.wav"))):
+        label_path = os.path.splitext(path)[0] + ".json"
+        if not os.path.exists(label_path):
+            print(f"⚠️  Skipping {path}: no {os.path.basename(label_path)}")
+            continue
+        with open(label_path, encoding="utf-8") as f:
+            labels = json.load(f)
+        pcm, _ = read_wav(path, SAMPLE_RATE)
+        clips.append((labels.get("condition", "recorded"), pcm, labels["speech"]))
+
+    vad_options = {"profile_path": None}
+    if args.end_silence_ms is not None:
+        vad_options["end_silence_ms"] = args.end_silence_ms
+    def make_vad(pcm):
+        # As on a later run: the saved profile matches the room at startup
+        detector = VoiceActivityDetector(SAMPLE_RATE, **vad_options)
+        detector.calibrate(pcm[:int(CALIBRATION_SECONDS * SAMPLE_RATE) * 2])
+        return detector
+
+    endpointers = {
+        "vad": make_vad,
+        "speech_recognition": lambda pcm: SpeechRecognitionEndpointer(SAMPLE_RATE),
+    }
+
+    utterance_count = sum(len(labels) for _, _, labels in clips)
+    print(f"🎙️  Endpointing benchmark: {len(clips)} clips, {utterance_count} utterances")
+    print("-" * 86)
+    print(f"{'Endpointer':<20} {'Noise':<10} {'Mean end (ms)':>14} {'p90 end (ms)':>13} "
+          f"{'Cutoffs':>8} {'Missed':>7} {'False starts':>13}")
+    print("-" * 86)
+    for name, make_endpointer in endpointers.items():
+        for condition in sorted({condition for condition, _, _ in clips}):
+            latencies, cutoffs, missed, false_starts = [], 0, 0, 0
+            for clip_condition, pcm, labels in clips:
+                if clip_condition != condition:
+                    continue
+                result = score(detect_segments(make_endpointer(pcm), pcm), labels)
+                latencies += result[0]
+                cutoffs += result[1]
+                missed += result[2]
+                false_starts += result[3]
+            mean = f"{sum(latencies) / len(latencies) * 1000:.0f}" if latencies else "n/a"
+            p90 = f"{percentile(latencies, 90) * 1000:.0f}" if latencies else "n/a"
+            print(f"{name:<20} {condition:<10} {mean:>14} {p90:>13} {cutoffs:>8} {missed:>7} {false_starts:>13}")
+
+if __name__ == "__main__":
+    main()
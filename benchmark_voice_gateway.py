@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+How many simultaneous voice sessions one voice_gateway.py process sustains.
+
+Every simulated player keeps a WebSocket open and streams microphone audio
+in real time, as a client would: a little silence, a synthetic utterance,
+then silence until the NPC has answered, a short pause, and the next turn.
+Latency is measured from the moment the last sample of speech was sent:
+
+- first reply: the first sentence of the NPC's answer arrives as text
+- first audio: its first WAV bytes arrive
+
+The server side runs in one child process, like a single-box deployment:
+the gateway, main_groq.py and the local stand-in for the Groq API
+(stub_backend.py). Recognition uses a simulated recognizer that takes
+--rtf x the utterance length on the gateway's worker pool. It sleeps rather
+than computes, like native engines (Vosk, faster-whisper) that release the
+GIL, so the pool size (GATEWAY_RECOGNITION_WORKERS) sets the capacity.
+Speech comes from espeak-ng if it is installed; otherwise replies are text
+only and "first audio" is n/a. GATEWAY_* variables in the environment are
+passed to the gateway to try other limits.
+
+A level is sustained when no session was refused or told the gateway was
+busy and the p90 first-audio latency (first reply without espeak-ng) is
+within --target-ms.
+
+Usage:
+    python benchmark_voice_gateway.py --levels 1,8,32,64 --turns 3
+    GATEWAY_RECOGNITION_WORKERS=8 python benchmark_voice_gateway.py --rtf 0.3
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+
+import aiohttp
+import numpy as np
+import requests
+
+from benchmark_utils import SAMPLE_RATE, free_port, percentile, start_server, synth_utterance
+from recognizers import RECOGNIZERS, SpeechRecognizer, pcm_duration
+
+CHUNK_SAMPLES = 1024
+LEAD_SECONDS = 0.5
+# Give up on a turn that has not ended after this long
+TURN_TIMEOUT = 30
+CHARACTERS = ["drogun", "lira", "eldrin", "garrick", "elara"]
+
+class SimulatedRecognizer(SpeechRecognizer):
+    """Takes real_time_factor x the audio length and 'hears' a fixed line"""
+    name = "simulated"
+    real_time_factor = 0.1
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        time.sleep(pcm_duration(pcm, sample_rate) * self.real_time_factor)
+        return "can you repair my sword" if pcm else ""
+
+def serve(args):
+    """Child process: stub Groq API + main_groq.py + the gateway on args.port"""
+    import uvicorn
+
+    import main_groq
+    from benchmark_utils import start_main_groq
+    from stub_backend import COMPLETIONS_PATH, start_stub_backend
+
+    SimulatedRecognizer.real_time_factor = args.rtf
+    RECOGNIZERS["simulated"] = SimulatedRecognizer
+    _, stub_url = start_stub_backend(delay=args.delay, token_delay=args.token_delay)
+    main_groq.GROQ_API_URL = f"{stub_url}{COMPLETIONS_PATH}"
+    main_groq.MAX_REQUESTS_PER_MINUTE = 10 ** 9
+    # main_groq.py logs every prompt
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        server = start_main_groq()
+        import voice_gateway
+        voice_gateway.BACKEND_URL = f"http://127.0.0.1:{server.config.port}"
+        uvicorn.run(voice_gateway.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+def make_utterances(count: int, seed: int = 5):
+    """[(pcm, seconds of speech)]: synthetic speech over faint noise, then the turn's silence follows"""
+    rng = np.random.default_rng(seed)
+    utterances = []
+    for _ in range(count):
+        speech = np.concatenate([np.zeros(int(LEAD_SECONDS * SAMPLE_RATE)), synth_utterance(rng)])
+        speech = np.clip(speech + rng.standard_normal(len(speech)) * 10 ** (-55 / 20), -1, 1)
+        utterances.append(((speech * 32767).astype(np.int16).tobytes(), len(speech) / SAMPLE_RATE))
+    return utterances
+
+def silence(rng, samples: int) -> bytes:
+    noise = rng.standard_normal(samples) * 10 ** (-55 / 20) * 32767
+    return noise.astype(np.int16).tobytes()
+
+async def player(session, url: str, player_id: int, utterances, turns: int, think: float, results: dict):
+    """One client: stream turns of speech in real time and time the NPC's answers"""
+    rng = np.random.default_rng(player_id)
+    character = CHARACTERS[player_id % len(CHARACTERS)]
+    try:
+        ws = await session.ws_connect(f"{url}/ws/voice?character={character}&sample_rate={SAMPLE_RATE}")
+    except aiohttp.ClientError:
+        results["errors"] += 1
+        return
+    turn_over = asyncio.Event()
+    speech_ended_at = None
+    first = {}
+
+    async def read():
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.BINARY:
+                first.setdefault("audio", time.perf_counter())
+                continue
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            event = json.loads(message.data)
+            if event["type"] == "reply":
+                first.setdefault("reply", time.perf_counter())
+            elif event["type"] == "turn_end":
+                results["recognition"].append(event["timings"].get("recognition", 0.0))
+                turn_over.set()
+            elif event["type"] == "busy":
+                results["busy"] += 1
+                turn_over.set()
+            elif event["type"] == "error":
+                results["errors"] += 1
+                turn_over.set()
+        # Closed by the server: refused (1013) or a limit
+        if ws.close_code == 1013:
+            results["rejected"] += 1
+        elif ws.close_code not in (None, 1000):
+            results["errors"] += 1
+        turn_over.set()
+
+    reader = asyncio.create_task(read())
+    clock = time.perf_counter()
+    sent = 0
+
+    async def stream(pcm: bytes):
+        """Send pcm in microphone-sized chunks at the pace it would be spoken"""
+        nonlocal sent
+        for offset in range(0, len(pcm), CHUNK_SAMPLES * 2):
+            if ws.closed:
+                return
+            await ws.send_bytes(pcm[offset:offset + CHUNK_SAMPLES * 2])
+            sent += min(CHUNK_SAMPLES, (len(pcm) - offset) // 2)
+            await asyncio.sleep(max(0.0, clock + sent / SAMPLE_RATE - time.perf_counter()))
+
+    try:
+        for turn in range(turns):
+            pcm, _ = utterances[(player_id + turn) % len(utterances)]
+            turn_over.clear()
+            first.clear()
+            await stream(pcm)
+            speech_ended_at = time.perf_counter()
+            deadline = speech_ended_at + TURN_TIMEOUT
+            while not turn_over.is_set() and not ws.closed and time.perf_counter() < deadline:
+                await stream(silence(rng, CHUNK_SAMPLES))
+            if ws.closed:
+                return
+            if not turn_over.is_set():
+                results["errors"] += 1
+            if "reply" in first:
+                results["first_reply"].append(first["reply"] - speech_ended_at)
+                results["turns"] += 1
+            if "audio" in first:
+                results["first_audio"].append(first["audio"] - speech_ended_at)
+            await stream(silence(rng, int(think * SAMPLE_RATE)))
+    finally:
+        await ws.close()
+        reader.cancel()
+
+async def run_level(url: str, sessions: int, utterances, turns: int, think: float) -> dict:
+    results = {"turns": 0, "busy": 0, "rejected": 0, "errors": 0,
+               "first_reply": [], "first_audio": [], "recognition": []}
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=10)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), timeout=timeout) as session:
+        # Stagger the players over one second so they don't all speak in lockstep
+        async def staggered(player_id):
+            await asyncio.sleep(player_id / sessions)
+            await player(session, url, player_id, utterances, turns, think, results)
+        await asyncio.gather(*(staggered(i) for i in range(sessions)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice gateway load test")
+    parser.add_argument("--levels", default="1,8,32,64", help="Comma-separated simultaneous session counts")
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per session")
+    parser.add_argument("--think", type=float, default=1.0, help="Seconds of silence between a reply and the next turn")
+    parser.add_argument("--rtf", type=float, default=0.1, help="Simulated recognizer time / audio time")
+    parser.add_argument("--delay", type=float, default=0.3, help="Stub Groq API delay before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stub delay between streamed words")
+    parser.add_argument("--target-ms", type=float, default=1500, help="p90 first-audio latency a level must meet")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    levels = [int(level) for level in args.levels.split(",")]
+    port = free_port()
+    env = {**os.environ, "SPEECH_RECOGNIZER": "simulated",
+           "GATEWAY_MAX_SESSIONS": os.getenv("GATEWAY_MAX_SESSIONS", str(max(levels)))}
+    command = [sys.executable, __file__, "--serve", "--port", str(port), "--rtf", str(args.rtf),
+               "--delay", str(args.delay), "--token-delay", str(args.token_delay)]
+    url = f"http://127.0.0.1:{port}"
+    process = start_server(command, env, url)
+    utterances = make_utterances(8)
+    try:
+        gateway = requests.get(f"{url}/health", timeout=5).json()
+        metric = "first_audio" if gateway["speech"] else "first_reply"
+        mean_speech = sum(seconds for _, seconds in utterances) / len(utterances) - LEAD_SECONDS
+        print(f"🎙️  Voice gateway load test: {args.turns} turns per session, ~{mean_speech:.1f}s utterances, "
+              f"{gateway['recognition_workers']} recognition workers (rtf {args.rtf}), "
+              f"stub delay {args.delay * 1000:.0f}ms, speech={'espeak-ng' if gateway['speech'] else 'off'}")
+        print("-" * 96)
+        print(f"{'Sessions':>8} {'Turns':>6} {'Busy':>5} {'Refused':>8} {'Errors':>7} "
+              f"{'reply p50':>10} {'reply p90':>10} {'audio p50':>10} {'audio p90':>10} {'recog p90':>10}")
+        print("-" * 96)
+        asyncio.run(run_level(url, 1, utterances, 1, 0.2))  # warm-up
+        sustained = 0
+        for sessions in levels:
+            result = asyncio.run(run_level(url, sessions, utterances, args.turns, args.think))
+            cells = []
+            for key in ("first_reply", "first_audio", "recognition"):
+                values = result[key]
+                cells += [f"{percentile(values, q) * 1000:.0f}" if values else "n/a" for q in (50, 90)]
+            print(f"{sessions:>8} {result['turns']:>6} {result['busy']:>5} {result['rejected']:>8} "
+                  f"{result['errors']:>7} {cells[0]:>10} {cells[1]:>10} {cells[2]:>10} {cells[3]:>10} {cells[5]:>10}")
+            ok = (not result["busy"] and not result["rejected"] and not result["errors"] and result[metric]
+                  and percentile(result[metric], 90) * 1000 <= args.target_ms)
+            if ok:
+                sustained = sessions
+        print("-" * 96)
+        print(f"🚀 Sustained: {sustained} simultaneous sessions "
+              f"(p90 {metric.replace('_', ' ')} <= {args.target_ms:.0f}ms, nobody refused or busy)")
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of the voice conversation pipeline, without a microphone
+or speakers.
+
+Every WAV utterance goes through the same stages as a live turn in
+voice_assistant.py:
+
+1. endpoint: the VAD notices the player has stopped talking
+2. recognition: the selected speech recognizer transcribes the utterance
+3. generation: main_groq.py's /generate/stream, backed by the local stand-in
+   for the Groq API (stub_backend.py), until the first complete sentence
+4. synthesis: the first sentence is rendered to a WAV file in the character's
+   voice; playback could start here
+
+"First audio" is the sum of the four: the time from the end of the player's
+speech to the NPC's first sound. The whole reply is synthesized too, to give
+the real-time factor (synthesis time / audio duration) per character voice.
+
+With no WAV files, synthetic utterances are generated. They have labelled
+speech ends, but no real words. For those, use --recognizer transcript,
+which reads the .txt next to each WAV instead of running a recognizer.
+
+Usage:
+    python benchmark_voice_pipeline.py --utterances 4 --tts espeak
+    python benchmark_voice_pipeline.py recordings/ --recognizer whisper --delay 0.4
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import wave
+
+import numpy as np
+import requests
+
+import main_groq
+from benchmark_utils import SAMPLE_RATE, percentile, start_main_groq, synth_utterance
+from character_registry import CLASSIC_NPC_IDS, NPC_CHARACTERS, espeak_voice
+from conversation import split_sentences
+from recognizers import create_recognizer, pcm_duration, read_wav
+from stub_backend import COMPLETIONS_PATH, start_stub_backend
+from tts_cache import ESPEAK_BINARY, apply_voice, fix_wav_sizes, stream_espeak
+from vad import VoiceActivityDetector, capture_utterance
+
+PLAYER_LINES = [
+    "Can you repair my sword?",
+    "How much for a healing potion?",
+    "What do you know about the old ruins?",
+    "Have you seen any strangers in town?",
+    "I need armor for a long journey.",
+    "Tell me about yourself.",
+]
+STAGES = ["endpoint", "recognition", "generation", "synthesis", "first audio"]
+
+def make_synthetic_utterances(directory: str, count: int, seed: int = 11):
+    """Write count synthetic utterances (WAV + speech-end label + transcript) to directory"""
+    rng = np.random.default_rng(seed)
+    for index in range(count):
+        lead, tail = np.zeros(int(0.5 * SAMPLE_RATE)), np.zeros(int(1.0 * SAMPLE_RATE))
+        speech = synth_utterance(rng)
+        noise = rng.standard_normal(len(lead) + len(speech) + len(tail)) * 10 ** (-55 / 20)
+        samples = np.clip(np.concatenate([lead, speech, tail]) + noise, -1, 1)
+        path = os.path.join(directory, f"utterance_{index:02d}")
+        with wave.open(path + ".wav", "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes((samples * 32767).astype(np.int16).tobytes())
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"speech": [[0.5, round(0.5 + len(speech) / SAMPLE_RATE, 3)]]}, f)
+        with open(path + ".txt", "w", encoding="utf-8") as f:
+            f.write(PLAYER_LINES[index % len(PLAYER_LINES)])
+
+def load_utterances(paths):
+    """[(path, pcm, speech_end or None, transcript or None)]"""
+    wavs = []
+    for path in paths:
+        wavs.extend(sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path])
+    utterances = []
+    for path in wavs:
+        pcm, _ = read_wav(path, SAMPLE_RATE)
+        base = os.path.splitext(path)[0]
+        speech_end = transcript = None
+        if os.path.exists(base + ".json"):
+            with open(base + ".json", encoding="utf-8") as f:
+                speech_end = json.load(f)["speech"][-1][1]
+        if os.path.exists(base + ".txt"):
+            with open(base + ".txt", encoding="utf-8") as f:
+                transcript = f.read().strip()
+        utterances.append((path, pcm, speech_end, transcript))
+    return utterances
+
+def endpoint(pcm: bytes, speech_end):
+    """(utterance PCM, seconds from the end of speech until the VAD closed the utterance)"""
+    detector = VoiceActivityDetector(SAMPLE_RATE, profile_path=None)
+    detector.calibrate(pcm[:int(0.3 * SAMPLE_RATE) * 2])
+    chunk_bytes = 1024 * 2
+    consumed = [0]
+
+    def chunks():
+        for offset in range(0, len(pcm), chunk_bytes):
+            consumed[0] = offset + chunk_bytes
+            yield pcm[offset:offset + chunk_bytes]
+
+    start = time.perf_counter()
+    utterance = capture_utterance(chunks(), detector, phrase_time_limit=10)
+    processing = time.perf_counter() - start
+    closed_at = min(consumed[0], len(pcm)) / 2 / SAMPLE_RATE
+    if speech_end is None:
+        # Unlabelled recording: count the configured silence the VAD waits for
+        return utterance, detector.end_frames * detector.frame_seconds + processing
+    return utterance, max(0.0, closed_at - speech_end) + processing
+
+class Synthesizer:
+    """Renders text to a WAV file with espeak-ng or pyttsx3"""
+
+    def __init__(self, engine_name: str, directory: str):
+        self.engine_name = engine_name
+        self.directory = directory
+        self.count = 0
+        if engine_name == "pyttsx3":
+            import pyttsx3
+            self.engine = pyttsx3.init()
+
+    def voice(self, character_id: str):
+        if self.engine_name == "espeak":
+            return espeak_voice(character_id)
+        character = NPC_CHARACTERS[character_id]
+        return {"rate": character["voice_rate"], "volume": character["voice_volume"]}
+
+    def render(self, text: str, character_id: str):
+        """(seconds to synthesize, seconds of audio)"""
+        self.count += 1
+        path = os.path.join(self.directory, f"speech_{self.count}.wav")
+        voice = self.voice(character_id)
+        start = time.perf_counter()
+        if self.engine_name == "espeak":
+            with open(path, "wb") as f:
+                for chunk in stream_espeak(text, voice):
+                    f.write(chunk)
+            elapsed = time.perf_counter() - start
+            fix_wav_sizes(path)
+        else:
+            apply_voice(self.engine, voice)
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            elapsed = time.perf_counter() - start
+        with wave.open(path, "rb") as wav:
+            duration = wav.getnframes() / wav.getframerate()
+        os.remove(path)
+        return elapsed, duration
+
+def run_turn(session, api_url, recognizer, synthesizer, character_id, pcm, speech_end, transcript):
+    """Stage timings (seconds) and synthesis totals for one utterance"""
+    timings = {}
+    utterance, timings["endpoint"] = endpoint(pcm, speech_end)
+
+    start = time.perf_counter()
+    text = transcript if recognizer is None else recognizer.transcribe(utterance, SAMPLE_RATE)
+    timings["recognition"] = time.perf_counter() - start
+    text = text or PLAYER_LINES[0]
+
+    character = NPC_CHARACTERS[character_id]
+    payload = {"character_name": character["name"], "character_type": character["type"],
+               "traits": character["traits"], "player_input": text}
+    start = time.perf_counter()
+    sentences, buffer = [], ""
+    with session.post(f"{api_url}/generate/stream", json=payload, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            complete, buffer = split_sentences(buffer + chunk)
+            if complete and not sentences:
+                timings["generation"] = time.perf_counter() - start
+            sentences.extend(complete)
+    if buffer.strip():
+        sentences.append(buffer.strip())
+    timings.setdefault("generation", time.perf_counter() - start)
+
+    synthesis, audio = synthesizer.render(sentences[0], character_id)
+    timings["synthesis"] = synthesis
+    timings["first audio"] = sum(timings[stage] for stage in STAGES[:4])
+    for sentence in sentences[1:]:
+        more_synthesis, more_audio = synthesizer.render(sentence, character_id)
+        synthesis += more_synthesis
+        audio += more_audio
+    return timings, synthesis, audio
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice pipeline end-to-end latency benchmark")
+    parser.add_argument("paths", nargs="*", help="WAV files or directories (default: synthetic utterances)")
+    parser.add_argument("--utterances", type=int, default=4, help="Synthetic utterances to generate")
+    parser.add_argument("--recognizer", default="transcript",
+                        help="google, vosk, whisper, or transcript (use the .txt next to each WAV)")
+    parser.add_argument("--tts", choices=["espeak", "pyttsx3"], default="espeak" if ESPEAK_BINARY else "pyttsx3")
+    parser.add_argument("--delay", type=float, default=0.3, help="Stub Groq API delay before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stub delay between streamed words")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="voice_bench_")
+    if not args.paths:
+        make_synthetic_utterances(workdir, args.utterances)
+    utterances = load_utterances(args.paths or [workdir])
+    if not utterances:
+        parser.error("no WAV files found")
+    if args.recognizer == "transcript" and any(transcript is None for *_, transcript in utterances):
+        parser.error("--recognizer transcript needs a .txt transcript next to every WAV")
+
+    recognizer = None if args.recognizer == "transcript" else create_recognizer(args.recognizer)
+    synthesizer = Synthesizer(args.tts, workdir)
+    _, stub_url = start_stub_backend(delay=args.delay, token_delay=args.token_delay)
+    main_groq.GROQ_API_URL = f"{stub_url}{COMPLETIONS_PATH}"
+    main_groq.MAX_REQUESTS_PER_MINUTE = 10 ** 9
+    server = start_main_groq()
+    api_url = f"http://127.0.0.1:{server.config.port}"
+    session = requests.Session()
+
+    total_audio = sum(pcm_duration(pcm, SAMPLE_RATE) for _, pcm, _, _ in utterances)
+    print(f"🎙️  Voice pipeline benchmark: {len(utterances)} utterances ({total_audio:.1f}s), "
+          f"{len(CLASSIC_NPC_IDS)} voices, recognizer={args.recognizer}, tts={args.tts}")
+    stage_timings = {stage: [] for stage in STAGES}
+    per_character = {}
+    for character_id in CLASSIC_NPC_IDS:
+        synthesis_total, audio_total, first_audio = 0.0, 0.0, []
+        for _, pcm, speech_end, transcript in utterances:
+            # main_groq.py logs every prompt; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                timings, synthesis, audio = run_turn(session, api_url, recognizer, synthesizer,
+                                                     character_id, pcm, speech_end, transcript)
+            for stage in STAGES:
+                stage_timings[stage].append(timings[stage])
+            synthesis_total += synthesis
+            audio_total += audio
+            first_audio.append(timings["first audio"])
+        per_character[character_id] = (synthesis_total, audio_total, statistics.mean(first_audio))
+    server.should_exit = True
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print("-" * 60)
+    print(f"{'Stage':<14} {'mean (ms)':>10} {'p50 (ms)':>10} {'p90 (ms)':>10}")
+    print("-" * 60)
+    for stage in STAGES:
+        values = stage_timings[stage]
+        print(f"{stage:<14} {statistics.mean(values) * 1000:>10.0f} {percentile(values, 50) * 1000:>10.0f} "
+              f"{percentile(values, 90) * 1000:>10.0f}")
+
+    print("-" * 60)
+    print(f"{'Voice':<10} {'rate':>5} {'audio (s)':>10} {'synth (s)':>10} {'RTF':>7} {'first audio (ms)':>17}")
+    print("-" * 60)
+    for character_id, (synthesis_total, audio_total, first_audio) in per_character.items():
+        rtf = synthesis_total / audio_total if audio_total else float("nan")
+        print(f"{NPC_CHARACTERS[character_id]['name']:<10} {NPC_CHARACTERS[character_id]['voice_rate']:>5} "
+              f"{audio_total:>10.1f} {synthesis_total:>10.2f} {rtf:>7.2f} {first_audio * 1000:>17.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ import requests
 import time
 import json
 
+from character_registry import numbered_npcs
+from model_switcher import benchmark_matrix, print_benchmark_table, recommend_models
+
 class CharacterModelSwitcher:
     def __init__(self):
         self.available_models = {
@@ -37,38 +40,7 @@ class CharacterModelSwitcher:
             }
         }
         
-        self.available_characters = {
-            "1": {
-                "name": "Drogun",
-                "type": "Gruff Blacksmith",
-                "traits": "Gruff, impatient, values hard work, speaks in short sentences",
-                "description": "A grumpy blacksmith who values hard work"
-            },
-            "2": {
-                "name": "Lira",
-                "type": "Enthusiastic Potion Seller",
-                "traits": "Cheerful, talkative, always tries to upsell, uses lots of exclamations",
-                "description": "A cheerful potion seller who loves to upsell"
-            },
-            "3": {
-                "name": "Eldrin",
-                "type": "Mysterious Forest Hermit",
-                "traits": "Cryptic, wise, speaks in riddles, calm demeanor",
-                "description": "A mysterious hermit who speaks in riddles"
-            },
-            "4": {
-                "name": "Garrick",
-                "type": "Cynical City Guard",
-                "traits": "Suspicious, direct, doesn't trust easily, speaks with authority",
-                "description": "A cynical city guard who's suspicious of everyone"
-            },
-            "5": {
-                "name": "Elara",
-                "type": "Cheerful Shopkeeper",
-                "traits": "Friendly, helpful, loves to chat, always positive",
-                "description": "A friendly shopkeeper who loves to chat"
-            }
-        }
+        self.available_characters = numbered_npcs()
         
         self.current_character = "1"  # Drogun
         self.current_model = "llama3-8b-8192"
@@ -229,70 +201,47 @@ class CharacterModelSwitcher:
         else:
             print("❌ Invalid choice!")
     
-    def compare_characters(self):
-        """Compare different characters with the same model"""
+    def compare_characters(self, repeats: int = 3, max_workers: int = 8):
+        """Compare different characters with the same model, running all requests concurrently"""
         print("📊 Character Comparison Test")
         print("=" * 50)
         
         test_message = "Hello, how are you today?"
-        results = {}
+        characters = list(self.available_characters.values())
+        print(f"🔄 Testing {len(characters)} characters x {repeats} runs in parallel...")
         
-        for key, character in self.available_characters.items():
-            print(f"\n🔄 Testing {character['name']}...")
-            
-            try:
-                payload = {
-                    "character_name": character["name"],
-                    "character_type": character["type"],
-                    "traits": character["traits"],
-                    "player_input": test_message,
-                    "model": self.current_model
-                }
-                
-                start_time = time.time()
-                response = requests.post(f"{self.api_url}/generate", json=payload, timeout=30)
-                end_time = time.time()
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    reply = result.get("reply", "No response")
-                    response_time = end_time - start_time
-                    
-                    results[character['name']] = {
-                        "response": reply,
-                        "time": response_time,
-                        "status": "✅ Working"
-                    }
-                    
-                    print(f"✅ Response: {reply[:50]}...")
-                    print(f"⏱️ Time: {response_time:.2f}s")
-                else:
-                    results[character['name']] = {
-                        "response": "Error",
-                        "time": 0,
-                        "status": "❌ Failed"
-                    }
-                    print(f"❌ Failed: {response.status_code}")
-                    
-            except Exception as e:
-                results[character['name']] = {
-                    "response": "Error",
-                    "time": 0,
-                    "status": "❌ Error"
-                }
-                print(f"❌ Error: {e}")
+        results = benchmark_matrix(self.api_url, characters, [self.current_model], test_message,
+                                   repeats=repeats, max_workers=max_workers)
         
-        # Display comparison table
         print(f"\n📋 Character Comparison Results (Model: {self.current_model})")
-        print("-" * 80)
-        print(f"{'Character':<15} {'Type':<20} {'Status':<12} {'Time':<10} {'Response'}")
-        print("-" * 80)
+        print_benchmark_table(results)
+        return results
+    
+    def compare_matrix(self, repeats: int = 3, max_workers: int = 16):
+        """Benchmark the full character x model matrix and recommend a default model per character"""
+        print("📊 Character x Model Matrix Benchmark")
+        print("=" * 50)
+        
+        test_message = "Hello, how are you today?"
+        characters = list(self.available_characters.values())
+        models = [model['name'] for model in self.available_models.values()]
+        print(f"🔄 Running {len(characters)} characters x {len(models)} models x {repeats} runs "
+              f"({max_workers} in flight)...")
+        
+        start_time = time.perf_counter()
+        results = benchmark_matrix(self.api_url, characters, models, test_message,
+                                   repeats=repeats, max_workers=max_workers)
+        total_time = time.perf_counter() - start_time
+        
+        print(f"\n📋 Matrix Results ({total_time:.1f}s wall clock)")
+        print_benchmark_table(results)
         
-        for char_name, result in results.items():
-            character = next(c for c in self.available_characters.values() if c['name'] == char_name)
-            response_preview = result['response'][:30] + "..." if len(result['response']) > 30 else result['response']
-            time_str = f"{result['time']:.2f}s" if result['time'] > 0 else "N/A"
-            print(f"{char_name:<15} {character['type']:<20} {result['status']:<12} {time_str:<10} {response_preview}")
+        recommendations = recommend_models(results)
+        print("\n🏆 Recommended default model per character (most reliable, then lowest p50):")
+        for character in characters:
+            model_name = recommendations.get(character['name'], "N/A (no successful runs)")
+            print(f"   {character['name']:<12} {model_name}")
+        return recommendations
     
     def run(self):
         """Run the character and model switcher"""
@@ -312,10 +261,11 @@ class CharacterModelSwitcher:
             print("5. 💬 Chat with current setup")
             print("6. ⚖️ Compare all characters")
             print("7. 🧪 Test character/model")
+            print("8. 📈 Benchmark character x model matrix")
             print("0. ❌ Exit")
             print("-" * 40)
             
-            choice = input("\n🎯 Enter your choice (0-7): ").strip()
+            choice = input("\n🎯 Enter your choice (0-8): ").strip()
             
             if choice == "0":
                 print("👋 Goodbye!")
@@ -349,8 +299,10 @@ class CharacterModelSwitcher:
                         print(f"❌ {self.available_characters[char_choice]['name']} with {model_name} failed!")
                 else:
                     print("❌ Invalid choice!")
+            elif choice == "8":
+                self.compare_matrix()
             else:
-                print("❌ Invalid choice! Please enter 0-7.")
+                print("❌ Invalid choice! Please enter 0-8.")
 
 if __name__ == "__main__":
     switcher = CharacterModelSwitcher()
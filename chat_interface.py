@@ -11,44 +11,15 @@ import sys
 import os
 from typing import Dict, List, Optional
 
+from character_registry import numbered_npcs
+
 # API URLs
 PHASE1_URL = "http://127.0.0.1:8000/generate"
 PHASE2_URL = "http://127.0.0.1:8001/generate"
 PHASE2_SAMPLES_URL = "http://127.0.0.1:8001/sample-npcs"
 
 # Pre-defined NPCs for quick selection
-PREDEFINED_NPCS = {
-    "1": {
-        "name": "Drogun",
-        "type": "Gruff Blacksmith",
-        "traits": "Gruff, impatient, values hard work, speaks in short sentences",
-        "description": "A grumpy blacksmith who values hard work and speaks in short sentences"
-    },
-    "2": {
-        "name": "Lira",
-        "type": "Enthusiastic Potion Seller",
-        "traits": "Cheerful, talkative, always tries to upsell, uses lots of exclamations",
-        "description": "A cheerful potion seller who loves to upsell and uses lots of exclamations"
-    },
-    "3": {
-        "name": "Eldrin",
-        "type": "Mysterious Forest Hermit",
-        "traits": "Cryptic, wise, speaks in riddles, calm demeanor",
-        "description": "A mysterious hermit who speaks in riddles and cryptic wisdom"
-    },
-    "4": {
-        "name": "Garrick",
-        "type": "Cynical City Guard",
-        "traits": "Suspicious, direct, doesn't trust easily, speaks with authority",
-        "description": "A cynical city guard who's suspicious of everyone and speaks with authority"
-    },
-    "5": {
-        "name": "Elara",
-        "type": "Cheerful Shopkeeper",
-        "traits": "Friendly, helpful, loves to chat, always positive",
-        "description": "A friendly shopkeeper who loves to chat and is always positive"
-    }
-}
+PREDEFINED_NPCS = numbered_npcs()
 
 def print_banner():
     """Print the application banner"""
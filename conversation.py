@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Conversation helpers shared by the voice clients and the headless servers.
+
+Only the standard library is imported here, so voice_gateway.py and the
+benchmarks can use them without loading voice_assistant.py's desktop stack
+(speech_recognition, pyttsx3, audio devices).
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# Whitespace after sentence-ending punctuation, where a streamed reply can be
+# handed to the speech engine before the rest has arrived
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+# Turns of conversation_history main_groq.py keeps per session and accepts in a
+# request, and the longest text it accepts per turn
+MAX_HISTORY_TURNS = 10
+MAX_TURN_TEXT = 512
+
+def split_sentences(text: str) -> Tuple[List[str], str]:
+    """Split complete sentences off the front of text; returns (sentences, unfinished rest)"""
+    parts = SENTENCE_BOUNDARY.split(text)
+    return [part.strip() for part in parts[:-1] if part.strip()], parts[-1]
+
+def history_turn(speaker: str, text: str) -> Dict[str, str]:
+    """A conversation_history entry, cut to what the server accepts on a resync"""
+    return {"speaker": speaker, "text": text[:MAX_TURN_TEXT]}
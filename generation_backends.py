@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Generation backends for the web interface.
+
+web_interface.py talks to the dialogue generator through one of these:
+- RemoteBackend: proxies to one or more main_groq.py servers over a keep-alive
+  HTTP pool, load balanced by UpstreamPool
+- EmbeddedBackend: calls main_groq.py's generation core in-process, skipping
+  the loopback HTTP hop and the second JSON encode/decode
+
+Select with NPC_BACKEND_MODE=remote|embedded (default: remote). Remote mode
+reads a comma-separated list of servers from NPC_BACKEND_URLS (falling back to
+NPC_BACKEND_URL) and picks one per request with NPC_BACKEND_STRATEGY
+(least_outstanding or p2c).
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BACKEND_MODE = os.getenv("NPC_BACKEND_MODE", "remote")
+BACKEND_URL = os.getenv("NPC_BACKEND_URL", "http://127.0.0.1:8002")
+BACKEND_URLS = [url.strip() for url in os.getenv("NPC_BACKEND_URLS", BACKEND_URL).split(",") if url.strip()]
+BACKEND_STRATEGY = os.getenv("NPC_BACKEND_STRATEGY", "least_outstanding")
+BACKEND_POOL_SIZE = int(os.getenv("NPC_BACKEND_POOL_SIZE", "32"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("NPC_HEALTH_CHECK_INTERVAL", "5"))
+# Consecutive failures before an upstream is ejected, and the ejection backoff (seconds)
+EJECT_AFTER_FAILURES = 2
+EJECT_BASE_SECONDS = 1.0
+EJECT_MAX_SECONDS = 60.0
+# The backoff only starts over once an upstream has served requests for this long since its last ejection
+EJECTION_MEMORY_SECONDS = 2 * EJECT_MAX_SECONDS
+# (connect, read) timeouts in seconds
+CHAT_TIMEOUT = (3.05, 30)
+STATUS_TIMEOUT = (1, 5)
+
+class BackendError(Exception):
+    """A generation failure that maps onto an HTTP status for the web client"""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+def create_backend_session(pool_size: int = BACKEND_POOL_SIZE) -> requests.Session:
+    """Create a keep-alive session for talking to the generation backend.
+
+    The underlying urllib3 connection pool is thread-safe, so a single session is
+    shared by all Flask worker threads. Up to pool_size connections per upstream
+    are kept alive. The pool does not block: a burst beyond that opens extra
+    connections, closed after use, rather than leaving requests waiting with no
+    timeout for a pooled one.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class Upstream:
+    """One main_groq.py instance and its load/health bookkeeping"""
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.failed_probes = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def __repr__(self):
+        return f"Upstream({self.url!r}, outstanding={self.outstanding}, ejections={self.ejections})"
+
+class UpstreamPool:
+    """Pick an upstream per request and eject failing ones with exponential backoff.
+
+    An ejected upstream stays out until its backoff expires, whatever its
+    /health says: a passing probe doesn't prove /generate works. Back in
+    rotation, it is ejected again for twice as long after one more failure,
+    until it has served requests for EJECTION_MEMORY_SECONDS.
+
+    Requests carrying an affinity key (the player's user_id) are pinned to an
+    upstream by rendezvous hashing, so a player keeps hitting the same
+    history-aware backend and only moves when that backend is ejected. Other
+    requests use least-outstanding-requests or power-of-two-choices.
+    """
+    STRATEGIES = ("least_outstanding", "p2c")
+
+    def __init__(self, urls: List[str], strategy: str = BACKEND_STRATEGY, session: requests.Session = None,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        if not urls:
+            raise ValueError("UpstreamPool needs at least one upstream URL")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown NPC_BACKEND_STRATEGY '{strategy}' (expected one of {', '.join(self.STRATEGIES)})")
+        self.upstreams = [Upstream(url.rstrip("/")) for url in urls]
+        self.strategy = strategy
+        self.session = session or create_backend_session()
+        self.health_check_interval = health_check_interval
+        self.lock = threading.Lock()
+        self._health_thread = None
+
+    def _candidates(self, exclude: Optional[Upstream]) -> List[Upstream]:
+        now = time.monotonic()
+        candidates = [up for up in self.upstreams if up is not exclude and up.is_available(now)]
+        if not candidates:
+            # Everything is ejected: fail open rather than refusing all traffic
+            candidates = [up for up in self.upstreams if up is not exclude] or self.upstreams
+        return candidates
+
+    @staticmethod
+    def _affinity_score(affinity_key: str, upstream: Upstream) -> bytes:
+        return hashlib.md5(f"{affinity_key}|{upstream.url}".encode("utf-8")).digest()
+
+    def acquire(self, affinity_key: Optional[str] = None, exclude: Optional[Upstream] = None) -> Upstream:
+        """Choose an upstream and count the request as outstanding on it"""
+        with self.lock:
+            candidates = self._candidates(exclude)
+            if affinity_key:
+                upstream = max(candidates, key=lambda up: self._affinity_score(affinity_key, up))
+            elif self.strategy == "p2c" and len(candidates) > 2:
+                upstream = min(random.sample(candidates, 2), key=lambda up: up.outstanding)
+            else:
+                fewest = min(up.outstanding for up in candidates)
+                upstream = random.choice([up for up in candidates if up.outstanding == fewest])
+            upstream.outstanding += 1
+            return upstream
+
+    def release(self, upstream: Upstream, ok: bool):
+        """Finish a request on `upstream`, recording whether the upstream itself failed"""
+        with self.lock:
+            upstream.outstanding -= 1
+            if ok:
+                upstream.consecutive_failures = 0
+                if upstream.ejections and time.monotonic() >= upstream.ejected_until + EJECTION_MEMORY_SECONDS:
+                    upstream.ejections = 0
+            else:
+                upstream.consecutive_failures += 1
+                self._maybe_eject(upstream, upstream.consecutive_failures, "failures")
+
+    def _maybe_eject(self, upstream: Upstream, failures: int, what: str):
+        now = time.monotonic()
+        if failures >= EJECT_AFTER_FAILURES and upstream.is_available(now):
+            backoff = min(EJECT_MAX_SECONDS, EJECT_BASE_SECONDS * 2 ** upstream.ejections)
+            upstream.ejections += 1
+            upstream.ejected_until = now + backoff
+            print(f"⚠️  Ejecting {upstream.url} for {backoff:.1f}s after {failures} {what}")
+
+    def check_health(self):
+        """Probe every upstream's /health once, ejecting those that keep failing.
+
+        Probes only take upstreams out: request failures are tracked separately,
+        so a passing probe neither re-admits an ejected upstream nor hides
+        failing requests.
+        """
+        for upstream in self.upstreams:
+            try:
+                ok = self.session.get(f"{upstream.url}/health", timeout=STATUS_TIMEOUT).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            with self.lock:
+                if ok:
+                    upstream.failed_probes = 0
+                else:
+                    upstream.failed_probes += 1
+                    self._maybe_eject(upstream, upstream.failed_probes, "failed health checks")
+
+    def start_health_checks(self):
+        """Run check_health every health_check_interval seconds in a daemon thread"""
+        if self._health_thread:
+            return
+
+        def loop():
+            while True:
+                self.check_health()
+                time.sleep(self.health_check_interval)
+
+        self._health_thread = threading.Thread(target=loop, name="upstream-health", daemon=True)
+        self._health_thread.start()
+
+    @property
+    def health_checks_running(self) -> bool:
+        return self._health_thread is not None
+
+    def any_available(self) -> bool:
+        now = time.monotonic()
+        return any(up.is_available(now) for up in self.upstreams)
+
+class RemoteBackend:
+    """Proxy to one or more main_groq.py servers over HTTP"""
+    mode = "remote"
+
+    def __init__(self, base_urls: Union[str, List[str]] = BACKEND_URLS, session: requests.Session = None,
+                 strategy: str = BACKEND_STRATEGY):
+        if isinstance(base_urls, str):
+            base_urls = [url.strip() for url in base_urls.split(",") if url.strip()]
+        self.pool = UpstreamPool(base_urls, strategy=strategy, session=session)
+        self.session = self.pool.session
+        if len(self.pool.upstreams) > 1:
+            self.pool.start_health_checks()
+
+    def generate(self, payload: Dict, affinity_key: Optional[str] = None) -> Dict:
+        error = BackendError(503, "Cannot connect to AI service")
+        failed = None
+        # A request that could not connect never reached the upstream, so it is
+        # safe to try once more on a different one
+        for _ in range(min(2, len(self.pool.upstreams))):
+            upstream = self.pool.acquire(affinity_key, exclude=failed)
+            try:
+                response = self.session.post(f"{upstream.url}/generate", json=payload, timeout=CHAT_TIMEOUT)
+            except requests.exceptions.ReadTimeout:
+                self.pool.release(upstream, ok=False)
+                raise BackendError(408, "Request timed out")
+            except requests.exceptions.ConnectionError as e:
+                self.pool.release(upstream, ok=False)
+                if isinstance(e, requests.exceptions.ConnectTimeout):
+                    error = BackendError(408, "Request timed out")
+                failed = upstream
+                continue
+            self.pool.release(upstream, ok=response.status_code < 500)
+            if response.status_code != 200:
+                raise BackendError(500, f"API Error: {response.status_code}")
+            return response.json()
+        raise error
+
+    def is_healthy(self) -> bool:
+        if self.pool.health_checks_running:
+            return self.pool.any_available()
+        try:
+            return self.session.get(f"{self.pool.upstreams[0].url}/health", timeout=STATUS_TIMEOUT).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+class EmbeddedBackend:
+    """Run main_groq.py's generation core inside this process.
+
+    Coroutines are submitted to one background event loop, so every chat shares
+    main_groq's aiohttp session and rate limiter exactly like the server does.
+    """
+    mode = "embedded"
+
+    def __init__(self):
+        import main_groq
+        from fastapi import HTTPException
+        from pydantic import ValidationError
+
+        self.core = main_groq
+        self.http_exception = HTTPException
+        self.validation_error = ValidationError
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="embedded-generation", daemon=True).start()
+
+    def generate(self, payload: Dict, affinity_key: Optional[str] = None) -> Dict:
+        try:
+            request = self.core.GenerateRequest(**payload)
+        except self.validation_error:
+            # Same status the remote server would answer with
+            raise BackendError(500, "API Error: 422")
+
+        future = asyncio.run_coroutine_threadsafe(self.core.generate_reply(request), self.loop)
+        try:
+            result = future.result(timeout=CHAT_TIMEOUT[1])
+        except FutureTimeoutError:
+            future.cancel()
+            raise BackendError(408, "Request timed out")
+        except self.http_exception as e:
+            raise BackendError(500, f"API Error: {e.status_code}")
+        return {"npc": result.npc, "reply": result.reply}
+
+    def is_healthy(self) -> bool:
+        return self.loop.is_running()
+
+    def close(self):
+        """Close the shared HTTP session and stop the background loop"""
+        asyncio.run_coroutine_threadsafe(self.core.close_http_session(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+def create_backend(mode: str = BACKEND_MODE):
+    """Build the backend selected by NPC_BACKEND_MODE"""
+    if mode == "embedded":
+        return EmbeddedBackend()
+    if mode == "remote":
+        return RemoteBackend()
+    raise ValueError(f"Unknown NPC_BACKEND_MODE '{mode}' (expected 'remote' or 'embedded')")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized HTTP responses for AI NPC Dialogue Generator
+Static JSON and templates are encoded and compressed (gzip, plus brotli when
+the Brotli package is installed) once, tagged with strong ETags, and then served
+as-is with an optional Cache-Control header. Conditional requests
+(If-None-Match) get a 304. Works with both the Flask apps and the FastAPI server.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content that only changes between deploys: browsers revalidate after 5 minutes,
+# shared caches (Vercel's edge) keep it for a day. A deploy purges the edge cache.
+STATIC_CACHE_CONTROL = "public, max-age=300, s-maxage=86400, stale-while-revalidate=60"
+# Content that can change at any time: always revalidate with the ETag
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+class CachedResponse:
+    """An immutable response body with its compressed variants and strong ETags"""
+
+    def __init__(self, body: bytes, content_type: str = "application/json", cache_control: Optional[str] = None):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.br_body = brotli.compress(body, quality=11) if brotli else None
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # Each content-coding is a different representation, so it gets its own strong ETag
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.etags = {None: self.etag, "gzip": f'"{digest}-gzip"', "br": f'"{digest}-br"'}
+
+    @classmethod
+    def from_json(cls, data: Any, cache_control: Optional[str] = None) -> "CachedResponse":
+        return cls(json.dumps(data, separators=(",", ":")).encode("utf-8"), cache_control=cache_control)
+
+    @classmethod
+    def from_html(cls, html: str, cache_control: Optional[str] = None) -> "CachedResponse":
+        return cls(html.encode("utf-8"), content_type="text/html; charset=utf-8", cache_control=cache_control)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if the client's If-None-Match already names one of our representations"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(etag in tags for etag in self.etags.values())
+
+    def select_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if self.br_body is not None and accepts_encoding(accept_encoding, "br"):
+            return "br"
+        if accepts_encoding(accept_encoding, "gzip"):
+            return "gzip"
+        return None
+
+    def negotiate(self, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Return (status, headers, body) for a request with the given headers"""
+        encoding = self.select_encoding(accept_encoding)
+        headers = {"ETag": self.etags[encoding], "Vary": "Accept-Encoding"}
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+        if self.matches(if_none_match):
+            return 304, headers, b""
+
+        headers["Content-Type"] = self.content_type
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        body = {None: self.body, "gzip": self.gzip_body, "br": self.br_body}[encoding]
+        return 200, headers, body
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Check an Accept-Encoding header for `encoding`, honouring q=0"""
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+def flask_response(cached: CachedResponse):
+    """Serve a CachedResponse from inside a Flask view"""
+    from flask import Response, request
+
+    status, headers, body = cached.negotiate(request.headers.get("If-None-Match"),
+                                             request.headers.get("Accept-Encoding"))
+    response = Response(body, status=status)
+    response.headers.update(headers)
+    return response
+
+_template_cache: Dict[Tuple[str, str], CachedResponse] = {}
+_template_lock = threading.Lock()
+
+def cached_template(template_name: str, cache_control: Optional[str] = STATIC_CACHE_CONTROL, **context) -> CachedResponse:
+    """Render a Flask template the first time it is requested and keep the result.
+
+    Only for templates whose output depends on nothing but deploy-time data.
+    """
+    from flask import current_app, render_template
+
+    key = (current_app.name, template_name)
+    cached = _template_cache.get(key)
+    if cached is None:
+        with _template_lock:
+            cached = _template_cache.get(key)
+            if cached is None:
+                cached = CachedResponse.from_html(render_template(template_name, **context), cache_control)
+                _template_cache[key] = cached
+    return cached
+
+def starlette_response(cached: CachedResponse, request):
+    """Serve a CachedResponse from a FastAPI/Starlette endpoint"""
+    from starlette.responses import Response
+
+    status, headers, body = cached.negotiate(request.headers.get("if-none-match"),
+                                             request.headers.get("accept-encoding"))
+    return Response(body, status_code=status, headers=headers)
@@ -1,13 +1,21 @@
 import os
 import asyncio
-from typing import Optional, Dict, Any, List
-from fastapi import FastAPI, HTTPException
+import json
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, AsyncIterator
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from aiohttp import ClientSession, ClientError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, validator
+from aiohttp import ClientSession, ClientError, TCPConnector
 from dotenv import load_dotenv
 import time
 
+from character_registry import sample_npcs as registry_sample_npcs
+from conversation import MAX_HISTORY_TURNS, MAX_TURN_TEXT
+from http_cache import CachedResponse, starlette_response
+
 load_dotenv('.env')
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -16,13 +24,23 @@ if not GROQ_API_KEY:
     print("Please set your Groq API key in the .env file:")
     print("GROQ_API_KEY=your_api_key_here")
     # Use a fallback key for testing (you should replace this with your actual key)
-                  GROQ_API_KEY = "your_api_key_here"
+    GROQ_API_KEY = "your_api_key_here"
 
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 
-# Rate limiting for Groq (much higher limits)
+# Rate limiting for Groq (much higher limits). The limit is per process:
+# start_web.py --production splits the account's budget across its workers.
 request_times = []
-MAX_REQUESTS_PER_MINUTE = 100  # Groq has much higher limits
+MAX_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_MAX_REQUESTS_PER_MINUTE", "100"))
+
+# Server-side conversation sessions (see ConversationSessions)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+# /ws/chat: conversations one connection may hold, and id lengths that keep
+# "<session_id>:<conversation_id>" within GenerateRequest.session_id's 64 characters
+WS_MAX_CONVERSATIONS = int(os.getenv("WS_MAX_CONVERSATIONS", "16"))
+WS_SESSION_ID_LENGTH = 32
+WS_CONVERSATION_ID_LENGTH = 31
 
 # --- Example Dialogue Snippets for Few-Shot Prompting ---
 FEW_SHOT_EXAMPLES = {
@@ -43,15 +61,21 @@ FEW_SHOT_EXAMPLES = {
 # --- Pydantic Models for Data Validation ---
 class ConversationTurn(BaseModel):
     speaker: str = Field(..., max_length=32)
-    text: str = Field(..., max_length=512)
+    text: str = Field(..., max_length=MAX_TURN_TEXT)
 
 class GenerateRequest(BaseModel):
     character_name: str = Field(..., max_length=32)
     character_type: str = Field(..., max_length=64)
     traits: str = Field(..., max_length=256)
-    player_input: str = Field(..., max_length=512)
-    conversation_history: Optional[List[ConversationTurn]] = Field(default=None, max_items=10)
+    player_input: str = Field(..., max_length=MAX_TURN_TEXT)
+    conversation_history: Optional[List[ConversationTurn]] = Field(default=None, max_items=MAX_HISTORY_TURNS)
     model: Optional[str] = Field(default="llama3-8b-8192", max_length=32)  # Add model parameter
+    # With a session_id the server keeps the history: send conversation_history
+    # only to start or resync a session, and just player_input otherwise. An
+    # unknown session_id starts a new session, unless resume says the client
+    # has talked in it before (then 409: resend conversation_history).
+    session_id: Optional[str] = Field(default=None, min_length=8, max_length=64)
+    resume: bool = False
 
     @validator('character_name', 'character_type', 'traits', 'player_input')
     def no_prompt_injection(cls, v):
@@ -73,30 +97,73 @@ class GenerateResponse(BaseModel):
     npc: str
     reply: str
 
+# --- Conversation Sessions ---
+class SessionExpired(Exception):
+    """The client referenced a session this server does not have"""
+
+class ConversationSessions:
+    """Turn history per session_id, kept in memory with idle expiry and LRU eviction.
+
+    Only the last MAX_HISTORY_TURNS turns are kept, so memory per session and
+    prompt size stay bounded however long a conversation runs. Sessions live in
+    one server process; a client resuming a session that is gone (expired,
+    evicted, restarted or routed to another instance) gets a 409 and resyncs
+    by sending its own history once.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS,
+                 max_turns: int = MAX_HISTORY_TURNS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # session_id -> (last_used, turns)
+
+    def _expire(self, now: float):
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def history(self, session_id: str, resync: Optional[List[ConversationTurn]],
+                create: bool = False) -> List[ConversationTurn]:
+        """The session's turns; `resync` (when sent) replaces them.
+
+        An unknown session_id raises SessionExpired, or starts an empty session with create.
+        """
+        now = time.monotonic()
+        self._expire(now)
+        if resync is not None:
+            turns = list(resync[-self.max_turns:])
+        elif session_id in self._sessions:
+            turns = self._sessions[session_id][1]
+        elif create:
+            turns = []
+        else:
+            raise SessionExpired(session_id)
+        self._sessions[session_id] = (now, turns)
+        self._sessions.move_to_end(session_id)
+        self._expire(now)
+        return turns
+
+    def append(self, session_id: str, *turns: ConversationTurn):
+        now = time.monotonic()
+        _, history = self._sessions.pop(session_id, (now, []))
+        self._sessions[session_id] = (now, (history + list(turns))[-self.max_turns:])
+        self._expire(now)
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+sessions = ConversationSessions()
+
 # --- Sample NPCs ---
-sample_npcs = [
-    {
-        "name": "Drogun",
-        "role": "Gruff Blacksmith",
-        "traits": "Gruff, impatient, values hard work, speaks in short sentences",
-        "backstory": "Once a renowned warrior, now forges weapons for the worthy.",
-        "scenario": "The player approaches Drogun's forge, seeking a weapon."
-    },
-    {
-        "name": "Lira",
-        "role": "Enthusiastic Potion Seller",
-        "traits": "Cheerful, talkative, always tries to upsell, uses lots of exclamations",
-        "backstory": "Inherited the shop from her grandmother, loves helping adventurers.",
-        "scenario": "The player enters Lira's shop, looking for a healing potion."
-    },
-    {
-        "name": "Eldrin",
-        "role": "Mysterious Forest Hermit",
-        "traits": "Cryptic, wise, speaks in riddles, calm demeanor",
-        "backstory": "Lives alone in the woods, rumored to know ancient secrets.",
-        "scenario": "The player seeks Eldrin's advice about a strange artifact."
-    },
-]
+sample_npcs = registry_sample_npcs()
+SAMPLE_NPCS_RESPONSE = CachedResponse.from_json({"npcs": sample_npcs})
 
 # --- FastAPI Application Instance ---
 app = FastAPI(
@@ -115,7 +182,7 @@ app.add_middleware(
 )
 
 # --- Prompt Construction ---
-def build_system_prompt(request: GenerateRequest) -> str:
+def build_system_prompt(request: GenerateRequest, history: Optional[List[ConversationTurn]] = None) -> str:
     prompt_parts = [
         f"You are '{request.character_name}', a {request.character_type}.",
         f"Your personality and speech patterns: {request.traits}.",
@@ -131,9 +198,11 @@ def build_system_prompt(request: GenerateRequest) -> str:
             prompt_parts.append(f"{ex_in}\n{ex_out}")
     
     # Add conversation history
-    if request.conversation_history:
+    if history is None:
+        history = request.conversation_history
+    if history:
         prompt_parts.append("Conversation so far:")
-        for turn in request.conversation_history[-5:]:
+        for turn in history[-5:]:
             prompt_parts.append(f"{turn.speaker}: {turn.text}")
     
     prompt_parts.append(f"Player: {request.player_input}")
@@ -141,8 +210,29 @@ def build_system_prompt(request: GenerateRequest) -> str:
     
     return "\n".join(prompt_parts)
 
+# --- Shared HTTP Client ---
+# One keep-alive aiohttp session per event loop (the server has one loop; an
+# embedding process such as web_interface.py runs its own background loop).
+_http_sessions: Dict[asyncio.AbstractEventLoop, ClientSession] = {}
+
+def get_http_session() -> ClientSession:
+    """Return the aiohttp session for the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    session = _http_sessions.get(loop)
+    if session is None or session.closed:
+        session = ClientSession(connector=TCPConnector(limit=100, keepalive_timeout=30))
+        _http_sessions[loop] = session
+    return session
+
+@app.on_event("shutdown")
+async def close_http_session():
+    session = _http_sessions.pop(asyncio.get_running_loop(), None)
+    if session:
+        await session.close()
+
 # --- Groq API Call with Async Retry ---
-async def call_groq_api_with_retry(prompt: str, model: str = "llama3-8b-8192") -> Optional[Dict[str, Any]]:
+async def wait_for_rate_limit():
+    """Sleep if this minute's request budget is spent, then count one request"""
     global request_times
     current_time = time.time()
     request_times = [t for t in request_times if current_time - t < 60]
@@ -155,48 +245,124 @@ async def call_groq_api_with_retry(prompt: str, model: str = "llama3-8b-8192") -
     
     # Add current request
     request_times.append(current_time)
+
+def completion_request(prompt: str, model: str, stream: bool = False) -> tuple:
+    """Headers and payload for a Groq chat completion"""
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
     
-    async with ClientSession() as session:
-        retries = 0
-        while retries < 3:
-            try:
-                headers = {
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": model,  # Use the specified model
-                    "messages": [
-                        {"role": "system", "content": "You are an AI assistant that roleplays as NPCs in a game."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 150,
-                    "temperature": 0.8
-                }
-                
-                async with session.post(GROQ_API_URL, json=payload, headers=headers, timeout=30) as response:
-                    if response.status == 429:
-                        wait_time = min(60, 2 ** retries)
-                        print(f"Rate limited. Waiting {wait_time} seconds...")
-                        await asyncio.sleep(wait_time)
-                        retries += 1
-                        continue
-                    response.raise_for_status()
-                    result = await response.json()
-                    return result
-            except ClientError as e:
-                wait_time = min(30, 2 ** retries)
-                print(f"API call failed: {e}. Retrying in {wait_time} seconds...")
+    payload = {
+        "model": model,  # Use the specified model
+        "messages": [
+            {"role": "system", "content": "You are an AI assistant that roleplays as NPCs in a game."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 150,
+        "temperature": 0.8
+    }
+    if stream:
+        payload["stream"] = True
+    return headers, payload
+
+async def call_groq_api_with_retry(prompt: str, model: str = "llama3-8b-8192") -> Optional[Dict[str, Any]]:
+    await wait_for_rate_limit()
+    
+    session = get_http_session()
+    headers, payload = completion_request(prompt, model)
+    retries = 0
+    while retries < 3:
+        try:
+            async with session.post(GROQ_API_URL, json=payload, headers=headers, timeout=30) as response:
+                if response.status == 429:
+                    wait_time = min(60, 2 ** retries)
+                    print(f"Rate limited. Waiting {wait_time} seconds...")
+                    await asyncio.sleep(wait_time)
+                    retries += 1
+                    continue
+                response.raise_for_status()
+                result = await response.json()
+                return result
+        except ClientError as e:
+            wait_time = min(30, 2 ** retries)
+            print(f"API call failed: {e}. Retrying in {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+            retries += 1
+    print("Max retries exceeded. API call failed.")
+    return None
+
+async def open_groq_stream(prompt: str, model: str = "llama3-8b-8192"):
+    """Start a streaming completion with the same retries; returns the open response or None.
+
+    The caller reads it with iter_completion_deltas and must release it.
+    """
+    await wait_for_rate_limit()
+    
+    session = get_http_session()
+    headers, payload = completion_request(prompt, model, stream=True)
+    retries = 0
+    while retries < 3:
+        try:
+            response = await session.post(GROQ_API_URL, json=payload, headers=headers, timeout=30)
+            if response.status == 429:
+                response.release()
+                wait_time = min(60, 2 ** retries)
+                print(f"Rate limited. Waiting {wait_time} seconds...")
                 await asyncio.sleep(wait_time)
                 retries += 1
-        print("Max retries exceeded. API call failed.")
+                continue
+            if response.status != 200:
+                response.release()
+            response.raise_for_status()
+            return response
+        except ClientError as e:
+            wait_time = min(30, 2 ** retries)
+            print(f"API call failed: {e}. Retrying in {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+            retries += 1
+    print("Max retries exceeded. API call failed.")
+    return None
+
+# What reading a streamed completion raises when the upstream fails mid-reply
+STREAM_ERRORS = (ClientError, ValueError, KeyError, IndexError)
+
+async def iter_completion_deltas(response) -> AsyncIterator[str]:
+    """Yield the text pieces of a streamed (server-sent events) completion"""
+    async for line in response.content:
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[len(b"data:"):].strip()
+        if data == b"[DONE]":
+            break
+        delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+# --- Generation Core ---
+def session_history(request: GenerateRequest) -> Optional[List[ConversationTurn]]:
+    """The stored history for request.session_id (None without a session); 409 if a resumed one is gone"""
+    if not request.session_id:
         return None
+    try:
+        return sessions.history(request.session_id, request.conversation_history, create=not request.resume)
+    except SessionExpired:
+        raise HTTPException(status_code=409, detail="Unknown or expired session_id; resend with conversation_history to resync.")
 
-# --- Endpoint ---
-@app.post("/generate", response_model=GenerateResponse)
-async def generate_dialogue(request: GenerateRequest):
-    system_prompt = build_system_prompt(request)
+def remember_turn(request: GenerateRequest, reply: str):
+    if request.session_id:
+        sessions.append(request.session_id,
+                        ConversationTurn(speaker="Player", text=request.player_input),
+                        ConversationTurn(speaker=request.character_name, text=reply[:MAX_TURN_TEXT]))
+
+async def generate_reply(request: GenerateRequest) -> GenerateResponse:
+    """Build the prompt, call Groq and parse the reply.
+
+    Shared by the /generate endpoint and by in-process callers (web_interface.py
+    embedded mode), so both use the same HTTP session and rate limiter.
+    """
+    system_prompt = build_system_prompt(request, session_history(request))
     print(f"Generated Prompt:\n---\n{system_prompt}\n---")
     print(f"Using Model: {request.model}")
     
@@ -214,20 +380,210 @@ async def generate_dialogue(request: GenerateRequest):
         if not generated_text:
             raise HTTPException(status_code=500, detail="The AI model returned an empty response.")
         
-        return GenerateResponse(npc=request.character_name, reply=generated_text.strip())
+        reply = generated_text.strip()
+        remember_turn(request, reply)
+        return GenerateResponse(npc=request.character_name, reply=reply)
     except (IndexError, KeyError) as e:
         print(f"Error parsing API response: {e}")
         raise HTTPException(status_code=500, detail="Could not parse the AI model's response.")
 
+# --- Endpoint ---
+@app.post("/generate", response_model=GenerateResponse)
+async def generate_dialogue(request: GenerateRequest):
+    return await generate_reply(request)
+
+async def start_reply_stream(request: GenerateRequest) -> AsyncIterator[str]:
+    """Open a streamed reply; returns an iterator over its pieces as they are generated.
+
+    Errors (expired session, failed upstream) raise HTTPException here, before
+    anything has been streamed. The turn is remembered once the reply is complete;
+    if the upstream fails mid-reply the iterator re-raises (one of STREAM_ERRORS)
+    and nothing is remembered. Shared by /generate/stream and /ws/chat.
+    """
+    system_prompt = build_system_prompt(request, session_history(request))
+    print(f"Generated Prompt:\n---\n{system_prompt}\n---")
+    print(f"Using Model: {request.model}")
+    
+    response = await open_groq_stream(system_prompt, request.model)
+    if response is None:
+        raise HTTPException(status_code=500, detail="Failed to get a response from the AI model after multiple retries.")
+    
+    async def reply_stream():
+        parts = []
+        try:
+            async for delta in iter_completion_deltas(response):
+                parts.append(delta)
+                yield delta
+        except STREAM_ERRORS as e:
+            # Re-raise so the client sees a cut-off reply rather than a short one
+            print(f"Error reading streamed response: {e}")
+            raise
+        finally:
+            response.release()
+        reply = "".join(parts).strip()
+        if reply:
+            remember_turn(request, reply)
+    
+    return reply_stream()
+
+@app.post("/generate/stream")
+async def generate_dialogue_stream(request: GenerateRequest):
+    """Like /generate, but streams the reply as plain text while it is generated"""
+    return StreamingResponse(await start_reply_stream(request), media_type="text/plain; charset=utf-8")
+
+# --- WebSocket Chat ---
+class ChatConnection:
+    """One /ws/chat connection: a player session carrying several NPC conversations.
+
+    Client messages (JSON text frames), each naming a conversation_id:
+        {"type": "start", "conversation_id", "character_name", "character_type",
+         "traits", "model"?, "conversation_history"?}
+        {"type": "say", "conversation_id", "player_input"}
+        {"type": "end", "conversation_id"}
+    Server messages: "session" on connect, then "started", "token" (one piece
+    of a reply), "done" (the whole reply), "ended" and "error" (with the HTTP
+    status /generate would have used, or 502 for a reply cut off mid-stream),
+    all tagged with conversation_id.
+
+    History is kept server-side in `sessions` under "<session_id>:<conversation_id>",
+    so a client that reconnects with ?session_id= and starts a conversation
+    again without history resumes it. Each conversation runs one turn at a time
+    (a "say" while one is in progress gets a 429 error); different conversations
+    stream at the same time.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.profiles: Dict[str, Dict[str, Any]] = {}  # conversation_id -> character fields and model
+        self.turns: Dict[str, asyncio.Task] = {}  # conversation_id -> turn in progress
+        self.send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        async with self.send_lock:
+            await self.websocket.send_json(message)
+
+    async def error(self, conversation_id: Optional[str], status: int, detail: Any):
+        await self.send({"type": "error", "conversation_id": conversation_id, "status": status, "detail": detail})
+
+    def session_key(self, conversation_id: str) -> str:
+        return f"{self.session_id}:{conversation_id}"
+
+    async def handle(self, message: Dict[str, Any]):
+        conversation_id = message.get("conversation_id")
+        if not isinstance(conversation_id, str) or not 1 <= len(conversation_id) <= WS_CONVERSATION_ID_LENGTH:
+            await self.error(None, 422, f"conversation_id must be a string of 1-{WS_CONVERSATION_ID_LENGTH} characters")
+        elif message.get("type") == "start":
+            await self.start(conversation_id, message)
+        elif message.get("type") == "say":
+            if conversation_id in self.turns:
+                await self.error(conversation_id, 429, "A reply in this conversation is still in progress.")
+                return
+            task = asyncio.create_task(self.say(conversation_id, message.get("player_input")))
+            self.turns[conversation_id] = task
+            task.add_done_callback(lambda done: self.turns.pop(conversation_id, None)
+                                   if self.turns.get(conversation_id) is done else None)
+        elif message.get("type") == "end":
+            self.profiles.pop(conversation_id, None)
+            sessions.discard(self.session_key(conversation_id))
+            await self.send({"type": "ended", "conversation_id": conversation_id})
+        else:
+            await self.error(conversation_id, 422, "type must be start, say or end")
+
+    async def start(self, conversation_id: str, message: Dict[str, Any]):
+        if conversation_id not in self.profiles and len(self.profiles) >= WS_MAX_CONVERSATIONS:
+            await self.error(conversation_id, 429, f"At most {WS_MAX_CONVERSATIONS} conversations per connection")
+            return
+        profile = {field: message.get(field) for field in ("character_name", "character_type", "traits")}
+        profile["model"] = message.get("model") or "llama3-8b-8192"
+        try:
+            # Check the character (and any history) now rather than on the first line
+            request = GenerateRequest(**profile, player_input="", session_id=self.session_key(conversation_id),
+                                      conversation_history=message.get("conversation_history"))
+        except ValidationError as e:
+            await self.error(conversation_id, 422, validation_detail(e))
+            return
+        key = self.session_key(conversation_id)
+        try:
+            history = sessions.history(key, request.conversation_history)
+            resumed = request.conversation_history is None
+        except SessionExpired:
+            history = sessions.history(key, [])
+            resumed = False
+        self.profiles[conversation_id] = profile
+        await self.send({"type": "started", "conversation_id": conversation_id, "resumed": resumed, "turns": len(history)})
+
+    async def say(self, conversation_id: str, player_input: Any):
+        if conversation_id not in self.profiles:
+            await self.error(conversation_id, 404, "Unknown conversation_id; send a start message first.")
+            return
+        try:
+            request = GenerateRequest(**self.profiles[conversation_id], player_input=player_input,
+                                      session_id=self.session_key(conversation_id), resume=True)
+            deltas = await start_reply_stream(request)
+        except ValidationError as e:
+            await self.error(conversation_id, 422, validation_detail(e))
+            return
+        except HTTPException as e:
+            await self.error(conversation_id, e.status_code, e.detail)
+            return
+        parts = []
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                await self.send({"type": "token", "conversation_id": conversation_id, "text": delta})
+        except STREAM_ERRORS:
+            await self.error(conversation_id, 502, "The AI model's reply was cut off; the turn was not saved.")
+            return
+        finally:
+            # Releases the upstream response if the client left mid-reply
+            await deltas.aclose()
+        await self.send({"type": "done", "conversation_id": conversation_id,
+                         "npc": request.character_name, "reply": "".join(parts).strip()})
+
+def validation_detail(error: ValidationError) -> List[Dict[str, Any]]:
+    """JSON-safe summary of a validation error, like FastAPI's 422 detail"""
+    return [{"loc": list(item["loc"]), "msg": item["msg"]} for item in error.errors()]
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket, session_id: Optional[str] = None):
+    """Chat with any number of NPCs over one connection (see ChatConnection)"""
+    await websocket.accept()
+    if session_id is not None and not 8 <= len(session_id) <= WS_SESSION_ID_LENGTH:
+        await websocket.close(code=1008, reason=f"session_id must be 8-{WS_SESSION_ID_LENGTH} characters")
+        return
+    connection = ChatConnection(websocket, session_id or uuid.uuid4().hex)
+    await connection.send({"type": "session", "session_id": connection.session_id})
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            try:
+                message = json.loads(frame.get("text") or "")
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await connection.error(None, 400, "Messages must be JSON objects")
+                continue
+            await connection.handle(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        tasks = list(connection.turns.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 # --- Additional Endpoints ---
 @app.get("/")
 async def root():
     return {"message": "AI NPC Dialogue Generator (Groq Version)", "version": "3.0.0"}
 
 @app.get("/sample-npcs")
-async def get_sample_npcs():
+async def get_sample_npcs(request: Request):
     """Get sample NPC profiles for testing"""
-    return {"npcs": sample_npcs}
+    return starlette_response(SAMPLE_NPCS_RESPONSE, request)
 
 @app.get("/health")
 async def health_check():
@@ -242,7 +598,8 @@ async def health_check():
             "requests_this_minute": recent_requests,
             "max_requests_per_minute": MAX_REQUESTS_PER_MINUTE,
             "remaining_requests": max(0, MAX_REQUESTS_PER_MINUTE - recent_requests)
-        }
+        },
+        "sessions": len(sessions)
     }
 
 if __name__ == "__main__":
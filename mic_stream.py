@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+A microphone that stays open for the whole session.
+
+speech_recognition's Microphone opens and closes the audio device on every
+`with microphone as source`. That costs setup time each turn and clips the
+first syllables. MicrophoneStream opens the device once. PortAudio's
+callback thread writes every buffer into a ring buffer of the last
+MIC_BUFFER_SECONDS, and readers follow it from any recent position. A
+listener can therefore start from audio captured before it asked for it
+(pre-roll).
+
+The ring buffer has one writer and needs no lock. The writer first announces
+how far it is about to write (`writing`), then copies the samples in, and only
+then advances `written`. A reader checks `writing` before and after copying
+its range, and drops the copy if the writer got into it in the meantime.
+
+MicrophoneStream also has the attributes of a speech_recognition AudioSource
+(SAMPLE_RATE, SAMPLE_WIDTH, CHUNK, stream.read()), so it can stand in for
+sr.Microphone.
+"""
+
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+from tts_cache import get_pyaudio
+
+MIC_BUFFER_SECONDS = int(os.getenv("MIC_BUFFER_SECONDS", "30"))
+MIC_SAMPLE_RATE = 16000
+MIC_CHUNK = 1024
+
+class RingBuffer:
+    """Fixed-size int16 sample buffer addressed by absolute sample position"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        # Samples ever written; readers may use positions in [written - capacity, written)
+        self.written = 0
+        # Where the write in progress will end; ahead of written only while copying
+        self.writing = 0
+
+    def write(self, samples: np.ndarray):
+        samples = samples[-self.capacity:]
+        start = self.written % self.capacity
+        # Announce the overwrite before touching the data, so readers can tell
+        self.writing = self.written + len(samples)
+        first = min(len(samples), self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:len(samples) - first] = samples[first:]
+        self.written = self.writing
+
+    def read(self, start: int, end: int) -> Optional[bytes]:
+        """Samples [start, end) as bytes, or None if they have been (or are being) overwritten"""
+        if start < self.writing - self.capacity:
+            return None
+        first_index = start % self.capacity
+        count = end - start
+        first = min(count, self.capacity - first_index)
+        pcm = self.data[first_index:first_index + first].tobytes() + self.data[:count - first].tobytes()
+        # The writer may have started overwriting these samples while we copied
+        if start < self.writing - self.capacity:
+            return None
+        return pcm
+
+class MicrophoneStream:
+    """Always-on capture into a ring buffer; read with chunks()"""
+    SAMPLE_WIDTH = 2
+    CHUNK = MIC_CHUNK
+
+    def __init__(self, sample_rate: int = MIC_SAMPLE_RATE, device_index: Optional[int] = None,
+                 buffer_seconds: int = MIC_BUFFER_SECONDS):
+        self.requested_rate = sample_rate
+        self.device_index = device_index
+        self.buffer_seconds = buffer_seconds
+        self.SAMPLE_RATE = sample_rate
+        self.ring = None
+        self.pyaudio_stream = None
+        self.data_ready = threading.Event()
+        self.last_write_time = time.perf_counter()
+        # AudioSource compatibility: source.stream.read(source.CHUNK)
+        self.stream = self
+        self.read_position = None
+
+    def start(self):
+        """Open the device (at 16kHz if it allows, else at its own rate) and start capturing"""
+        if self.pyaudio_stream is not None:
+            return
+        import pyaudio
+        audio = get_pyaudio()
+        try:
+            self.pyaudio_stream = self._open(audio, pyaudio, self.requested_rate)
+        except (OSError, ValueError):
+            info = (audio.get_device_info_by_index(self.device_index) if self.device_index is not None
+                    else audio.get_default_input_device_info())
+            self.pyaudio_stream = self._open(audio, pyaudio, int(info["defaultSampleRate"]))
+
+    def _open(self, audio, pyaudio, rate: int):
+        self.SAMPLE_RATE = rate
+        self.ring = RingBuffer(rate * self.buffer_seconds)
+
+        def on_audio(in_data, frame_count, time_info, status):
+            self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+            self.last_write_time = time.perf_counter()
+            self.data_ready.set()
+            return None, pyaudio.paContinue
+
+        return audio.open(format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+                          input_device_index=self.device_index, frames_per_buffer=self.CHUNK,
+                          stream_callback=on_audio)
+
+    def stop(self):
+        if self.pyaudio_stream is not None:
+            self.pyaudio_stream.stop_stream()
+            self.pyaudio_stream.close()
+            self.pyaudio_stream = None
+
+    @property
+    def position(self) -> int:
+        """Absolute sample position of the newest captured audio"""
+        return self.ring.written
+
+    def position_at(self, timestamp: float) -> int:
+        """Approximate sample position captured at a time.perf_counter() timestamp"""
+        return self.ring.written - int((self.last_write_time - timestamp) * self.SAMPLE_RATE)
+
+    def chunks(self, start: Optional[int] = None, stop_event: Optional[threading.Event] = None) -> Iterator[bytes]:
+        """Yield captured PCM from sample position start (default: now) as it arrives, until stop_event"""
+        position = self.position if start is None else max(start, self.position - self.ring.capacity + self.CHUNK)
+        while stop_event is None or not stop_event.is_set():
+            self.data_ready.clear()
+            written = self.ring.written
+            if written > position:
+                pcm = self.ring.read(position, written)
+                if pcm is None:
+                    print("⚠️  Fell behind the microphone; skipping ahead")
+                    position = self.ring.written - self.CHUNK
+                    continue
+                position = written
+                yield pcm
+            else:
+                self.data_ready.wait(0.1)
+
+    # speech_recognition AudioSource interface
+    def __enter__(self):
+        self.start()
+        self.read_position = self.position
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.read_position = None
+
+    def read(self, size: int) -> bytes:
+        """Blocking read of the next size frames after the last read (AudioSource.stream.read)"""
+        if self.read_position is None:
+            self.read_position = self.position
+        while self.ring.written < self.read_position + size:
+            self.data_ready.clear()
+            if self.ring.written < self.read_position + size:
+                self.data_ready.wait(0.1)
+        pcm = self.ring.read(self.read_position, self.read_position + size)
+        while pcm is None:
+            # Fell behind: skip to the newest audio
+            self.read_position = self.ring.written - size
+            pcm = self.ring.read(self.read_position, self.read_position + size)
+        self.read_position += size
+        return pcm
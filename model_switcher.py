@@ -7,6 +7,102 @@ Allows easy switching between different Groq models
 import requests
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+from benchmark_utils import percentile
+
+DEFAULT_CHARACTER = {
+    "name": "Drogun",
+    "type": "Gruff Blacksmith",
+    "traits": "Gruff, impatient, values hard work"
+}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), the API does not return usage"""
+    return max(1, round(len(text) / 4)) if text else 0
+
+def run_generation(api_url: str, character: Dict, model_name: str, message: str, timeout: int = 30) -> Dict:
+    """Send one /generate request and time it"""
+    payload = {
+        "character_name": character["name"],
+        "character_type": character["type"],
+        "traits": character["traits"],
+        "player_input": message,
+        "model": model_name
+    }
+    start_time = time.perf_counter()
+    try:
+        response = requests.post(f"{api_url}/generate", json=payload, timeout=timeout)
+        elapsed = time.perf_counter() - start_time
+        if response.status_code == 200:
+            return {"ok": True, "time": elapsed, "reply": response.json().get("reply", "")}
+        return {"ok": False, "time": elapsed, "reply": "", "error": f"HTTP {response.status_code}"}
+    except Exception as e:
+        return {"ok": False, "time": time.perf_counter() - start_time, "reply": "", "error": str(e)}
+
+def summarize_runs(runs: List[Dict]) -> Dict:
+    """Reduce the runs of one (character, model) cell to latency percentiles and throughput"""
+    ok_runs = [run for run in runs if run["ok"]]
+    latencies = [run["time"] for run in ok_runs]
+    tokens_per_sec = [estimate_tokens(run["reply"]) / run["time"] for run in ok_runs if run["time"] > 0]
+    errors = [run["error"] for run in runs if not run["ok"]]
+    return {
+        "runs": len(runs),
+        "ok": len(ok_runs),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "tokens_per_sec": sum(tokens_per_sec) / len(tokens_per_sec) if tokens_per_sec else 0.0,
+        "reply_chars": sum(len(run["reply"]) for run in ok_runs) / len(ok_runs) if ok_runs else 0.0,
+        "sample_reply": ok_runs[0]["reply"] if ok_runs else "",
+        "last_error": errors[-1] if errors else None
+    }
+
+def benchmark_matrix(api_url: str, characters: List[Dict], models: List[str], message: str,
+                     repeats: int = 3, max_workers: int = 8) -> Dict[Tuple[str, str], Dict]:
+    """Run every character x model cell `repeats` times concurrently.
+
+    Returns a dict keyed by (character name, model name) with the summary of each cell.
+    """
+    jobs = [(character, model_name) for character in characters for model_name in models for _ in range(repeats)]
+    runs = {(character["name"], model_name): [] for character in characters for model_name in models}
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        futures = {
+            pool.submit(run_generation, api_url, character, model_name, message): (character["name"], model_name)
+            for character, model_name in jobs
+        }
+        for future in as_completed(futures):
+            runs[futures[future]].append(future.result())
+    
+    return {cell: summarize_runs(cell_runs) for cell, cell_runs in runs.items()}
+
+def print_benchmark_table(results: Dict[Tuple[str, str], Dict]):
+    """Print the per-cell latency/throughput table produced by benchmark_matrix"""
+    print("-" * 100)
+    print(f"{'Character':<12} {'Model':<20} {'OK':<7} {'p50':<8} {'p90':<8} {'p99':<8} {'tok/s':<8} {'Chars':<7} {'Response'}")
+    print("-" * 100)
+    for (char_name, model_name), cell in results.items():
+        ok_str = f"{cell['ok']}/{cell['runs']}"
+        if cell['ok']:
+            preview = cell['sample_reply'][:20] + "..." if len(cell['sample_reply']) > 20 else cell['sample_reply']
+            print(f"{char_name:<12} {model_name:<20} {ok_str:<7} {cell['p50']:<8.2f} {cell['p90']:<8.2f} "
+                  f"{cell['p99']:<8.2f} {cell['tokens_per_sec']:<8.1f} {cell['reply_chars']:<7.0f} {preview}")
+        else:
+            print(f"{char_name:<12} {model_name:<20} {ok_str:<7} {'N/A':<8} {'N/A':<8} {'N/A':<8} {'N/A':<8} {'N/A':<7} "
+                  f"❌ {cell['last_error']}")
+
+def recommend_models(results: Dict[Tuple[str, str], Dict]) -> Dict[str, str]:
+    """Pick a default model per character: most successful runs first, then lowest p50 latency"""
+    best = {}
+    for (char_name, model_name), cell in results.items():
+        if not cell["ok"]:
+            continue
+        score = (-cell["ok"] / cell["runs"], cell["p50"])
+        if char_name not in best or score < best[char_name][0]:
+            best[char_name] = (score, model_name)
+    return {char_name: model_name for char_name, (_, model_name) in best.items()}
 
 class ModelSwitcher:
     def __init__(self):
@@ -135,70 +231,21 @@ class ModelSwitcher:
             except Exception as e:
                 print(f"❌ Error: {e}")
     
-    def compare_models(self):
-        """Compare different models with the same input"""
+    def compare_models(self, repeats: int = 3, max_workers: int = 8):
+        """Compare different models with the same input, running all requests concurrently"""
         print("📊 Model Comparison Test")
         print("=" * 50)
         
         test_message = "Can you repair my sword?"
-        results = {}
+        models = [model_info['name'] for model_info in self.available_models.values()]
+        print(f"🔄 Testing {len(models)} models x {repeats} runs in parallel...")
         
-        for key, model_info in self.available_models.items():
-            model_name = model_info['name']
-            print(f"\n🔄 Testing {model_name}...")
-            
-            try:
-                payload = {
-                    "character_name": "Drogun",
-                    "character_type": "Gruff Blacksmith",
-                    "traits": "Gruff, impatient, values hard work",
-                    "player_input": test_message,
-                    "model": model_name
-                }
-                
-                start_time = time.time()
-                response = requests.post(f"{self.api_url}/generate", json=payload, timeout=30)
-                end_time = time.time()
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    reply = result.get("reply", "No response")
-                    response_time = end_time - start_time
-                    
-                    results[model_name] = {
-                        "response": reply,
-                        "time": response_time,
-                        "status": "✅ Working"
-                    }
-                    
-                    print(f"✅ Response: {reply[:50]}...")
-                    print(f"⏱️ Time: {response_time:.2f}s")
-                else:
-                    results[model_name] = {
-                        "response": "Error",
-                        "time": 0,
-                        "status": "❌ Failed"
-                    }
-                    print(f"❌ Failed: {response.status_code}")
-                    
-            except Exception as e:
-                results[model_name] = {
-                    "response": "Error",
-                    "time": 0,
-                    "status": "❌ Error"
-                }
-                print(f"❌ Error: {e}")
+        results = benchmark_matrix(self.api_url, [DEFAULT_CHARACTER], models, test_message,
+                                   repeats=repeats, max_workers=max_workers)
         
-        # Display comparison table
         print(f"\n📋 Comparison Results for: '{test_message}'")
-        print("-" * 80)
-        print(f"{'Model':<20} {'Status':<12} {'Time':<10} {'Response'}")
-        print("-" * 80)
-        
-        for model_name, result in results.items():
-            response_preview = result['response'][:30] + "..." if len(result['response']) > 30 else result['response']
-            time_str = f"{result['time']:.2f}s" if result['time'] > 0 else "N/A"
-            print(f"{model_name:<20} {result['status']:<12} {time_str:<10} {response_preview}")
+        print_benchmark_table(results)
+        return results
     
     def run(self):
         """Run the model switcher"""
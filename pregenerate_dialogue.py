@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline pre-generation of branching dialogue trees.
+
+Authored scenes don't need the LLM at runtime. This job expands every branch
+of a scenario spec ahead of time. For each scenario, the player's trigger
+lines are tried in every order up to --depth, and at every node each
+character's reaction is generated with app.py's scene prompts (prepare_scene).
+app.py then serves the tree from DIALOGUE_TREE_PATH without calling the LLM.
+
+- Bounded: at most --concurrency completions are in flight, and every
+  call waits for main_groq.py's per-minute rate limiter (--rpm).
+- Deduplicated: a node's prompts only show the scene's last few exchanges,
+  so different paths can lead to the same prompts. Such nodes are generated
+  once and shared, and so are their subtrees. Identical reply texts are
+  stored once.
+- Compact: one JSON file of interned strings and a flat node table.
+
+    {"strings": [reply, ...],
+     "nodes": [[[string index per character], {trigger: node index}], ...],
+     "scenarios": {id: {"scenario", "characters": [{"id", "name"}],
+                        "triggers": {trigger: player line}, "root": {trigger: node index}}}}
+
+A spec file has the same shape as DEFAULT_SPEC:
+{id: {"scenario": setting, "characters": [ids], "triggers": {trigger: player line}}}
+
+Usage:
+    python pregenerate_dialogue.py --depth 2 --out dialogue_tree.json
+    python pregenerate_dialogue.py --spec quests.json --depth 3 --concurrency 16
+    DIALOGUE_TREE_PATH=dialogue_tree.json python app.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+import aiohttp
+
+import app
+import main_groq
+
+DEFAULT_SPEC = {
+    "harry_vs_draco": {
+        "scenario": app.DEMO_SCENARIOS["harry_vs_draco"]["scenario"],
+        "characters": ["harry", "draco"],
+        "triggers": {
+            "insult": "You're nothing but a coward, Malfoy.",
+            "challenge": "Wands out, Malfoy. Let's settle this right now.",
+            "peace": "Can't the two of you just stop fighting?"
+        }
+    },
+    "snape_teaching": {
+        "scenario": app.DEMO_SCENARIOS["snape_teaching"]["scenario"],
+        "characters": ["snape"],
+        "triggers": {
+            "correct_answer": "A bezoar is a stone from the stomach of a goat, sir.",
+            "wrong_answer": "Is it... a potion made from dragon scales?",
+            "rule_breaking": "I was in the Restricted Section last night."
+        }
+    }
+}
+
+def load_spec(path):
+    """Read and check a scenario spec file; raises ValueError"""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict) or not spec:
+        raise ValueError("the spec must be an object of scenarios")
+    for scenario_id, scenario in spec.items():
+        if not isinstance(scenario, dict):
+            raise ValueError(f"{scenario_id}: each scenario must be an object")
+        if not isinstance(scenario.get("scenario", ""), str):
+            raise ValueError(f"{scenario_id}: scenario must be a description of the setting")
+        if not isinstance(scenario.get("characters"), list) or not scenario["characters"]:
+            raise ValueError(f"{scenario_id}: characters must be a non-empty list")
+        triggers = scenario.get("triggers")
+        if not isinstance(triggers, dict) or not triggers or not all(isinstance(line, str) for line in triggers.values()):
+            raise ValueError(f"{scenario_id}: triggers must map trigger names to player lines")
+        if "," in "".join(triggers):
+            raise ValueError(f"{scenario_id}: trigger names can't contain commas (they separate ?path=)")
+        # Anything else /api/scene would refuse (too many characters, duplicates, empty lines)
+        for line in triggers.values():
+            try:
+                app.prepare_scene({"characters": scenario["characters"], "message": line}, [])
+            except ValueError as e:
+                raise ValueError(f"{scenario_id}: {e}") from None
+    return spec
+
+class TreeBuilder:
+    """Generates scene nodes under a concurrency bound, sharing nodes with identical prompts"""
+
+    def __init__(self, session, model, concurrency):
+        self.session = session
+        self.model = model
+        self.slots = asyncio.Semaphore(concurrency)
+        self.strings = []
+        self.string_ids = {}
+        self.nodes = []
+        # Prompt digest -> task producing the node index (None if generation failed)
+        self.generated = {}
+        self.stats = {"nodes": 0, "shared": 0, "completions": 0, "failed": 0}
+
+    def intern(self, text):
+        if text not in self.string_ids:
+            self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return self.string_ids[text]
+
+    async def complete(self, messages):
+        async with self.slots:
+            await main_groq.wait_for_rate_limit()
+            self.stats["completions"] += 1
+            return await app.call_groq_api_with_retry(messages, self.model, session=self.session)
+
+    async def generate(self, participants):
+        """Every character's reaction at once; the new node's index, or None if any failed"""
+        results = await asyncio.gather(*(self.complete(messages) for _, _, messages in participants),
+                                       return_exceptions=True)
+        failures = [result for result in results if isinstance(result, Exception)]
+        if failures:
+            print(f"❌ Node failed: {failures[0]}")
+            self.stats["failed"] += 1
+            return None
+        self.nodes.append([[self.intern(reply.strip()) for reply in results], {}])
+        self.stats["nodes"] += 1
+        return len(self.nodes) - 1
+
+    async def node(self, scenario, line, history):
+        """(node index or None, reactions, whether this call created it) for the player saying line"""
+        data = {"characters": scenario["characters"], "message": line, "scene": scenario.get("scenario"),
+                "model": self.model}
+        _, _, _, _, _, participants = app.prepare_scene(data, history)
+        digest = hashlib.sha256(json.dumps([messages for _, _, messages in participants]).encode("utf-8")).hexdigest()
+        created = digest not in self.generated
+        if created:
+            self.generated[digest] = asyncio.ensure_future(self.generate(participants))
+        else:
+            self.stats["shared"] += 1
+        index = await self.generated[digest]
+        if index is None:
+            return None, [], created
+        reactions = [{"name": name, "reply": self.strings[string_id]}
+                     for (_, name, _), string_id in zip(participants, self.nodes[index][0])]
+        return index, reactions, created
+
+    async def expand(self, scenario, depth):
+        """Build one scenario's tree breadth first; returns its root {trigger: node index}"""
+        root = {}
+        frontier = [(root, [])]  # (next map to fill, scene history so far)
+        for level in range(depth):
+            branches = [(next_map, trigger, line, history)
+                        for next_map, history in frontier
+                        for trigger, line in scenario["triggers"].items()]
+            results = await asyncio.gather(*(self.node(scenario, line, history)
+                                             for _, _, line, history in branches))
+            frontier = []
+            for (next_map, trigger, line, history), (index, reactions, created) in zip(branches, results):
+                if index is None:
+                    continue
+                next_map[trigger] = index
+                # A shared node's subtree is expanded (or being expanded) by the path that created it
+                if created and level + 1 < depth:
+                    exchange = {"user": line, "ai": app.scene_exchange(reactions)}
+                    frontier.append((self.nodes[index][1], history + [exchange]))
+            print(f"   depth {level + 1}: {len(branches)} branches, {self.stats['nodes']} nodes so far")
+        return root
+
+async def build(spec, depth, model, concurrency):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        builder = TreeBuilder(session, model, concurrency)
+        scenarios = {}
+        for scenario_id, scenario in spec.items():
+            print(f"🌳 {scenario_id}: {len(scenario['characters'])} characters, "
+                  f"{len(scenario['triggers'])} triggers, depth {depth}")
+            root = await builder.expand(scenario, depth)
+            scenarios[scenario_id] = {
+                "scenario": scenario.get("scenario", ""),
+                "characters": [{"id": character_id, "name": app.lookup_character(character_id).get("name", character_id)}
+                               for character_id in scenario["characters"]],
+                "triggers": scenario["triggers"],
+                "root": root
+            }
+    tree = {"version": 1, "model": model, "depth": depth, "generated_at": int(time.time()),
+            "strings": builder.strings, "nodes": builder.nodes, "scenarios": scenarios}
+    return tree, builder.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate branching dialogue trees")
+    parser.add_argument("--spec", help="Scenario spec JSON (default: the built-in demo scenarios)")
+    parser.add_argument("--depth", type=int, default=2, help="Player lines per path")
+    parser.add_argument("--out", default="dialogue_tree.json")
+    parser.add_argument("--model", default="llama3-8b-8192")
+    parser.add_argument("--concurrency", type=int, default=8, help="Completions in flight at once")
+    parser.add_argument("--rpm", type=int, default=main_groq.MAX_REQUESTS_PER_MINUTE, help="Completions per minute")
+    args = parser.parse_args()
+
+    try:
+        spec = load_spec(args.spec) if args.spec else DEFAULT_SPEC
+    except (OSError, ValueError) as e:
+        parser.error(f"bad spec: {e}")
+    main_groq.MAX_REQUESTS_PER_MINUTE = args.rpm
+
+    start = time.perf_counter()
+    tree, stats = asyncio.run(build(spec, args.depth, args.model, args.concurrency))
+    temporary = f"{args.out}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(tree, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporary, args.out)
+
+    paths = sum(len(scenario["triggers"]) ** level for scenario in spec.values() for level in range(1, args.depth + 1))
+    print(f"✅ Wrote {args.out} ({os.path.getsize(args.out) / 1024:.1f} KB) in {time.perf_counter() - start:.1f}s: "
+          f"{stats['nodes']} nodes for {paths} paths ({stats['shared']} shared), "
+          f"{stats['completions']} completions, {len(tree['strings'])} distinct replies")
+    if stats["failed"]:
+        print(f"⚠️  {stats['failed']} nodes failed; they and their subtrees are missing from the file")
+
+if __name__ == "__main__":
+    main()
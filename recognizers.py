@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Speech recognition backends for the voice assistant.
+
+Every backend turns 16-bit mono PCM into text through the same interface, so
+the assistant and benchmarks don't care which engine is behind it:
+
+- google: speech_recognition's free Google Web Speech API (needs network)
+- vosk: offline Kaldi models on the CPU (pip install vosk, plus a model
+  directory from https://alphacephei.com/vosk/models)
+- whisper: offline Whisper on the CPU via faster-whisper (pip install faster-whisper)
+
+Select with SPEECH_RECOGNIZER=google|vosk|whisper (default: google). Local
+models are loaded once when the backend is created and warmed up with a
+short silent clip, so the first real utterance doesn't pay for it.
+"""
+
+import json
+import os
+import time
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+SPEECH_RECOGNIZER = os.getenv("SPEECH_RECOGNIZER", "google")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+SAMPLE_RATE = 16000
+
+class RecognitionError(Exception):
+    """The recognition engine failed (as opposed to hearing nothing intelligible)"""
+
+def resample_pcm16(pcm: bytes, from_rate: int, to_rate: int = SAMPLE_RATE) -> bytes:
+    """Linear-interpolation resampling of 16-bit mono PCM"""
+    if from_rate == to_rate:
+        return pcm
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    target_length = int(len(samples) * to_rate / from_rate)
+    positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16).tobytes()
+
+def read_wav(path: str, sample_rate: int = SAMPLE_RATE) -> Tuple[bytes, int]:
+    """Load a PCM WAV file as 16-bit mono at sample_rate; returns (pcm, sample_rate)"""
+    with wave.open(path, "rb") as wav:
+        channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+    samples = np.frombuffer(frames, dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return resample_pcm16(samples.tobytes(), rate, sample_rate), sample_rate
+
+def pcm_duration(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(pcm) / 2 / sample_rate
+
+class SpeechRecognizer:
+    """Base class: transcribe() 16-bit mono PCM to lower-case text ("" if nothing was understood)"""
+    name = "base"
+    sample_rate = SAMPLE_RATE
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        raise NotImplementedError
+
+    def transcribe_audio(self, audio) -> str:
+        """Transcribe a speech_recognition AudioData"""
+        return self.transcribe(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2), self.sample_rate)
+
+    def warm_up(self):
+        """Run one silent clip through the engine so its first real use is fast"""
+        self.transcribe(b"\0\0" * (self.sample_rate // 2), self.sample_rate)
+
+class GoogleRecognizer(SpeechRecognizer):
+    """speech_recognition's Google Web Speech API client; a network round trip per utterance"""
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        try:
+            return self.recognizer.recognize_google(self.sr.AudioData(pcm, sample_rate, 2)).lower()
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            raise RecognitionError(str(e))
+
+    def warm_up(self):
+        pass  # Nothing to load, and a silent request would only cost a round trip
+
+class VoskRecognizer(SpeechRecognizer):
+    """Offline Kaldi recognition; the model is loaded once and shared by every utterance"""
+    name = "vosk"
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        try:
+            from vosk import KaldiRecognizer, Model, SetLogLevel
+        except ImportError:
+            raise RecognitionError("The vosk backend needs 'pip install vosk'")
+        if not os.path.isdir(model_path):
+            raise RecognitionError(f"Vosk model not found at {model_path} (set VOSK_MODEL_PATH)")
+        SetLogLevel(-1)
+        self.kaldi_recognizer = KaldiRecognizer
+        self.model = Model(model_path)
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        recognizer = self.kaldi_recognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "").strip().lower()
+
+class WhisperRecognizer(SpeechRecognizer):
+    """Offline Whisper via faster-whisper (CTranslate2, int8 on the CPU by default)"""
+    name = "whisper"
+
+    def __init__(self, model_size: str = WHISPER_MODEL, compute_type: str = WHISPER_COMPUTE_TYPE):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RecognitionError("The whisper backend needs 'pip install faster-whisper'")
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type)
+
+    def transcribe(self, pcm: bytes, sample_rate: int = SAMPLE_RATE) -> str:
+        if sample_rate != self.sample_rate:
+            pcm = resample_pcm16(pcm, sample_rate, self.sample_rate)
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language="en", beam_size=1)
+        return "".join(segment.text for segment in segments).strip().lower()
+
+RECOGNIZERS = {
+    "google": GoogleRecognizer,
+    "vosk": VoskRecognizer,
+    "whisper": WhisperRecognizer,
+}
+
+def create_recognizer(name: Optional[str] = None, warm_up: bool = True) -> SpeechRecognizer:
+    """Build (and warm up) the backend selected by SPEECH_RECOGNIZER"""
+    name = name or SPEECH_RECOGNIZER
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Unknown SPEECH_RECOGNIZER '{name}' (expected one of {', '.join(RECOGNIZERS)})")
+    start = time.perf_counter()
+    recognizer = RECOGNIZERS[name]()
+    if warm_up:
+        recognizer.warm_up()
+    if name != "google":
+        print(f"🧠 Loaded {name} speech recognizer in {time.perf_counter() - start:.1f}s")
+    return recognizer
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Client-held conversation history for stateless chat servers.
+
+On serverless hosts each request may land on a fresh instance, so history
+kept in memory is lost. Instead the trimmed history travels with the client
+as a session token:
+
+    <base64url(zlib(json))>.<base64url(hmac-sha256)>
+
+The HMAC covers the token's context (character and user) as well as the
+payload, so a token can neither be edited nor replayed for another
+conversation. Tokens that fail verification decode to an empty history.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import zlib
+from typing import Dict, List, Optional
+
+# Keep in step with app.py's in-memory history limit
+MAX_EXCHANGES = 10
+# Refuse to inflate more than this, whatever the token claims
+MAX_DECODED_BYTES = 64 * 1024
+SIGNATURE_BYTES = 16
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(secret: str, context: str, payload: bytes) -> bytes:
+    message = context.encode("utf-8") + b"\0" + payload
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def _dump(exchanges: List[List[str]]) -> bytes:
+    return json.dumps(exchanges, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def encode_history(history: List[Dict], secret: str, context: str, max_exchanges: int = MAX_EXCHANGES) -> str:
+    """Serialize the last max_exchanges {"user", "ai"} exchanges into a signed token
+
+    The oldest exchanges are dropped until the JSON fits MAX_DECODED_BYTES,
+    so decode_history never rejects a token this function produced.
+    """
+    exchanges = [[exchange["user"], exchange["ai"]] for exchange in history[-max_exchanges:]]
+    raw = _dump(exchanges)
+    while exchanges and len(raw) > MAX_DECODED_BYTES:
+        exchanges.pop(0)
+        raw = _dump(exchanges)
+    payload = zlib.compress(raw, 9)
+    return f"{_b64encode(payload)}.{_b64encode(_sign(secret, context, payload))}"
+
+def decode_history(token: Optional[str], secret: str, context: str, max_exchanges: int = MAX_EXCHANGES) -> List[Dict]:
+    """Verify a token and return its exchanges; [] if missing, forged or malformed"""
+    if not token or not isinstance(token, str):
+        return []
+    try:
+        payload_text, signature_text = token.split(".")
+        payload = _b64decode(payload_text)
+        if not hmac.compare_digest(_b64decode(signature_text), _sign(secret, context, payload)):
+            return []
+        inflater = zlib.decompressobj()
+        raw = inflater.decompress(payload, MAX_DECODED_BYTES)
+        if inflater.unconsumed_tail:
+            return []
+        exchanges = json.loads(raw)
+        return [{"user": str(user), "ai": str(ai)} for user, ai in exchanges[-max_exchanges:]]
+    except (ValueError, TypeError, zlib.error):
+        return []
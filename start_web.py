@@ -2,24 +2,70 @@
 """
 Startup script for AI NPC Dialogue Generator Web Interface
 Runs both the API server and web interface
+
+    python start_web.py                 # development: auto-reloading servers
+    python start_web.py --production   # supervised multi-process deployment
+
+Production mode starts --api-workers main_groq.py instances on consecutive
+ports (load balanced by the web interface, see NPC_BACKEND_URLS) and serves
+web_interface.py with gunicorn. Each service only counts as up once its
+/health answers. Crashed processes are restarted with exponential backoff,
+and SIGTERM/Ctrl+C drains in-flight requests before exiting.
+
+The API workers share nothing. The Groq budget (--requests-per-minute) is
+split evenly between them, and each keeps its own server-side sessions: the
+web interface pins a player to one worker by user_id, and a client whose
+session_id lands on another worker (or on a restarted one) gets a 409 and
+resends its history. The defaults (one API worker, WEB_CONCURRENCY gunicorn
+workers) suit a small dyno; add API workers only when one is CPU-bound.
 """
 
+import argparse
+import signal
 import subprocess
 import time
 import sys
 import os
 
+import requests
+
+API_PORT = 8002
+WEB_PORT = 8080
+# Groq requests per minute for the whole deployment, shared by the API workers
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_MAX_REQUESTS_PER_MINUTE", "100"))
+READY_TIMEOUT = 30
+# Restart backoff for crashed processes; reset once a process stays up
+RESTART_BASE_SECONDS = 1.0
+RESTART_MAX_SECONDS = 30.0
+STABLE_AFTER_SECONDS = 60.0
+# How long SIGTERM'd servers get to finish in-flight requests before being killed
+DRAIN_TIMEOUT = 30
+
+def wait_for_health(url, process=None, timeout=READY_TIMEOUT):
+    """Poll url until it answers 200; False on timeout or if process exits first"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process and process.poll() is not None:
+            return False
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
 def start_api_server():
     """Start the Groq API server"""
     print("🚀 Starting Groq API server...")
     try:
         # Start the API server in the background
         api_process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", "main_groq:app", 
-            "--reload", "--port", "8002"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        print("✅ API server started on http://127.0.0.1:8002")
+            sys.executable, "-m", "uvicorn", "main_groq:app",
+            "--reload", "--port", str(API_PORT)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        print(f"✅ API server started on http://127.0.0.1:{API_PORT}")
         return api_process
     except Exception as e:
         print(f"❌ Failed to start API server: {e}")
@@ -33,47 +79,172 @@ def start_web_interface():
         web_process = subprocess.Popen([
             sys.executable, "web_interface.py"
         ])
-        
-        print("✅ Web interface started on http://127.0.0.1:8080")
+
+        print(f"✅ Web interface started on http://127.0.0.1:{WEB_PORT}")
         return web_process
     except Exception as e:
         print(f"❌ Failed to start web interface: {e}")
         return None
 
-def main():
+class ManagedProcess:
+    """A supervised server process that is restarted with backoff when it dies"""
+
+    def __init__(self, name, command, health_url, env=None):
+        self.name = name
+        self.command = command
+        self.health_url = health_url
+        self.env = env
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_at = None
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, env=self.env)
+        self.started_at = time.monotonic()
+        self.restart_at = None
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        return wait_for_health(self.health_url, self.process, timeout)
+
+    def check(self):
+        """Notice a crash and schedule or perform the restart"""
+        now = time.monotonic()
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                print(f"🔄 Restarting {self.name} (restart #{self.restarts})")
+                self.start()
+            return
+
+        code = self.process.poll()
+        if code is None:
+            if self.restarts and now - self.started_at > STABLE_AFTER_SECONDS:
+                self.restarts = 0
+            return
+
+        backoff = min(RESTART_MAX_SECONDS, RESTART_BASE_SECONDS * 2 ** self.restarts)
+        self.restarts += 1
+        self.restart_at = now + backoff
+        print(f"💥 {self.name} exited with code {code}; restarting in {backoff:.0f}s")
+
+    def terminate(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, deadline):
+        """Wait for a graceful exit until deadline, then kill"""
+        if not self.process:
+            return
+        try:
+            self.process.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"⚠️  {self.name} did not drain in time; killing it")
+            self.process.kill()
+            self.process.wait()
+
+def run_production(args):
+    """Start API instances and gunicorn, then supervise them until SIGTERM"""
+    api_urls = [f"http://127.0.0.1:{args.api_port + i}" for i in range(args.api_workers)]
+    # Each main_groq.py enforces its own limit, so together they stay within the budget
+    requests_per_worker = max(1, args.requests_per_minute // args.api_workers)
+    api_env = {**os.environ, "GROQ_MAX_REQUESTS_PER_MINUTE": str(requests_per_worker)}
+    api_services = [
+        ManagedProcess(f"api worker {i + 1} ({url})",
+                       [sys.executable, "-m", "uvicorn", "main_groq:app", "--host", "127.0.0.1",
+                        "--port", str(args.api_port + i), "--log-level", "warning"],
+                       f"{url}/health", env=api_env)
+        for i, url in enumerate(api_urls)
+    ]
+    web_env = {**os.environ, "NPC_BACKEND_MODE": "remote", "NPC_BACKEND_URLS": ",".join(api_urls)}
+    web_service = ManagedProcess(
+        "web interface",
+        [sys.executable, "-m", "gunicorn", "web_interface:app",
+         "--bind", f"{args.host}:{args.port}",
+         "--workers", str(args.web_workers), "--worker-class", "gthread", "--threads", str(args.threads),
+         "--graceful-timeout", str(DRAIN_TIMEOUT), "--timeout", "60"],
+        f"http://127.0.0.1:{args.port}/health",
+        env=web_env,
+    )
+
+    shutting_down = False
+
+    def request_shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    start = time.monotonic()
+    print(f"🚀 Starting {len(api_services)} API workers on ports {args.api_port}-{args.api_port + len(api_services) - 1} "
+          f"({requests_per_worker} Groq requests/min each)...")
+    for service in api_services:
+        service.start()
+    # A worker that fails its first start is left to the restart loop; the web
+    # interface routes around it meanwhile
+    ready = [service.wait_ready() for service in api_services]
+    print(f"✅ {sum(ready)}/{len(api_services)} API workers ready in {time.monotonic() - start:.1f}s")
+
+    print(f"🌐 Starting web interface ({args.web_workers} workers x {args.threads} threads)...")
+    web_service.start()
+    if web_service.wait_ready():
+        print(f"✅ Web interface ready on http://{args.host}:{args.port} in {time.monotonic() - start:.1f}s")
+    else:
+        print("❌ Web interface did not become ready; will keep retrying")
+
+    services = api_services + [web_service]
+    while not shutting_down:
+        for service in services:
+            service.check()
+        time.sleep(0.5)
+
+    # Stop accepting new chats first, then let the API workers finish theirs
+    print("\n🛑 Draining servers...")
+    for group in ([web_service], api_services):
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        for service in group:
+            service.terminate()
+        for service in group:
+            service.wait(deadline)
+    print("✅ Servers stopped")
+
+def run_development():
     print("🎭 AI NPC Dialogue Generator - Web Interface")
     print("=" * 50)
-    
+
     # Check if required files exist
     if not os.path.exists("main_groq.py"):
         print("❌ Error: main_groq.py not found!")
         return
-    
+
     if not os.path.exists("web_interface.py"):
         print("❌ Error: web_interface.py not found!")
         return
-    
+
     # Start API server
     api_process = start_api_server()
     if not api_process:
         return
-    
-    # Wait a moment for API to start
+
+    # Wait for the API to answer before starting the web interface
     print("⏳ Waiting for API server to start...")
-    time.sleep(3)
-    
+    if not wait_for_health(f"http://127.0.0.1:{API_PORT}/health", api_process):
+        print("❌ API server did not become ready")
+        api_process.terminate()
+        return
+
     # Start web interface
     web_process = start_web_interface()
     if not web_process:
         print("❌ Failed to start web interface")
         api_process.terminate()
         return
-    
+
     print("\n🎉 Both servers are running!")
-    print("📱 Web Interface: http://127.0.0.1:8080")
-    print("🔌 API Server: http://127.0.0.1:8002")
+    print(f"📱 Web Interface: http://127.0.0.1:{WEB_PORT}")
+    print(f"🔌 API Server: http://127.0.0.1:{API_PORT}")
     print("\n💡 Press Ctrl+C to stop both servers")
-    
+
     try:
         # Keep the script running
         while True:
@@ -84,5 +255,27 @@ def main():
         web_process.terminate()
         print("✅ Servers stopped")
 
+def main():
+    parser = argparse.ArgumentParser(description="Start the AI NPC web interface and API server")
+    parser.add_argument("--production", action="store_true", help="Supervised multi-process mode")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", WEB_PORT)), help="Web interface port")
+    parser.add_argument("--api-port", type=int, default=API_PORT, help="First API worker port")
+    parser.add_argument("--api-workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="main_groq.py instances (default: API_WORKERS or 1)")
+    parser.add_argument("--web-workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")),
+                        help="gunicorn workers (default: WEB_CONCURRENCY or 2)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker")
+    parser.add_argument("--requests-per-minute", type=int, default=GROQ_REQUESTS_PER_MINUTE,
+                        help="Groq requests per minute for all API workers together (default: GROQ_MAX_REQUESTS_PER_MINUTE or 100)")
+    args = parser.parse_args()
+    if args.api_workers < 1 or args.web_workers < 1:
+        parser.error("--api-workers and --web-workers must be at least 1")
+
+    if args.production:
+        run_production(args)
+    else:
+        run_development()
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
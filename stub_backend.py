@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the generation backend (main_groq.py) used by benchmarks.
+Answers /generate and /health with canned replies after a configurable delay,
+so proxy and client overhead can be measured without calling Groq. It also
+answers the Groq chat completions path, so main_groq.py itself can be pointed
+at it with GROQ_API_URL=<stub url>/openai/v1/chat/completions. Completions with
+"stream": true are sent word by word as server-sent events, token_delay apart.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+class StubBackendHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus the
+    # client's delayed ACK adds ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+    delay = 0.0
+    token_delay = 0.0
+    reply = "Hmph. Let me see it. *examines blade* This'll take time. Come back tomorrow."
+
+    def send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, pieces):
+        """Send server-sent events with chunked transfer encoding"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, piece in enumerate(pieces):
+            if index and self.token_delay:
+                time.sleep(self.token_delay)
+            event = f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+        done = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(done):x}\r\n".encode("ascii") + done + b"\r\n0\r\n\r\n")
+
+    def read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "healthy", "provider": "Stub"})
+        else:
+            self.send_json(404, {"detail": "Not Found"})
+
+    def do_POST(self):
+        if self.path not in ("/generate", COMPLETIONS_PATH):
+            self.send_json(404, {"detail": "Not Found"})
+            return
+        data = self.read_json()
+        if self.delay:
+            time.sleep(self.delay)
+        if self.path == COMPLETIONS_PATH and data.get("stream"):
+            words = self.reply.split(" ")
+            self.send_stream([word if not index else f" {word}" for index, word in enumerate(words)])
+        elif self.path == COMPLETIONS_PATH:
+            self.send_json(200, {"choices": [{"message": {"role": "assistant", "content": self.reply}}]})
+        else:
+            self.send_json(200, {"npc": data.get("character_name", "NPC"), "reply": self.reply})
+
+    def log_message(self, format, *args):
+        pass
+
+class StubBackendServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops SYNs when a load test opens many
+    # connections at once, adding 1s retransmit stalls that aren't the server's
+    request_queue_size = 1024
+
+def start_stub_backend(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0,
+                       token_delay: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread and return (server, base_url)"""
+    handler = type("ConfiguredStubBackendHandler", (StubBackendHandler,), {"delay": delay, "token_delay": token_delay})
+    server = StubBackendServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in generation backend for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each /generate reply")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    server, url = start_stub_backend(args.host, args.port, args.delay, args.token_delay)
+    print(f"🧪 Stub backend running on {url} (delay {args.delay}s)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Offline tests for UpstreamPool's ejection and health checking (no servers needed).
+
+    python -m pytest -q test_generation_backends.py
+"""
+
+import time
+
+from generation_backends import EJECT_AFTER_FAILURES, EJECT_BASE_SECONDS, EJECTION_MEMORY_SECONDS, UpstreamPool
+
+class HealthySession:
+    """Stands in for requests.Session: every /health probe passes"""
+    class Response:
+        status_code = 200
+
+    def get(self, url, timeout=None):
+        return self.Response()
+
+def fail(pool, upstream, times=EJECT_AFTER_FAILURES):
+    for _ in range(times):
+        upstream.outstanding += 1
+        pool.release(upstream, ok=False)
+
+def expire_ejection(upstream, ago=0.001):
+    upstream.ejected_until = time.monotonic() - ago
+
+def test_healthy_probe_does_not_readmit_failing_upstream():
+    pool = UpstreamPool(["http://a", "http://b"], session=HealthySession())
+    upstream = pool.upstreams[0]
+    fail(pool, upstream)
+    assert not upstream.is_available(time.monotonic())
+
+    # /health passes but /generate keeps failing: still ejected
+    pool.check_health()
+    assert not upstream.is_available(time.monotonic())
+    assert all(pool.acquire() is pool.upstreams[1] for _ in range(10))
+
+def test_backoff_grows_while_generate_keeps_failing():
+    pool = UpstreamPool(["http://a", "http://b"], session=HealthySession())
+    upstream = pool.upstreams[0]
+    fail(pool, upstream)
+    for ejections in range(2, 5):
+        expire_ejection(upstream)
+        pool.check_health()
+        # Back in rotation on probation: one more failure ejects it for twice as long
+        fail(pool, upstream, times=1)
+        assert upstream.ejections == ejections
+        backoff = upstream.ejected_until - time.monotonic()
+        assert EJECT_BASE_SECONDS * 2 ** (ejections - 1) * 0.9 < backoff <= EJECT_BASE_SECONDS * 2 ** (ejections - 1)
+
+def test_backoff_starts_over_after_sustained_success():
+    pool = UpstreamPool(["http://a", "http://b"], session=HealthySession())
+    upstream = pool.upstreams[0]
+    fail(pool, upstream)
+    expire_ejection(upstream)
+    upstream.outstanding += 1
+    pool.release(upstream, ok=True)
+    assert upstream.ejections == 1  # too soon to forget
+
+    expire_ejection(upstream, ago=EJECTION_MEMORY_SECONDS)
+    upstream.outstanding += 1
+    pool.release(upstream, ok=True)
+    assert upstream.ejections == 0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Offline tests for mic_stream.RingBuffer (no audio device needed).
+
+    python -m pytest -q test_mic_stream.py
+"""
+
+import sys
+import threading
+import time
+
+import numpy as np
+
+from mic_stream import RingBuffer
+
+def pattern(start: int, end: int) -> np.ndarray:
+    """The samples written at absolute positions [start, end)"""
+    return (np.arange(start, end) % 32768).astype(np.int16)
+
+def test_read_returns_written_samples_and_none_once_lapped():
+    ring = RingBuffer(100)
+    ring.write(pattern(0, 60))
+    assert ring.read(10, 50) == pattern(10, 50).tobytes()
+    ring.write(pattern(60, 130))
+    assert ring.read(20, 40) is None
+    # Wraps around the end of the buffer
+    assert ring.read(50, 130) == pattern(50, 130).tobytes()
+
+def test_concurrent_reads_are_never_torn():
+    ring = RingBuffer(4096)
+    stop = threading.Event()
+
+    def writer():
+        position = 0
+        while not stop.is_set():
+            ring.write(pattern(position, position + 1000))
+            position += 1000
+
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = dropped = 0
+    try:
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            # The oldest samples are the ones the writer is about to overwrite
+            written = ring.written
+            start = max(0, written - ring.capacity)
+            pcm = ring.read(start, min(written, start + 2048))
+            if pcm is None:
+                dropped += 1
+                continue
+            reads += 1
+            assert pcm == pattern(start, start + len(pcm) // 2).tobytes(), f"torn read at {start}"
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(old_interval)
+    assert reads and dropped
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
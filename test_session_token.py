@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Offline tests for session_token's signed history tokens.
+
+    python -m pytest -q test_session_token.py
+"""
+
+import json
+import zlib
+
+from session_token import MAX_DECODED_BYTES, _b64decode, decode_history, encode_history
+
+SECRET = "test-secret"
+CONTEXT = "Aria\0user-1"
+
+def exchanges(count: int, size: int = 10):
+    return [{"user": f"q{i}" + "x" * size, "ai": f"a{i}" + "y" * size} for i in range(count)]
+
+def test_round_trip_keeps_the_last_exchanges():
+    history = exchanges(15)
+    token = encode_history(history, SECRET, CONTEXT)
+    assert decode_history(token, SECRET, CONTEXT) == history[-10:]
+    assert decode_history(encode_history([], SECRET, CONTEXT), SECRET, CONTEXT) == []
+
+def test_oversized_history_drops_the_oldest_exchanges():
+    # Ten exchanges of ~20 KB each is far beyond what decode_history inflates
+    history = exchanges(10, size=10_000)
+    token = encode_history(history, SECRET, CONTEXT)
+    raw = zlib.decompress(_b64decode(token.split(".")[0]))
+    assert len(raw) <= MAX_DECODED_BYTES
+    decoded = decode_history(token, SECRET, CONTEXT)
+    assert decoded and decoded == history[-len(decoded):]
+
+def test_single_exchange_over_the_limit_encodes_empty():
+    history = exchanges(1, size=MAX_DECODED_BYTES)
+    assert json.loads(zlib.decompress(_b64decode(encode_history(history, SECRET, CONTEXT).split(".")[0]))) == []
+
+def test_forged_and_foreign_tokens_decode_empty():
+    token = encode_history(exchanges(3), SECRET, CONTEXT)
+    assert decode_history(token, SECRET, "Aria\0user-2") == []
+    assert decode_history(token, "other-secret", CONTEXT) == []
+    forged = encode_history(exchanges(4), SECRET, CONTEXT).split(".")[0] + "." + token.split(".")[1]
+    assert decode_history(forged, SECRET, CONTEXT) == []
+    for garbage in (None, "", "no-dot", "a.b.c", "!!!.???", 42):
+        assert decode_history(garbage, SECRET, CONTEXT) == []
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
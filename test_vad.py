@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Offline tests for vad.py's endpointing on synthetic audio.
+
+    python -m pytest -q test_vad.py
+"""
+
+import numpy as np
+
+from vad import VAD_END_SILENCE_MS, UtteranceCollector, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+def tone(seconds: float, rng) -> np.ndarray:
+    """A loud vowel-like tone standing in for speech"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 0.3 * np.sin(2 * np.pi * 220 * t) + rng.standard_normal(len(t)) * 1e-3
+
+def quiet(seconds: float, rng) -> np.ndarray:
+    return rng.standard_normal(int(seconds * SAMPLE_RATE)) * 1e-3
+
+def seconds(utterance: bytes) -> float:
+    return len(utterance) / 2 / SAMPLE_RATE
+
+def pcm(*parts) -> bytes:
+    return (np.clip(np.concatenate(parts), -1, 1) * 32767).astype(np.int16).tobytes()
+
+def collector() -> UtteranceCollector:
+    return UtteranceCollector(VoiceActivityDetector(SAMPLE_RATE, profile_path=None), phrase_time_limit=10)
+
+def test_two_utterances_in_one_chunk():
+    rng = np.random.default_rng(1)
+    audio = pcm(quiet(0.5, rng), tone(0.6, rng), quiet(0.5, rng), tone(0.8, rng), quiet(0.6, rng))
+    utterances = collector()
+    first = utterances.collect(iter([audio]))
+    # The second utterance arrived in the same chunk and must not be lost
+    second = utterances.collect(iter([]))
+    assert first and second
+    # All 0.8s of speech plus the silence that ended it
+    assert seconds(second) >= 0.8 + VAD_END_SILENCE_MS / 1000
+
+def test_next_utterance_starting_mid_chunk_keeps_its_onset():
+    rng = np.random.default_rng(2)
+    speech = tone(0.8, rng)
+    audio = pcm(quiet(0.5, rng), tone(0.6, rng), quiet(0.5, rng), speech, quiet(0.6, rng))
+    # The first chunk ends the first utterance and holds the start of the second
+    split = int((0.5 + 0.6 + 0.5 + 0.3) * SAMPLE_RATE) * 2
+    utterances = collector()
+    chunks = iter([audio[:split], audio[split:]])
+    first = utterances.collect(chunks)
+    second = utterances.collect(chunks)
+    assert first and second
+    assert seconds(second) >= 0.8 + VAD_END_SILENCE_MS / 1000
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
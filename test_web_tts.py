@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline tests for web_interface's /api/tts (espeak-ng is replaced by a fake engine).
+
+    python -m pytest -q test_web_tts.py
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+os.environ["TTS_WEB_CACHE_DIR"] = tempfile.mkdtemp(prefix="npc_tts_test_")
+
+import web_interface
+
+client = web_interface.app.test_client()
+
+def fake_espeak(text, voice):
+    yield b"RIFF"
+    yield text.encode("utf-8")
+
+def missing_espeak(text, voice):
+    raise OSError("espeak-ng not found")
+    yield
+
+@contextmanager
+def engine(stream_espeak):
+    """Synthesize with stream_espeak inside the block"""
+    original, web_interface.stream_espeak = web_interface.stream_espeak, stream_espeak
+    try:
+        yield
+    finally:
+        web_interface.stream_espeak = original
+
+def free_slots() -> int:
+    return web_interface.synthesis_slots._value
+
+def test_bad_requests_are_400():
+    assert client.get("/api/tts?character=drogun").status_code == 400
+    assert client.post("/api/tts", json={"character": "drogun", "text": "   "}).status_code == 400
+    too_long = "a" * (web_interface.TTS_MAX_CHARACTERS + 1)
+    response = client.post("/api/tts", json={"character": "drogun", "text": too_long})
+    assert response.status_code == 400 and "limited" in response.get_json()["error"]
+
+def test_unknown_character_is_404():
+    assert client.get("/api/tts?character=nobody&text=Hello").status_code == 404
+
+def test_miss_streams_then_hits_the_cache_and_frees_its_slot():
+    slots = free_slots()
+    with engine(fake_espeak):
+        response = client.get("/api/tts?character=drogun&text=Welcome to the forge")
+        assert response.headers["X-TTS-Cache"] == "miss"
+        assert response.data == b"RIFFWelcome to the forge"
+        response.close()
+    assert free_slots() == slots
+    response = client.get("/api/tts?character=drogun&text=Welcome to the forge")
+    assert response.headers["X-TTS-Cache"] == "hit" and response.data == b"RIFFWelcome to the forge"
+    response.close()
+
+def test_busy_or_failing_synthesis_is_503():
+    slots = free_slots()
+    with engine(missing_espeak):
+        response = client.get("/api/tts?character=drogun&text=No engine here")
+        assert response.status_code == 503 and "failed" in response.get_json()["error"]
+    assert free_slots() == slots
+
+    for _ in range(slots):
+        web_interface.synthesis_slots.acquire()
+    try:
+        with engine(fake_espeak):
+            response = client.get("/api/tts?character=drogun&text=Too many at once")
+        assert response.status_code == 503 and "busy" in response.get_json()["error"]
+    finally:
+        for _ in range(slots):
+            web_interface.synthesis_slots.release()
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
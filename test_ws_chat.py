@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Offline tests for main_groq's /ws/chat, with stub_backend standing in for Groq.
+
+    python -m pytest -q test_ws_chat.py
+"""
+
+from fastapi.testclient import TestClient
+
+import main_groq
+from stub_backend import COMPLETIONS_PATH, StubBackendHandler, start_stub_backend
+
+_, STUB_URL = start_stub_backend(token_delay=0.02)
+main_groq.GROQ_API_URL = f"{STUB_URL}{COMPLETIONS_PATH}"
+
+def start_message(conversation_id: str, name: str) -> dict:
+    return {"type": "start", "conversation_id": conversation_id, "character_name": name,
+            "character_type": "blacksmith", "traits": "gruff"}
+
+def receive_until_done(websocket, conversation_ids) -> list:
+    """Every frame received until each of conversation_ids has sent done or error"""
+    frames, pending = [], set(conversation_ids)
+    while pending:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame["type"] in ("done", "error") and frame.get("status") != 429:
+            pending.discard(frame["conversation_id"])
+    return frames
+
+def test_start_say_end():
+    with TestClient(main_groq.app) as client, client.websocket_connect("/ws/chat") as websocket:
+        assert websocket.receive_json()["type"] == "session"
+        websocket.send_json(start_message("forge", "Brom"))
+        assert websocket.receive_json() == {"type": "started", "conversation_id": "forge", "resumed": False, "turns": 0}
+        websocket.send_json({"type": "say", "conversation_id": "forge", "player_input": "Can you fix my sword?"})
+        frames = receive_until_done(websocket, ["forge"])
+        tokens = "".join(frame["text"] for frame in frames if frame["type"] == "token")
+        assert frames[-1] == {"type": "done", "conversation_id": "forge", "npc": "Brom", "reply": tokens}
+        assert tokens == StubBackendHandler.reply
+        websocket.send_json({"type": "end", "conversation_id": "forge"})
+        assert websocket.receive_json() == {"type": "ended", "conversation_id": "forge"}
+        websocket.send_json({"type": "say", "conversation_id": "forge", "player_input": "Hello?"})
+        assert websocket.receive_json()["status"] == 404
+
+def test_two_conversations_stream_at_once_one_turn_each():
+    with TestClient(main_groq.app) as client, client.websocket_connect("/ws/chat") as websocket:
+        session_id = websocket.receive_json()["session_id"]
+        for conversation_id, name in (("forge", "Brom"), ("tavern", "Mira")):
+            websocket.send_json(start_message(conversation_id, name))
+            assert websocket.receive_json()["type"] == "started"
+        for conversation_id in ("forge", "forge", "tavern"):
+            websocket.send_json({"type": "say", "conversation_id": conversation_id, "player_input": "Hello"})
+        frames = receive_until_done(websocket, ["forge", "tavern"])
+
+    rejected = [frame for frame in frames if frame["type"] == "error"]
+    assert [(frame["conversation_id"], frame["status"]) for frame in rejected] == [("forge", 429)]
+    done = {frame["conversation_id"]: frame for frame in frames if frame["type"] == "done"}
+    assert {done["forge"]["npc"], done["tavern"]["npc"]} == {"Brom", "Mira"}
+    for conversation_id in ("forge", "tavern"):
+        tokens = [frame["text"] for frame in frames if frame["type"] == "token" and frame["conversation_id"] == conversation_id]
+        assert "".join(tokens) == done[conversation_id]["reply"] == StubBackendHandler.reply
+    # Both replies were streaming at the same time, not one after the other
+    order = [frame["conversation_id"] for frame in frames if frame["type"] == "token"]
+    assert order.index("tavern") < len(order) - order[::-1].index("forge") - 1
+
+    # Reconnecting with the session id resumes the stored history
+    with TestClient(main_groq.app) as client, client.websocket_connect(f"/ws/chat?session_id={session_id}") as websocket:
+        websocket.receive_json()
+        websocket.send_json(start_message("tavern", "Mira"))
+        started = websocket.receive_json()
+        assert started["resumed"] and started["turns"] > 0
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
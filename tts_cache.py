@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered speech for lines the voice assistant says again and again.
+
+Audio is content-addressed: the file name is a hash of the voice profile
+(rate, volume, voice) and the text, so a line is synthesized once per voice
+and replayed from disk afterwards. Lines known up front (greetings, system
+prompts) are rendered eagerly and pinned; other lines are rendered on first
+use and evicted least-recently-used once the cache outgrows
+TTS_CACHE_MAX_MB.
+
+Playback goes through PyAudio (already needed for the microphone) and can be
+stopped mid-line for barge-in.
+
+Servers have no pyttsx3 event loop to spare, so they synthesize with the
+espeak-ng command line (stream_espeak). It writes WAV to stdout while it
+speaks, and stream_render saves that stream to the cache as it passes
+through.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import uuid
+import wave
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "npc_tts"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "50"))
+PLAYBACK_CHUNK_FRAMES = 1024
+ESPEAK_BINARY = shutil.which("espeak-ng") or shutil.which("espeak")
+STREAM_CHUNK_BYTES = 8192
+
+def apply_voice(engine, voice: Dict):
+    """Configure a pyttsx3 engine for a voice profile"""
+    engine.setProperty("rate", voice["rate"])
+    engine.setProperty("volume", voice["volume"])
+    if voice.get("voice"):
+        engine.setProperty("voice", voice["voice"])
+
+class TTSCache:
+    """WAV files on disk keyed by (voice profile, text)"""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.pinned_dir = os.path.join(directory, "pinned")
+        self.lines_dir = os.path.join(directory, "lines")
+        os.makedirs(self.pinned_dir, exist_ok=True)
+        os.makedirs(self.lines_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Dynamic lines, least recently used first: path -> size
+        self.lines: "OrderedDict[str, int]" = OrderedDict()
+        entries = [os.path.join(self.lines_dir, name) for name in os.listdir(self.lines_dir) if name.endswith(".wav")]
+        for path in sorted(entries, key=os.path.getmtime):
+            self.lines[path] = os.path.getsize(path)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice: Dict) -> str:
+        content = json.dumps([voice, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    def path_for(self, text: str, voice: Dict, pinned: bool = False) -> str:
+        return os.path.join(self.pinned_dir if pinned else self.lines_dir, f"{self.key(text, voice)}.wav")
+
+    def get(self, text: str, voice: Dict) -> Optional[str]:
+        """Path of the cached audio for this line, or None"""
+        pinned_path = self.path_for(text, voice, pinned=True)
+        if os.path.exists(pinned_path):
+            self.hits += 1
+            return pinned_path
+        path = self.path_for(text, voice)
+        with self.lock:
+            if path in self.lines and os.path.exists(path):
+                self.lines.move_to_end(path)
+                self.hits += 1
+                os.utime(path)
+                return path
+        self.misses += 1
+        return None
+
+    def render(self, engine, text: str, voice: Dict, pinned: bool = False) -> str:
+        """Synthesize a line to the cache with the (caller-owned) pyttsx3 engine"""
+        path = self.path_for(text, voice, pinned)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp.wav"
+        apply_voice(engine, voice)
+        engine.save_to_file(text, temporary_path)
+        engine.runAndWait()
+        os.replace(temporary_path, path)
+        if not pinned:
+            self._remember(path)
+        return path
+
+    def stream_render(self, text: str, voice: Dict, audio: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass a synthesizer's WAV stream through, caching it once it has completed"""
+        path = self.path_for(text, voice)
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp.wav"
+        completed = False
+        try:
+            with open(temporary_path, "wb") as f:
+                for chunk in audio:
+                    f.write(chunk)
+                    yield chunk
+            fix_wav_sizes(temporary_path)
+            os.replace(temporary_path, path)
+            completed = True
+            self._remember(path)
+        finally:
+            # An abandoned stream (client gone, synthesizer failed) must not be cached
+            if not completed and os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def _remember(self, path: str):
+        with self.lock:
+            self.lines[path] = os.path.getsize(path)
+            self.lines.move_to_end(path)
+            self._evict()
+
+    def get_or_render(self, engine, text: str, voice: Dict) -> str:
+        return self.get(text, voice) or self.render(engine, text, voice)
+
+    def warm(self, engine, lines: Iterable[Tuple[str, Dict]]) -> int:
+        """Render and pin every (text, voice) line that isn't on disk yet; returns how many were rendered"""
+        rendered = 0
+        for text, voice in lines:
+            if not os.path.exists(self.path_for(text, voice, pinned=True)):
+                self.render(engine, text, voice, pinned=True)
+                rendered += 1
+        return rendered
+
+    def _evict(self):
+        total = sum(self.lines.values())
+        while total > self.max_bytes and len(self.lines) > 1:
+            path, size = self.lines.popitem(last=False)
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def fix_wav_sizes(path: str):
+    """Fill in the RIFF and data sizes that a streamed WAV header leaves open"""
+    with open(path, "r+b") as f:
+        header = f.read(4096)
+        data_offset = header.find(b"data", 12)
+        if header[:4] != b"RIFF" or data_offset < 0:
+            return
+        size = os.fstat(f.fileno()).st_size
+        f.seek(4)
+        f.write(struct.pack("<I", size - 8))
+        f.seek(data_offset + 4)
+        f.write(struct.pack("<I", size - data_offset - 8))
+
+def espeak_command(voice: Dict) -> List[str]:
+    """espeak-ng arguments to read text from stdin and write WAV to stdout.
+
+    voice: {"voice": espeak voice name, "rate": words per minute,
+    "pitch": 0-99, "volume": 0.0-2.0}
+    """
+    if not ESPEAK_BINARY:
+        raise RuntimeError("Server-side speech needs espeak-ng (apt install espeak-ng)")
+    return [ESPEAK_BINARY, "--stdout", "--stdin",
+            "-v", voice.get("voice", "en-us"),
+            "-s", str(int(voice["rate"])),
+            "-p", str(int(voice.get("pitch", 50))),
+            "-a", str(int(voice["volume"] * 100))]
+
+def stream_espeak(text: str, voice: Dict) -> Iterator[bytes]:
+    """WAV audio from espeak-ng (see espeak_command), yielded as it is synthesized"""
+    process = subprocess.Popen(espeak_command(voice), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        process.stdin.write(text.encode("utf-8"))
+        process.stdin.close()
+        while True:
+            chunk = process.stdout.read1(STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+        if process.wait() != 0:
+            raise RuntimeError(f"espeak-ng exited with status {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+_pyaudio = None
+_pyaudio_lock = threading.Lock()
+
+def get_pyaudio():
+    """One PyAudio instance for the process; creating one enumerates every audio device"""
+    global _pyaudio
+    with _pyaudio_lock:
+        if _pyaudio is None:
+            import pyaudio
+            _pyaudio = pyaudio.PyAudio()
+        return _pyaudio
+
+def play_wav(path: str, stop_event: Optional[threading.Event] = None) -> bool:
+    """Play a WAV file; returns False if stop_event cut it short"""
+    audio = get_pyaudio()
+    with wave.open(path, "rb") as wav:
+        stream = audio.open(format=audio.get_format_from_width(wav.getsampwidth()),
+                            channels=wav.getnchannels(), rate=wav.getframerate(), output=True)
+        try:
+            data = wav.readframes(PLAYBACK_CHUNK_FRAMES)
+            while data:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                stream.write(data)
+                data = wav.readframes(PLAYBACK_CHUNK_FRAMES)
+        finally:
+            stream.stop_stream()
+            stream.close()
+    return True
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+A speech thread that owns the pyttsx3 engine.
+
+pyttsx3 blocks in runAndWait() and its engine must not be reconfigured while
+it talks. So one worker thread creates the engine and is the only thread that
+touches it. It works through a priority queue of speech jobs: text plus a
+voice profile. Callers submit jobs and carry on.
+
+- Priority: system messages (SYSTEM_PRIORITY) are spoken before queued NPC
+  lines (NPC_PRIORITY); jobs of equal priority keep their order.
+- Cancellation: cancel() drops queued jobs and cuts off the current one.
+- Timing: every job records its time in the queue, its synthesis time and
+  its playback time.
+
+Lines are rendered to WAV (from the TTSCache when possible) and then played,
+so synthesis is timed apart from playback and playback stops cleanly on
+cancel. Without a cache the engine speaks directly.
+"""
+
+import itertools
+import os
+import tempfile
+import threading
+import time
+import uuid
+from queue import PriorityQueue
+from typing import Callable, Dict, Optional
+
+from tts_cache import TTSCache, apply_voice, play_wav
+
+SYSTEM_PRIORITY = 0
+NPC_PRIORITY = 1
+
+class SpeechJob:
+    """One line to speak, with its timings once it has run"""
+
+    def __init__(self, text: str, voice: Dict, priority: int = NPC_PRIORITY, cache: bool = True, tag=None):
+        self.text = text
+        self.voice = voice
+        self.priority = priority
+        self.cache = cache
+        # Caller's label, e.g. the conversation turn the line answers
+        self.tag = tag
+        self.cancelled = False
+        self.completed = False
+        self.done = threading.Event()
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.cached = False
+        self.synthesis_seconds = None
+        self.playback_seconds = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    @property
+    def queue_seconds(self) -> Optional[float]:
+        return None if self.started_at is None else self.started_at - self.queued_at
+
+class TTSWorker:
+    """Owns the speech engine and speaks queued jobs one at a time"""
+
+    def __init__(self, cache: Optional[TTSCache] = None, setup: Optional[Callable] = None,
+                 on_start: Optional[Callable] = None, on_finish: Optional[Callable] = None):
+        self.cache = cache
+        # setup(engine) runs on the worker thread right after the engine is created
+        self.setup = setup
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.engine = None
+        self.queue = PriorityQueue()
+        self.sequence = itertools.count()
+        self.lock = threading.Condition()
+        self.queued = set()
+        self.current = None
+        self.playback_stop = threading.Event()
+        self.ready = threading.Event()
+        self.setup_error = None
+        self.thread = threading.Thread(target=self.run, name="tts", daemon=True)
+
+    def start(self):
+        """Start the thread and wait until the engine is set up"""
+        self.thread.start()
+        self.ready.wait()
+        if self.setup_error:
+            raise self.setup_error
+
+    def submit(self, text: str, voice: Dict, priority: int = NPC_PRIORITY, cache: bool = True, tag=None) -> SpeechJob:
+        """Queue a line and return at once; job.wait() blocks until it has been spoken"""
+        job = SpeechJob(text, voice, priority, cache, tag)
+        with self.lock:
+            self.queued.add(job)
+        self.queue.put((priority, next(self.sequence), job))
+        return job
+
+    def cancel(self, predicate: Optional[Callable[[SpeechJob], bool]] = None) -> int:
+        """Cancel queued jobs and the current one (those matching predicate, or all); returns how many"""
+        with self.lock:
+            jobs = [job for job in self.queued if predicate is None or predicate(job)]
+            current = self.current
+            if current is not None and (predicate is None or predicate(current)):
+                jobs.append(current)
+            for job in jobs:
+                job.cancelled = True
+            # Under the lock, so the worker cannot have moved on to the next job
+            # (which clears playback_stop) in between. Live speech is stopped by
+            # the worker itself at the next word (see stop_cancelled_speech).
+            if current is not None and current.cancelled:
+                self.playback_stop.set()
+        return len(jobs)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far has been spoken or cancelled"""
+        with self.lock:
+            return self.lock.wait_for(lambda: not self.queued and self.current is None, timeout)
+
+    def close(self, timeout: Optional[float] = 30):
+        """Finish the queued jobs, then stop the thread"""
+        self.queue.put((float("inf"), next(self.sequence), None))
+        self.thread.join(timeout)
+
+    def run(self):
+        try:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+            if self.setup:
+                self.setup(self.engine)
+            self.engine.connect("started-word", self.stop_cancelled_speech)
+        except Exception as e:
+            self.setup_error = e
+            return
+        finally:
+            self.ready.set()
+
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                break
+            with self.lock:
+                self.queued.discard(job)
+                if not job.cancelled:
+                    self.current = job
+                    self.playback_stop.clear()
+            if not job.cancelled:
+                job.started_at = time.perf_counter()
+                try:
+                    if self.on_start:
+                        self.on_start(job)
+                    self.speak(job)
+                except Exception as e:
+                    print(f"❌ Speech error: {e}")
+                finally:
+                    if self.on_finish:
+                        self.on_finish(job)
+            with self.lock:
+                self.current = None
+                self.lock.notify_all()
+            job.done.set()
+
+    def speak(self, job: SpeechJob):
+        """Synthesize and play one job (worker thread only)"""
+        if self.cache is not None:
+            try:
+                self.speak_rendered(job)
+                return
+            except Exception as e:
+                print(f"⚠️  Rendered speech failed, switching to live synthesis: {e}")
+                self.cache = None
+        self.speak_live(job)
+
+    def stop_cancelled_speech(self, *_):
+        """started-word callback: runs on the worker thread inside runAndWait()"""
+        # Only live speech is stopped in the engine; a half-rendered file must not reach the cache
+        if self.cache is None and self.playback_stop.is_set():
+            self.engine.stop()
+
+    def speak_live(self, job: SpeechJob):
+        start = time.perf_counter()
+        apply_voice(self.engine, job.voice)
+        self.engine.say(job.text)
+        self.engine.runAndWait()
+        # Live speech synthesizes while it plays; there is no separate figure
+        job.playback_seconds = time.perf_counter() - start
+        job.completed = not job.cancelled
+
+    def speak_rendered(self, job: SpeechJob):
+        start = time.perf_counter()
+        path = self.cache.get(job.text, job.voice)
+        job.cached = path is not None
+        temporary = False
+        if path is None:
+            if job.cache:
+                path = self.cache.render(self.engine, job.text, job.voice)
+            else:
+                path = os.path.join(tempfile.gettempdir(), f"tts-{uuid.uuid4().hex}.wav")
+                temporary = True
+                apply_voice(self.engine, job.voice)
+                self.engine.save_to_file(job.text, path)
+                self.engine.runAndWait()
+        job.synthesis_seconds = time.perf_counter() - start
+        try:
+            if job.cancelled:
+                return
+            start = time.perf_counter()
+            job.completed = play_wav(path, self.playback_stop)
+            job.playback_seconds = time.perf_counter() - start
+        finally:
+            if temporary:
+                os.remove(path)
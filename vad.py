@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Voice-activity detection and endpointing for 16-bit mono PCM.
+
+Audio is cut into 20ms frames. Each frame gets an energy (dBFS) and a
+zero-crossing rate, computed for a whole chunk at once with NumPy. A frame is
+speech when its energy is VAD_MARGIN_DB above the tracked noise floor, or
+half that once an utterance is under way, so the quiet tails of syllables
+don't end it. Quieter frames also count when their zero-crossing rate is
+high, which catches fricatives such as "s" and "f". The noise floor follows the quietest frame
+of the last NOISE_WINDOW_MS. Speech always has gaps within that window, so
+the floor follows a fan switching on, even mid-sentence, without mistaking
+speech for noise.
+
+An utterance starts after START_MS of speech and ends after
+VAD_END_SILENCE_MS of silence. That replaces speech_recognition's fixed
+energy threshold and 0.8s pause. The noise floor is saved to
+VAD_PROFILE_PATH, so later runs skip the ambient-noise calibration.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+VAD_PROFILE_PATH = os.getenv("VAD_PROFILE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "npc_vad_profile.json"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "300"))
+FRAME_MS = 20
+START_MS = 60
+PRE_ROLL_MS = 300
+# Frames quieter than this are never speech, however quiet the room
+MIN_SPEECH_DB = -55.0
+DEFAULT_NOISE_FLOOR_DB = -60.0
+# Zero crossings per sample above which a quiet frame is taken for a fricative
+FRICATIVE_ZCR = 0.3
+# The noise floor is the quietest frame in this window; it drops at once and
+# rises towards a louder minimum at NOISE_RISE_RATE per chunk
+NOISE_WINDOW_MS = 1500
+NOISE_RISE_RATE = 0.5
+
+def frame_features(pcm: bytes, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Energy (dBFS) and zero-crossing rate of every whole frame in pcm"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32) / 32768.0
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_length
+    return energy_db, zcr
+
+class VoiceActivityDetector:
+    """Streaming speech/silence classifier and utterance endpointer"""
+
+    def __init__(self, sample_rate: int = 16000, margin_db: float = VAD_MARGIN_DB,
+                 end_silence_ms: int = VAD_END_SILENCE_MS, start_ms: int = START_MS,
+                 pre_roll_ms: int = PRE_ROLL_MS, profile_path: Optional[str] = VAD_PROFILE_PATH):
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_length * 2
+        self.margin_db = margin_db
+        self.start_frames = max(1, start_ms // FRAME_MS)
+        self.end_frames = max(1, end_silence_ms // FRAME_MS)
+        self.pre_roll_frames = max(self.start_frames, pre_roll_ms // FRAME_MS)
+        self.profile_path = profile_path
+        self.noise_floor_db = DEFAULT_NOISE_FLOOR_DB
+        self.recent_energy = deque(maxlen=NOISE_WINDOW_MS // FRAME_MS)
+        self.pending = b""
+        self.reset()
+
+    @property
+    def frame_seconds(self) -> float:
+        return FRAME_MS / 1000
+
+    def reset(self):
+        """Forget the current utterance (the noise floor is kept)"""
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+
+    def calibrate(self, pcm: bytes):
+        """Set the noise floor from audio of the room with nobody speaking"""
+        energy_db, _ = frame_features(pcm, self.frame_length)
+        if len(energy_db):
+            self.noise_floor_db = float(np.median(energy_db))
+
+    def classify(self, energy_db: np.ndarray, zcr: np.ndarray, margin_db: float) -> np.ndarray:
+        """Speech mask for a chunk of frames against the current noise floor"""
+        loud = energy_db > self.noise_floor_db + margin_db
+        fricative = (energy_db > self.noise_floor_db + margin_db / 2) & (zcr > FRICATIVE_ZCR)
+        return (loud | fricative) & (energy_db > MIN_SPEECH_DB)
+
+    def track_noise(self, energy_db: np.ndarray):
+        """Move the noise floor to the quietest recent frame"""
+        self.recent_energy.extend(energy_db.tolist())
+        quietest = min(self.recent_energy)
+        if quietest < self.noise_floor_db:
+            self.noise_floor_db = quietest
+        else:
+            self.noise_floor_db += NOISE_RISE_RATE * (quietest - self.noise_floor_db)
+
+    def process(self, pcm: bytes) -> List[Tuple[bytes, str]]:
+        """Feed audio; returns (frame, state) per complete frame.
+
+        state is "silence", "start" (the frame that confirmed speech),
+        "speech", or "end" (the frame that confirmed the utterance is over;
+        the detector is then ready for the next one).
+        """
+        pcm = self.pending + pcm
+        count = len(pcm) // self.frame_bytes
+        self.pending = pcm[count * self.frame_bytes:]
+        if not count:
+            return []
+        pcm = pcm[:count * self.frame_bytes]
+        energy_db, zcr = frame_features(pcm, self.frame_length)
+        # Starting an utterance takes the full margin; continuing one, half of it
+        starts = self.classify(energy_db, zcr, self.margin_db)
+        continues = self.classify(energy_db, zcr, self.margin_db / 2)
+        self.track_noise(energy_db)
+
+        results = []
+        for index in range(count):
+            frame = pcm[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            if not self.in_speech:
+                self.speech_run = self.speech_run + 1 if starts[index] else 0
+                if self.speech_run >= self.start_frames:
+                    self.in_speech = True
+                    self.silence_run = 0
+                    results.append((frame, "start"))
+                else:
+                    results.append((frame, "silence"))
+            else:
+                self.silence_run = 0 if continues[index] else self.silence_run + 1
+                if self.silence_run >= self.end_frames:
+                    self.reset()
+                    results.append((frame, "end"))
+                else:
+                    results.append((frame, "speech"))
+        return results
+
+    def load_profile(self) -> bool:
+        """Restore the saved noise floor; False if there is no usable profile"""
+        if not self.profile_path or not os.path.exists(self.profile_path):
+            return False
+        try:
+            with open(self.profile_path, encoding="utf-8") as f:
+                self.noise_floor_db = float(json.load(f)["noise_floor_db"])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+    def save_profile(self):
+        if not self.profile_path:
+            return
+        os.makedirs(os.path.dirname(self.profile_path) or ".", exist_ok=True)
+        with open(self.profile_path, "w", encoding="utf-8") as f:
+            json.dump({"noise_floor_db": round(self.noise_floor_db, 2), "saved_at": int(time.time())}, f)
+
+class UtteranceCollector:
+    """Cuts a continuous stream of audio into utterances, each with its pre-roll.
+
+    Keep one collector per stream: audio after an utterance's end in the same
+    chunk (the next utterance's pre-roll or start) stays in it for the next one.
+    """
+
+    def __init__(self, detector: VoiceActivityDetector, phrase_time_limit: Optional[float] = None):
+        self.detector = detector
+        self.max_frames = int(phrase_time_limit / detector.frame_seconds) if phrase_time_limit else None
+        self.pre_roll = deque(maxlen=detector.pre_roll_frames)
+        self.frames = None
+        # Utterances completed by a chunk but not yet taken by collect()
+        self.completed = deque()
+        detector.reset()
+
+    @property
+    def in_utterance(self) -> bool:
+        return self.frames is not None
+
+    def feed(self, pcm: bytes) -> List[bytes]:
+        """Add audio; returns the utterances it completed (usually none)"""
+        utterances = []
+        for frame, state in self.detector.process(pcm):
+            if self.frames is None:
+                self.pre_roll.append(frame)
+                if state == "start":
+                    self.frames = list(self.pre_roll)
+                    self.pre_roll.clear()
+            else:
+                self.frames.append(frame)
+                if state == "end" or (self.max_frames and len(self.frames) >= self.max_frames):
+                    utterances.append(self.flush())
+        return utterances
+
+    def collect(self, chunks: Iterable[bytes], timeout: Optional[float] = None) -> Optional[bytes]:
+        """Read chunks until the next utterance is complete; returns its PCM, or None on timeout.
+
+        The end of the stream ends an utterance in progress.
+        """
+        if self.completed:
+            return self.completed.popleft()
+        waited = 0.0
+        for chunk in chunks:
+            self.completed.extend(self.feed(chunk))
+            if self.completed:
+                return self.completed.popleft()
+            if not self.in_utterance:
+                waited += len(chunk) / 2 / self.detector.sample_rate
+                if timeout is not None and waited > timeout:
+                    return None
+        return self.flush()
+
+    def flush(self) -> Optional[bytes]:
+        """End the current utterance now (e.g. push-to-talk released); None if there is none"""
+        pcm = b"".join(self.frames) if self.frames else None
+        self.frames = None
+        self.detector.reset()
+        return pcm
+
+def capture_utterance(chunks: Iterable[bytes], detector: VoiceActivityDetector,
+                      timeout: Optional[float] = None, phrase_time_limit: Optional[float] = None) -> Optional[bytes]:
+    """Read chunks until one utterance has been spoken; returns its PCM (with pre-roll), or None on timeout.
+
+    For one utterance only: whatever follows it is dropped. To capture one
+    utterance after another from a stream, keep an UtteranceCollector and
+    call its collect().
+    """
+    return UtteranceCollector(detector, phrase_time_limit).collect(chunks, timeout)
@@ -2,154 +2,278 @@
 """
 Voice Assistant for AI NPC Dialogue Generator
 Integrates speech recognition and text-to-speech with the Groq API
+
+Voice conversation mode runs as a pipeline of workers joined by queues:
+
+    microphone -> audio_queue -> recognition -> main loop (commands)
+               -> generation_queue -> generation -> TTS worker
+
+All speech goes through the TTS worker thread (tts_worker.py), so speak()
+never blocks. The microphone stays open while the NPC talks, so the player
+can interrupt (barge in): a new line stops the current speech and drops
+replies to older lines.
 """
 
 import speech_recognition as sr
-import pyttsx3
 import requests
 import json
 import time
 import threading
-from queue import Queue
+from queue import Empty, Queue
 import os
-from typing import Optional, Dict, Any
+import uuid
+import re
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+from character_registry import CLASSIC_NPC_IDS, NPC_CHARACTERS
+from conversation import MAX_HISTORY_TURNS, history_turn, split_sentences
+from recognizers import RecognitionError, create_recognizer
+from tts_cache import TTSCache
+from tts_worker import NPC_PRIORITY, SYSTEM_PRIORITY, SpeechJob, TTSWorker
+from mic_stream import MicrophoneStream
+from vad import PRE_ROLL_MS, UtteranceCollector, VoiceActivityDetector, capture_utterance
+
+# How long the pipelined listen() waits for the next recognized line
+PIPELINE_LISTEN_TIMEOUT = 15
+# Share of a recognized line's words found in what the NPC is saying before it
+# is treated as the speakers leaking into the microphone rather than barge-in
+ECHO_WORD_OVERLAP = 0.6
+# Lines captured this soon after the NPC stops talking are also checked for echo
+ECHO_WINDOW_SECONDS = 1.0
+# Fixed lines spoken in the default voice, pre-rendered at startup
+SYSTEM_LINES = [
+    "Which character would you like to switch to? Say the character name.",
+    "I didn't recognize that character. Please try again.",
+    "Which model would you like to use? Say 'fast', 'powerful', 'balanced', or 'efficient'.",
+    "I didn't recognize that model. Please try again.",
+    "The AI service is online and ready.",
+    "The AI service is having issues.",
+    "Cannot connect to the AI service.",
+    "I've shown the help information on screen.",
+    "I'm sorry, I didn't get a response. Please try again.",
+    "This is a test of the voice synthesis system. If you can hear this clearly, the voice assistant is working properly.",
+]
 
 class VoiceAssistant:
     def __init__(self):
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        self.engine = pyttsx3.init()
+        # Opened once and kept running; every listen reads from its ring buffer
+        self.microphone = MicrophoneStream()
+        self.microphone.start()
         self.api_url = "http://127.0.0.1:8002"
         
-        # Configure text-to-speech
-        self.setup_tts()
-        
-        # Configure speech recognition
-        self.setup_speech_recognition()
-        
         # Available characters
-        self.characters = {
-            "drogun": {
-                "name": "Drogun",
-                "type": "Gruff Blacksmith",
-                "traits": "Gruff, impatient, values hard work, speaks in short sentences",
-                "voice_rate": 150,
-                "voice_pitch": 0.8
-            },
-            "lira": {
-                "name": "Lira",
-                "type": "Enthusiastic Potion Seller",
-                "traits": "Cheerful, talkative, always tries to upsell, uses lots of exclamations",
-                "voice_rate": 180,
-                "voice_pitch": 1.2
-            },
-            "eldrin": {
-                "name": "Eldrin",
-                "type": "Mysterious Forest Hermit",
-                "traits": "Cryptic, wise, speaks in riddles, calm demeanor",
-                "voice_rate": 120,
-                "voice_pitch": 0.9
-            },
-            "garrick": {
-                "name": "Garrick",
-                "type": "Cynical City Guard",
-                "traits": "Suspicious, direct, doesn't trust easily, speaks with authority",
-                "voice_rate": 140,
-                "voice_pitch": 0.85
-            },
-            "elara": {
-                "name": "Elara",
-                "type": "Cheerful Shopkeeper",
-                "traits": "Friendly, helpful, loves to chat, always positive",
-                "voice_rate": 160,
-                "voice_pitch": 1.1
-            }
-        }
+        self.characters = {character_id: NPC_CHARACTERS[character_id] for character_id in CLASSIC_NPC_IDS}
         
         self.current_character = "drogun"
         self.current_model = "llama3-8b-8192"
         self.conversation_history = []
+        # The server keeps the history for this session; the local copy is
+        # only sent to start the session or to resync after it expires
+        self.session_id = uuid.uuid4().hex
+        self.session_synced = False
         self.is_listening = False
         self.audio_queue = Queue()
+        # Keep-alive connection to the API server
+        self.http = requests.Session()
+        
+        # Pipelined voice conversation state (see voice_conversation)
+        self.text_queue = Queue()
+        self.generation_queue = Queue()
+        self.pipeline_running = False
+        self.workers = []
+        self.capture_stop = threading.Event()
+        # Incremented for every recognized line; replies to older turns are dropped
+        self.turn = 0
+        self.listened_turn = 0
+        # End of speech of the latest turn, for the latency print
+        self.heard_at = {}
+        self.speaking = threading.Event()
+        self.stream_failed = False
+        self.current_utterance = ""
+        self.spoken_until = 0.0
         
-    def setup_tts(self):
-        """Configure text-to-speech settings"""
-        voices = self.engine.getProperty('voices')
+        # Configure text-to-speech; the worker thread creates and owns the engine
+        self.tts_cache = TTSCache()
+        self.tts = TTSWorker(self.tts_cache, setup=self.setup_tts,
+                             on_start=self.on_speech_start, on_finish=self.on_speech_end)
+        self.tts.start()
+        
+        # Configure speech recognition
+        self.setup_speech_recognition()
+        
+    def setup_tts(self, engine):
+        """Configure text-to-speech settings (runs on the TTS worker thread)"""
+        voices = engine.getProperty('voices')
         
         # Try to set a good default voice
         if voices:
             # Prefer a female voice for variety
             for voice in voices:
                 if "female" in voice.name.lower() or "samantha" in voice.name.lower():
-                    self.engine.setProperty('voice', voice.id)
+                    engine.setProperty('voice', voice.id)
                     break
             else:
-                self.engine.setProperty('voice', voices[0].id)
+                engine.setProperty('voice', voices[0].id)
         
         # Set default properties
-        self.engine.setProperty('rate', 150)
-        self.engine.setProperty('volume', 0.9)
+        engine.setProperty('rate', 150)
+        engine.setProperty('volume', 0.9)
+        self.default_voice = engine.getProperty('voice')
+        
+        # Render greetings and system prompts once; later runs find them on disk
+        try:
+            rendered = self.tts_cache.warm(engine, self.fixed_lines())
+        except Exception as e:
+            print(f"⚠️  Speech cache disabled, could not pre-render audio: {e}")
+            self.tts_cache = self.tts.cache = None
+        else:
+            if rendered:
+                print(f"🔊 Pre-rendered {rendered} voice lines")
+    
+    def voice_profile(self, character: str = None) -> Dict[str, Any]:
+        """Rate, volume and voice used to speak as character (or the narrator)"""
+        voice = {"rate": 150, "volume": 0.9, "voice": self.default_voice}
+        if character and character in self.characters:
+            voice["rate"] = self.characters[character]['voice_rate']
+            voice["volume"] = self.characters[character]['voice_volume']
+        return voice
+    
+    def greeting(self, character: str) -> str:
+        char = self.characters[character]
+        return f"Hello! I am {char['name']}, {char['type']}. How may I assist you?"
+    
+    def fixed_lines(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Every line whose text is known before the conversation starts"""
+        lines = [(text, self.voice_profile()) for text in SYSTEM_LINES]
+        for key in self.characters:
+            lines.append((self.greeting(key), self.voice_profile(key)))
+            lines.append(("Goodbye! It was nice talking with you.", self.voice_profile(key)))
+        return lines
         
     def setup_speech_recognition(self):
         """Configure speech recognition settings"""
-        # Adjust for ambient noise
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
+        # Voice-activity detection ends an utterance as soon as the player stops
+        # talking; the room's noise floor is saved, so only the first run calibrates
+        self.vad = VoiceActivityDetector(self.microphone.SAMPLE_RATE)
+        if not self.vad.load_profile():
+            print("🔇 Measuring background noise, please stay quiet...")
+            silence = b""
+            for chunk in self.microphone.chunks():
+                silence += chunk
+                if len(silence) >= self.microphone.SAMPLE_RATE * self.microphone.SAMPLE_WIDTH:
+                    break
+            self.vad.calibrate(silence)
+            self.vad.save_profile()
         
-        # Set recognition parameters
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.dynamic_energy_threshold = True
-        self.recognizer.pause_threshold = 0.8
+        # Transcription engine (SPEECH_RECOGNIZER=google|vosk|whisper); local
+        # models are loaded here once and stay warm for the whole session
+        self.speech_recognizer = create_recognizer()
         
-    def speak(self, text: str, character: str = None):
-        """Speak text with character-specific voice settings"""
-        if character and character in self.characters:
-            char = self.characters[character]
-            self.engine.setProperty('rate', char['voice_rate'])
-            self.engine.setProperty('volume', 0.9)
+    def speak(self, text: str, character: str = None, cache: bool = True,
+              priority: int = SYSTEM_PRIORITY, turn: Optional[int] = None) -> SpeechJob:
+        """Queue text to be spoken with character-specific voice settings; returns at once.
         
-        print(f"🤖 {text}")
-        self.engine.say(text)
-        self.engine.runAndWait()
+        Lines that may be said again are cached as audio; pass cache=False for
+        one-off text such as NPC replies. System lines are spoken before
+        queued NPC lines.
+        """
+        return self.tts.submit(text, self.voice_profile(character), priority, cache,
+                               tag=self.turn if turn is None else turn)
+    
+    def on_speech_start(self, job: SpeechJob):
+        """TTS worker callback before a line is spoken"""
+        print(f"🤖 {job.text}")
+        heard_at = self.heard_at.pop(job.tag, None)
+        if heard_at is not None:
+            print(f"⏱️  {time.perf_counter() - heard_at:.2f}s from end of speech to first NPC audio")
+        self.current_utterance = job.text.lower()
+        self.speaking.set()
+    
+    def on_speech_end(self, job: SpeechJob):
+        """TTS worker callback after a line was spoken or cut off"""
+        self.spoken_until = time.perf_counter()
+        self.speaking.clear()
+        if job.synthesis_seconds is not None:
+            source = "cached" if job.cached else f"synthesized in {job.synthesis_seconds:.2f}s"
+            print(f"   🔈 {source}, queued {job.queue_seconds:.2f}s")
         
     def listen(self) -> Optional[str]:
         """Listen for speech input and return transcribed text"""
+        if self.pipeline_running:
+            # The microphone is already being captured; take the next recognized line
+            try:
+                self.listened_turn, text = self.text_queue.get(timeout=PIPELINE_LISTEN_TIMEOUT)
+            except Empty:
+                return None
+            return text
+        
+        # Don't let the microphone pick up a prompt that is still being spoken
+        self.tts.wait_idle()
+        # Start a little in the past, so a player who starts talking just before
+        # the prompt appears isn't clipped, but not so far back as to hear the prompt
+        start = max(self.microphone.position - self.microphone.SAMPLE_RATE * PRE_ROLL_MS // 1000,
+                    self.microphone.position_at(self.spoken_until))
+        try:
+            print("🎤 Listening... (speak now)")
+            pcm = capture_utterance(self.microphone.chunks(start), self.vad, timeout=5, phrase_time_limit=10)
+        except Exception as e:
+            print(f"❌ Error during speech recognition: {e}")
+            return None
+        if pcm is None:
+            print("⏰ No speech detected within timeout")
+            return None
+        return self.recognize(self.audio_data(pcm))
+    
+    def audio_data(self, pcm: bytes) -> sr.AudioData:
+        return sr.AudioData(pcm, self.microphone.SAMPLE_RATE, self.microphone.SAMPLE_WIDTH)
+    
+    def recognize(self, audio) -> Optional[str]:
+        """Transcribe captured audio and return the lower-cased text"""
         try:
-            with self.microphone as source:
-                print("🎤 Listening... (speak now)")
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                
             print("🔄 Processing speech...")
-            text = self.recognizer.recognize_google(audio)
+            text = self.speech_recognizer.transcribe_audio(audio)
+            if not text:
+                print("❓ Could not understand speech")
+                return None
             print(f"👤 You said: {text}")
-            return text.lower()
+            return text
             
-        except sr.WaitTimeoutError:
-            print("⏰ No speech detected within timeout")
-            return None
-        except sr.UnknownValueError:
-            print("❓ Could not understand speech")
-            return None
-        except sr.RequestError as e:
+        except RecognitionError as e:
             print(f"❌ Speech recognition error: {e}")
             return None
         except Exception as e:
             print(f"❌ Error during speech recognition: {e}")
             return None
     
+    def post_generate(self, path: str, message: str, stream: bool = False) -> requests.Response:
+        """POST the player's line to the API, resyncing the session once if the server lost it"""
+        payload = {
+            "character_name": self.characters[self.current_character]["name"],
+            "character_type": self.characters[self.current_character]["type"],
+            "traits": self.characters[self.current_character]["traits"],
+            "player_input": message,
+            "model": self.current_model,
+            "session_id": self.session_id
+        }
+        if self.session_synced:
+            payload["resume"] = True
+        elif self.conversation_history:
+            payload["conversation_history"] = self.conversation_history
+        
+        response = self.http.post(f"{self.api_url}{path}", json=payload, timeout=30, stream=stream)
+        if response.status_code == 409:
+            # The server lost our session (expired or restarted): resend with our history
+            response.close()
+            payload["conversation_history"] = self.conversation_history
+            response = self.http.post(f"{self.api_url}{path}", json=payload, timeout=30, stream=stream)
+        if response.status_code == 200:
+            self.session_synced = True
+        return response
+    
     def get_ai_response(self, message: str) -> Optional[str]:
         """Get AI response from the Groq API"""
         try:
-            payload = {
-                "character_name": self.characters[self.current_character]["name"],
-                "character_type": self.characters[self.current_character]["type"],
-                "traits": self.characters[self.current_character]["traits"],
-                "player_input": message,
-                "conversation_history": self.conversation_history,
-                "model": self.current_model
-            }
-            
-            response = requests.post(f"{self.api_url}/generate", json=payload, timeout=30)
+            response = self.post_generate("/generate", message)
             
             if response.status_code == 200:
                 result = response.json()
@@ -168,14 +292,47 @@ class VoiceAssistant:
             print(f"❌ Error: {e}")
             return "Sorry, something went wrong."
     
+    def stream_ai_response(self, message: str) -> Iterator[str]:
+        """Yield the AI response sentence by sentence while it is still being generated.
+
+        Sets self.stream_failed when the sentences are an error apology rather
+        than the NPC's reply.
+        """
+        self.stream_failed = True
+        try:
+            response = self.post_generate("/generate/stream", message, stream=True)
+            if response.status_code != 200:
+                response.close()
+                print(f"❌ API Error: {response.status_code}")
+                yield "Sorry, I'm having trouble connecting to the AI."
+                return
+            
+            self.stream_failed = False
+            buffer = ""
+            with response:
+                for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                    sentences, buffer = split_sentences(buffer + chunk)
+                    yield from sentences
+            if buffer.strip():
+                yield buffer.strip()
+                
+        except requests.exceptions.Timeout:
+            print("⏰ Request timed out")
+            self.stream_failed = True
+            yield "Sorry, the AI is taking too long to respond."
+        except requests.exceptions.ConnectionError:
+            print("❌ Connection error")
+            self.stream_failed = True
+            yield "Sorry, I can't connect to the AI service."
+    
     def update_conversation_history(self, user_message: str, ai_response: str):
         """Update conversation history"""
-        self.conversation_history.append({"speaker": "Player", "text": user_message})
-        self.conversation_history.append({"speaker": self.characters[self.current_character]["name"], "text": ai_response})
+        self.conversation_history.append(history_turn("Player", user_message))
+        self.conversation_history.append(history_turn(self.characters[self.current_character]["name"], ai_response))
         
-        # Keep only last 10 exchanges
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
+        # Keep only the turns the server accepts for a resync
+        if len(self.conversation_history) > MAX_HISTORY_TURNS:
+            self.conversation_history = self.conversation_history[-MAX_HISTORY_TURNS:]
     
     def show_characters(self):
         """Display available characters"""
@@ -191,7 +348,7 @@ class VoiceAssistant:
             self.current_character = character_key
             char = self.characters[character_key]
             print(f"✅ Switched to {char['name']} ({char['type']})")
-            self.speak(f"Hello! I am {char['name']}, {char['type']}. How may I assist you?", character_key)
+            self.speak(self.greeting(character_key), character_key)
         else:
             print(f"❌ Character '{character_key}' not found")
     
@@ -220,6 +377,113 @@ class VoiceAssistant:
         else:
             print(f"❌ Model '{model}' not found")
     
+    def start_pipeline(self):
+        """Open the microphone in the background and start the worker threads"""
+        self.pipeline_running = True
+        self.capture_stop.clear()
+        self.workers = [
+            threading.Thread(target=worker, name=name, daemon=True)
+            for name, worker in (("capture", self.capture_worker),
+                                 ("recognition", self.recognition_worker),
+                                 ("generation", self.generation_worker))
+        ]
+        for worker in self.workers:
+            worker.start()
+    
+    def stop_pipeline(self):
+        """Stop capturing and stop the workers; the NPC finishes what it is saying"""
+        self.capture_stop.set()
+        for queue in (self.audio_queue, self.generation_queue):
+            queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=30)
+        self.workers = []
+        self.capture_stop.clear()
+        self.pipeline_running = False
+        # Remember the room's noise floor for the next run
+        self.vad.save_profile()
+    
+    def capture_worker(self):
+        """microphone -> audio_queue, one utterance at a time"""
+        try:
+            chunks = self.microphone.chunks(stop_event=self.capture_stop)
+            # One collector for the stream, so back-to-back utterances aren't clipped
+            collector = UtteranceCollector(self.vad, phrase_time_limit=10)
+            while not self.capture_stop.is_set():
+                pcm = collector.collect(chunks)
+                if pcm and not self.capture_stop.is_set():
+                    self.on_phrase_captured(self.audio_data(pcm))
+        except Exception as e:
+            print(f"❌ Microphone error: {e}")
+    
+    def on_phrase_captured(self, audio):
+        """Called on the capture thread as soon as the VAD has ended an utterance"""
+        self.audio_queue.put((time.perf_counter(), audio))
+    
+    def is_echo(self, text: str) -> bool:
+        """True if a line recognized during speech is mostly the NPC's own words"""
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        spoken = set(re.findall(r"[a-z0-9']+", self.current_utterance))
+        return bool(words) and sum(word in spoken for word in words) / len(words) >= ECHO_WORD_OVERLAP
+    
+    def interrupt(self):
+        """Barge-in: stop the current speech"""
+        print("✋ Interrupted")
+        self.drop_stale_speech()
+    
+    def drop_stale_speech(self):
+        """Cancel speech queued for turns older than the latest line"""
+        turn = self.turn
+        self.tts.cancel(lambda job: job.tag < turn)
+    
+    def recognition_worker(self):
+        """audio_queue -> text_queue"""
+        while True:
+            item = self.audio_queue.get()
+            if item is None:
+                break
+            captured_at, audio = item
+            text = self.recognize(audio)
+            if not text:
+                continue
+            speaking = self.speaking.is_set()
+            if (speaking or captured_at - self.spoken_until < ECHO_WINDOW_SECONDS) and self.is_echo(text):
+                continue
+            self.turn += 1
+            self.heard_at = {self.turn: captured_at}
+            if speaking:
+                self.interrupt()
+            else:
+                self.drop_stale_speech()
+            self.text_queue.put((self.turn, text))
+    
+    def generation_worker(self):
+        """generation_queue -> TTS worker"""
+        while True:
+            item = self.generation_queue.get()
+            if item is None:
+                break
+            turn, user_input = item
+            if turn < self.turn:
+                self.heard_at.pop(turn, None)
+                continue  # The player has already said something newer
+            print("🤔 Thinking...")
+            # Speak each sentence as soon as it has streamed in
+            character = self.current_character
+            sentences = []
+            for sentence in self.stream_ai_response(user_input):
+                if turn < self.turn:
+                    break  # Interrupted; closing the stream stops generation
+                sentences.append(sentence)
+                # Replies are one-off; only the canned error apologies are worth caching
+                self.speak(sentence, character, cache=self.stream_failed, priority=NPC_PRIORITY, turn=turn)
+            
+            if sentences and not self.stream_failed:
+                # Update conversation history
+                self.update_conversation_history(user_input, " ".join(sentences))
+            elif not sentences and turn == self.turn:
+                self.speak("I'm sorry, I didn't get a response. Please try again.", turn=turn)
+    
     def voice_conversation(self):
         """Main voice conversation loop"""
         print("\n🎤 Starting Voice Conversation Mode")
@@ -229,48 +493,42 @@ class VoiceAssistant:
         print("- Say 'change character' to switch characters")
         print("- Say 'change model' to switch AI models")
         print("- Say 'status' to check API status")
+        print("- Speak while the NPC is talking to interrupt it")
         print("=" * 50)
         
-        # Initial greeting
-        char = self.characters[self.current_character]
-        self.speak(f"Hello! I am {char['name']}, {char['type']}. How may I assist you?", self.current_character)
-        
-        while True:
-            # Listen for user input
-            user_input = self.listen()
-            
-            if not user_input:
-                continue
-            
-            # Check for commands
-            if user_input in ["quit", "exit", "stop", "bye"]:
-                self.speak("Goodbye! It was nice talking with you.", self.current_character)
-                break
-            elif "change character" in user_input:
-                self.handle_character_change()
-                continue
-            elif "change model" in user_input:
-                self.handle_model_change()
-                continue
-            elif "status" in user_input:
-                self.check_api_status()
-                continue
-            elif "help" in user_input:
-                self.show_help()
-                continue
-            
-            # Get AI response
-            print("🤔 Thinking...")
-            ai_response = self.get_ai_response(user_input)
+        self.start_pipeline()
+        try:
+            # Initial greeting
+            self.speak(self.greeting(self.current_character), self.current_character)
             
-            if ai_response:
-                # Update conversation history
-                self.update_conversation_history(user_input, ai_response)
+            while True:
+                # Next recognized line; capture and recognition run in the background
+                user_input = self.listen()
                 
-                # Speak the response
-                self.speak(ai_response, self.current_character)
-            else:
-                self.speak("I'm sorry, I didn't get a response. Please try again.")
+                if not user_input:
+                    continue
+                
+                # Check for commands
+                if user_input in ["quit", "exit", "stop", "bye"]:
+                    self.speak("Goodbye! It was nice talking with you.", self.current_character)
+                    break
+                elif "change character" in user_input:
+                    self.handle_character_change()
+                    continue
+                elif "change model" in user_input:
+                    self.handle_model_change()
+                    continue
+                elif "status" in user_input:
+                    self.check_api_status()
+                    continue
+                elif "help" in user_input:
+                    self.show_help()
+                    continue
+                
+                # Generate the reply on the generation worker while we keep listening
+                self.generation_queue.put((self.listened_turn, user_input))
+        finally:
+            self.stop_pipeline()
     
     def handle_character_change(self):
         """Handle character change via voice"""
@@ -416,6 +674,9 @@ class VoiceAssistant:
         
         # Start interactive menu
         self.interactive_menu()
+        # Let the last line finish before exiting
+        self.tts.close()
+        self.microphone.stop()
 
 if __name__ == "__main__":
     assistant = VoiceAssistant()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Voice gateway: many players talking to NPCs at once over WebSockets.
+
+voice_assistant.py serves one player at one desk, with its own microphone,
+speakers and threads. The gateway serves remote clients instead. A client
+opens /ws/voice?character=drogun&sample_rate=16000 and streams 16-bit mono
+PCM as binary frames. For each utterance it gets back:
+
+    {"type": "transcript", "text": ...}      what the player said
+    {"type": "reply", "text": ...}           one sentence of the NPC's reply,
+    binary frames                            then that sentence as WAV audio
+    {"type": "audio_end"}                    (header sizes unset: it is streamed)
+    {"type": "turn_end", "timings": {...}}   seconds spent per stage
+
+Endpointing runs per connection with vad.py. Recognition is CPU-bound, so it
+runs on one shared pool of GATEWAY_RECOGNITION_WORKERS threads with one
+shared recognizer (SPEECH_RECOGNIZER). Generation is an async call to
+main_groq.py's /generate/stream at NPC_BACKEND_URL, with a server-side
+session per connection. Each sentence is spoken by an espeak-ng subprocess as
+soon as it is complete; without espeak-ng only the text is sent. A new
+utterance while the NPC is still answering cancels that answer (barge-in), so
+clients should cancel echo or use headphones.
+
+Limits, so that neither one client nor a crowd can take the machine down:
+- GATEWAY_MAX_SESSIONS connections; the next one is closed with 1013 (try
+  again later)
+- GATEWAY_MAX_FRAME_BYTES per audio frame (else close 1009) and
+  GATEWAY_MAX_UTTERANCE_SECONDS per utterance (longer speech is cut there)
+- GATEWAY_MAX_PENDING_RECOGNITIONS utterances waiting for the pool in total;
+  beyond that an utterance is dropped and its client gets {"type": "busy"}
+- GATEWAY_SYNTHESIS_PROCESSES espeak-ng processes at a time
+- Backpressure: incoming audio waits in a small queue per connection. When
+  it is full the gateway stops reading that socket and TCP slows the client
+  down. Outgoing frames go through a bounded queue too, so a slow client
+  only stalls its own synthesis.
+- GATEWAY_IDLE_TIMEOUT: connections that send nothing for this long are closed
+
+Run with:
+    uvicorn voice_gateway:app --host 0.0.0.0 --port 8003
+"""
+
+import asyncio
+import codecs
+import contextlib
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from character_registry import NPC_CHARACTERS, espeak_voice
+from conversation import MAX_HISTORY_TURNS, history_turn, split_sentences
+from generation_backends import BACKEND_URL
+from recognizers import RecognitionError, create_recognizer
+from tts_cache import ESPEAK_BINARY, STREAM_CHUNK_BYTES, espeak_command
+from vad import UtteranceCollector, VoiceActivityDetector
+
+RECOGNITION_WORKERS = int(os.getenv("GATEWAY_RECOGNITION_WORKERS", str(os.cpu_count() or 2)))
+SYNTHESIS_PROCESSES = int(os.getenv("GATEWAY_SYNTHESIS_PROCESSES", str(2 * (os.cpu_count() or 2))))
+MAX_SESSIONS = int(os.getenv("GATEWAY_MAX_SESSIONS", "64"))
+MAX_PENDING_RECOGNITIONS = int(os.getenv("GATEWAY_MAX_PENDING_RECOGNITIONS", str(4 * RECOGNITION_WORKERS)))
+MAX_UTTERANCE_SECONDS = float(os.getenv("GATEWAY_MAX_UTTERANCE_SECONDS", "10"))
+MAX_FRAME_BYTES = int(os.getenv("GATEWAY_MAX_FRAME_BYTES", "65536"))
+IDLE_TIMEOUT = float(os.getenv("GATEWAY_IDLE_TIMEOUT", "60"))
+# Frames buffered per connection in each direction
+INBOUND_QUEUE_FRAMES = 16
+OUTBOUND_QUEUE_FRAMES = 64
+SAMPLE_RATES = range(8000, 48001)
+# WebSocket close codes
+CLOSE_IDLE = 1000
+CLOSE_BAD_REQUEST = 1008
+CLOSE_FRAME_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+app = FastAPI(title="NPC Voice Gateway", version="1.0.0")
+
+recognizer = None
+recognition_pool = None
+synthesis_slots = None
+http_session = None
+active_sessions = 0
+pending_recognitions = 0
+
+@app.on_event("startup")
+async def start_workers():
+    global recognizer, recognition_pool, synthesis_slots, http_session
+    recognizer = create_recognizer()
+    recognition_pool = ThreadPoolExecutor(max_workers=RECOGNITION_WORKERS, thread_name_prefix="recognition")
+    synthesis_slots = asyncio.Semaphore(SYNTHESIS_PROCESSES)
+    http_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=MAX_SESSIONS, keepalive_timeout=30))
+    if not ESPEAK_BINARY:
+        print("⚠️  espeak-ng not found: replies will be sent as text only")
+
+@app.on_event("shutdown")
+async def stop_workers():
+    if http_session:
+        await http_session.close()
+    if recognition_pool:
+        recognition_pool.shutdown(wait=False, cancel_futures=True)
+
+async def recognize(pcm: bytes, sample_rate: int) -> Optional[str]:
+    """Transcribe on the shared pool; None if too many utterances are already waiting"""
+    global pending_recognitions
+    if pending_recognitions >= MAX_PENDING_RECOGNITIONS:
+        return None
+    loop = asyncio.get_running_loop()
+    job = recognition_pool.submit(recognizer.transcribe, pcm, sample_rate)
+    pending_recognitions += 1
+
+    def finished(_):
+        # A job counts until the pool is done with it, even if its caller was cancelled
+        with contextlib.suppress(RuntimeError):  # the loop is already closed at shutdown
+            loop.call_soon_threadsafe(release_recognition)
+
+    job.add_done_callback(finished)
+    # Cancelling the caller (barge-in) also drops the job if it hasn't started
+    return await asyncio.wrap_future(job)
+
+def release_recognition():
+    global pending_recognitions
+    pending_recognitions -= 1
+
+async def synthesize(text: str, voice: Dict) -> AsyncIterator[bytes]:
+    """WAV audio from espeak-ng, yielded as it is synthesized"""
+    async with synthesis_slots:
+        process = await asyncio.create_subprocess_exec(*espeak_command(voice), stdin=asyncio.subprocess.PIPE,
+                                                       stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+        try:
+            process.stdin.write(text.encode("utf-8"))
+            process.stdin.close()
+            while True:
+                chunk = await process.stdout.read(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+            if await process.wait() != 0:
+                raise RuntimeError(f"espeak-ng exited with status {process.returncode}")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+class VoiceSession:
+    """One client connection: its VAD, conversation and reply in progress"""
+
+    def __init__(self, websocket: WebSocket, character_id: str, model: str, sample_rate: int):
+        self.websocket = websocket
+        self.character_id = character_id
+        self.character = NPC_CHARACTERS[character_id]
+        self.voice = espeak_voice(character_id)
+        self.model = model
+        self.sample_rate = sample_rate
+        self.collector = UtteranceCollector(VoiceActivityDetector(sample_rate, profile_path=None),
+                                            MAX_UTTERANCE_SECONDS)
+        self.audio = asyncio.Queue(INBOUND_QUEUE_FRAMES)
+        self.outbox = asyncio.Queue(OUTBOUND_QUEUE_FRAMES)
+        self.session_id = uuid.uuid4().hex
+        self.session_synced = False
+        self.history: List[Dict] = []
+        # Replies to older turns still in the outbox are dropped on barge-in
+        self.turn = 0
+        self.reply_task = None
+
+    async def run(self):
+        """Serve the connection until the client leaves, idles, or breaks a limit"""
+        tasks = [asyncio.create_task(self.segment()), asyncio.create_task(self.send())]
+        try:
+            await self.receive()
+        finally:
+            if self.reply_task:
+                tasks.append(self.reply_task)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def receive(self):
+        while True:
+            try:
+                message = await asyncio.wait_for(self.websocket.receive(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await self.websocket.close(CLOSE_IDLE, "idle")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+            audio = message.get("bytes")
+            if audio is None:
+                continue  # No text messages yet; ignore rather than break newer clients
+            if len(audio) > MAX_FRAME_BYTES:
+                await self.websocket.close(CLOSE_FRAME_TOO_BIG, f"audio frames are limited to {MAX_FRAME_BYTES} bytes")
+                return
+            # Blocks while this connection's VAD is behind: backpressure on the socket
+            await self.audio.put(audio)
+
+    async def segment(self):
+        while True:
+            audio = await self.audio.get()
+            for utterance in self.collector.feed(audio):
+                self.turn += 1
+                if self.reply_task and not self.reply_task.done():
+                    # Barge-in: the player spoke again, so the old answer is moot
+                    self.reply_task.cancel()
+                    await self.outbox.put((self.turn, {"type": "interrupted"}))
+                self.reply_task = asyncio.create_task(self.reply(self.turn, utterance, time.perf_counter()))
+
+    async def send(self):
+        while True:
+            turn, message = await self.outbox.get()
+            if turn < self.turn:
+                continue
+            if isinstance(message, bytes):
+                await self.websocket.send_bytes(message)
+            else:
+                await self.websocket.send_json(message)
+
+    async def reply(self, turn: int, utterance: bytes, ended_at: float):
+        """Recognize one utterance, then stream the NPC's answer back sentence by sentence"""
+        async def put(message):
+            await self.outbox.put((turn, message))
+
+        timings = {}
+        try:
+            text = await recognize(utterance, self.sample_rate)
+        except RecognitionError as e:
+            await put({"type": "error", "message": f"Speech recognition failed: {e}"})
+            return
+        timings["recognition"] = time.perf_counter() - ended_at
+        if text is None:
+            await put({"type": "busy", "message": "Too many players talking at once; please repeat that."})
+            return
+        await put({"type": "transcript", "text": text})
+        if not text:
+            await put({"type": "turn_end", "timings": timings})
+            return
+
+        sentences = asyncio.Queue()
+        speaker = asyncio.create_task(self.speak(sentences, put, timings, ended_at))
+        try:
+            reply = await self.generate(text, sentences, timings, ended_at)
+            await sentences.put(None)
+            await speaker
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Generation failed: {e}")
+            await put({"type": "error", "message": "Cannot connect to AI service"})
+            return
+        finally:
+            speaker.cancel()
+        self.remember(text, reply)
+        await put({"type": "turn_end", "timings": timings})
+
+    async def post_generate(self, text: str) -> aiohttp.ClientResponse:
+        """POST to /generate/stream, resyncing the session once if the server lost it"""
+        payload = {
+            "character_name": self.character["name"],
+            "character_type": self.character["type"],
+            "traits": self.character["traits"],
+            "player_input": text,
+            "model": self.model,
+            "session_id": self.session_id
+        }
+        if self.session_synced:
+            payload["resume"] = True
+        elif self.history:
+            payload["conversation_history"] = self.history
+        response = await http_session.post(f"{BACKEND_URL}/generate/stream", json=payload, timeout=30)
+        if response.status == 409:
+            response.release()
+            payload["conversation_history"] = self.history
+            response = await http_session.post(f"{BACKEND_URL}/generate/stream", json=payload, timeout=30)
+        if response.status != 200:
+            response.release()
+        response.raise_for_status()
+        self.session_synced = True
+        return response
+
+    async def generate(self, text: str, sentences: asyncio.Queue, timings: Dict, ended_at: float) -> str:
+        """Stream the reply, handing each complete sentence to the speaker; returns the whole reply"""
+        response = await self.post_generate(text)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parts, buffer = [], ""
+        try:
+            async for chunk in response.content.iter_any():
+                delta = decoder.decode(chunk)
+                parts.append(delta)
+                complete, buffer = split_sentences(buffer + delta)
+                for sentence in complete:
+                    timings.setdefault("first_sentence", time.perf_counter() - ended_at)
+                    await sentences.put(sentence)
+        finally:
+            response.release()
+        if buffer.strip():
+            timings.setdefault("first_sentence", time.perf_counter() - ended_at)
+            await sentences.put(buffer.strip())
+        return "".join(parts).strip()
+
+    async def speak(self, sentences: asyncio.Queue, put, timings: Dict, ended_at: float):
+        """Send each sentence as text, then as audio, in order"""
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            await put({"type": "reply", "text": sentence})
+            if not ESPEAK_BINARY:
+                continue
+            chunks = synthesize(sentence, self.voice)
+            try:
+                async for chunk in chunks:
+                    timings.setdefault("first_audio", time.perf_counter() - ended_at)
+                    await put(chunk)
+            except (OSError, RuntimeError) as e:
+                print(f"❌ Speech synthesis failed: {e}")
+            finally:
+                # Stops espeak-ng at once if we were cancelled mid-sentence
+                await chunks.aclose()
+            await put({"type": "audio_end"})
+
+    def remember(self, text: str, reply: str):
+        """Keep our own copy of the conversation, to resync a session the server lost"""
+        self.history.append(history_turn("Player", text))
+        self.history.append(history_turn(self.character["name"], reply))
+        del self.history[:-MAX_HISTORY_TURNS]
+
+@app.websocket("/ws/voice")
+async def voice(websocket: WebSocket, character: str = "drogun", model: str = "llama3-8b-8192",
+                sample_rate: int = 16000):
+    global active_sessions
+    await websocket.accept()
+    if character not in NPC_CHARACTERS:
+        await websocket.close(CLOSE_BAD_REQUEST, f"Unknown character '{character}'")
+        return
+    if sample_rate not in SAMPLE_RATES:
+        await websocket.close(CLOSE_BAD_REQUEST, "sample_rate must be between 8000 and 48000")
+        return
+    if active_sessions >= MAX_SESSIONS:
+        await websocket.close(CLOSE_TRY_AGAIN_LATER, "Voice gateway is full")
+        return
+    active_sessions += 1
+    try:
+        await VoiceSession(websocket, character, model, sample_rate).run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_sessions -= 1
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "healthy",
+        "sessions": active_sessions,
+        "max_sessions": MAX_SESSIONS,
+        "recognition_workers": RECOGNITION_WORKERS,
+        "pending_recognitions": pending_recognitions,
+        "speech": bool(ESPEAK_BINARY)
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("GATEWAY_PORT", "8003")))
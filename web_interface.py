@@ -3,200 +3,43 @@
 Web Interface for AI NPC Dialogue Generator
 Simple Flask-based chatbot with character and model selection + Voice Assistant
 """
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context, url_for
 from flask_cors import CORS
-import requests
 import json
 import os
+import threading
+
+from character_registry import MODELS, NPC_CHARACTERS, espeak_voice, voice_settings
+from generation_backends import BackendError, create_backend
+from http_cache import CachedResponse, STATIC_CACHE_CONTROL, cached_template, flask_response
+from tts_cache import TTS_CACHE_DIR, TTSCache, stream_espeak
 
 app = Flask(__name__)
 CORS(app)
 
-# Character definitions with enhanced voice settings
-CHARACTERS = {
-    "drogun": {
-        "name": "Drogun",
-        "type": "Gruff Blacksmith",
-        "traits": "Gruff, impatient, values hard work, speaks in short sentences",
-        "emoji": "⚒️",
-        "voice_rate": 120,
-        "voice_pitch": 0.8,
-        "voice_volume": 0.95,
-        "voice_style": "deep_grumpy",
-        "voice_accent": "northern",
-        "speech_pattern": "short_blunt",
-        "voice_engine": "male_deep",
-        "voice_id": "com.apple.speech.synthesis.voice.daniel",
-        "voice_provider": "system"
-    },
-    "lira": {
-        "name": "Lira",
-        "type": "Enthusiastic Potion Seller",
-        "traits": "Cheerful, talkative, always tries to upsell, uses lots of exclamations",
-        "emoji": "🧪",
-        "voice_rate": 200,
-        "voice_pitch": 1.6,
-        "voice_volume": 0.95,
-        "voice_style": "bubbly_excited",
-        "voice_accent": "southern",
-        "speech_pattern": "fast_energetic",
-        "voice_engine": "female_cheerful",
-        "voice_id": "com.apple.speech.synthesis.voice.samantha",
-        "voice_provider": "system"
-    },
-    "eldrin": {
-        "name": "Eldrin",
-        "type": "Mysterious Forest Hermit",
-        "traits": "Cryptic, wise, speaks in riddles, calm demeanor",
-        "emoji": "🌲",
-        "voice_rate": 90,
-        "voice_pitch": 0.9,
-        "voice_volume": 0.8,
-        "voice_style": "mysterious_whisper",
-        "voice_accent": "ancient",
-        "speech_pattern": "slow_mystical",
-        "voice_engine": "male_wise",
-        "voice_id": "com.apple.speech.synthesis.voice.fred",
-        "voice_provider": "system"
-    },
-    "garrick": {
-        "name": "Garrick",
-        "type": "Cynical City Guard",
-        "traits": "Suspicious, direct, doesn't trust easily, speaks with authority",
-        "emoji": "🛡️",
-        "voice_rate": 140,
-        "voice_pitch": 0.7,
-        "voice_volume": 0.95,
-        "voice_style": "authoritative_stern",
-        "voice_accent": "military",
-        "speech_pattern": "commanding_direct",
-        "voice_engine": "male_authoritative",
-        "voice_id": "com.apple.speech.synthesis.voice.albert",
-        "voice_provider": "system"
-    },
-    "elara": {
-        "name": "Elara",
-        "type": "Cheerful Shopkeeper",
-        "traits": "Friendly, helpful, loves to chat, always positive",
-        "emoji": "🏪",
-        "voice_rate": 180,
-        "voice_pitch": 1.4,
-        "voice_volume": 0.9,
-        "voice_style": "friendly_warm",
-        "voice_accent": "merchant",
-        "speech_pattern": "welcoming_helpful",
-        "voice_engine": "female_warm",
-        "voice_id": "com.apple.speech.synthesis.voice.karen",
-        "voice_provider": "system"
-    },
-    "thorin": {
-        "name": "Thorin",
-        "type": "Ancient Wizard",
-        "traits": "Wise, speaks in ancient tongues, mysterious, powerful",
-        "emoji": "🔮",
-        "voice_rate": 80,
-        "voice_pitch": 0.6,
-        "voice_volume": 0.7,
-        "voice_style": "ancient_mystical",
-        "voice_accent": "arcane",
-        "speech_pattern": "ancient_wise",
-        "voice_engine": "male_ancient",
-        "voice_id": "com.apple.speech.synthesis.voice.ralph",
-        "voice_provider": "system"
-    },
-    "zara": {
-        "name": "Zara",
-        "type": "Fierce Warrior",
-        "traits": "Bold, confident, speaks with passion, battle-hardened",
-        "emoji": "⚔️",
-        "voice_rate": 170,
-        "voice_pitch": 1.3,
-        "voice_volume": 0.95,
-        "voice_style": "fierce_passionate",
-        "voice_accent": "warrior",
-        "speech_pattern": "bold_confident",
-        "voice_engine": "female_strong",
-        "voice_id": "com.apple.speech.synthesis.voice.tessa",
-        "voice_provider": "system"
-    },
-    "merlin": {
-        "name": "Merlin",
-        "type": "Mischievous Trickster",
-        "traits": "Playful, witty, loves jokes, unpredictable",
-        "emoji": "🎭",
-        "voice_rate": 190,
-        "voice_pitch": 1.7,
-        "voice_volume": 0.9,
-        "voice_style": "playful_mischievous",
-        "voice_accent": "trickster",
-        "speech_pattern": "quick_witty",
-        "voice_engine": "male_playful",
-        "voice_id": "com.apple.speech.synthesis.voice.jester",
-        "voice_provider": "system"
-    },
-    "seraphina": {
-        "name": "Seraphina",
-        "type": "Elegant Noble",
-        "traits": "Refined, sophisticated, speaks with grace, aristocratic",
-        "emoji": "👑",
-        "voice_rate": 130,
-        "voice_pitch": 1.2,
-        "voice_volume": 0.85,
-        "voice_style": "elegant_refined",
-        "voice_accent": "noble",
-        "speech_pattern": "graceful_formal",
-        "voice_engine": "female_elegant",
-        "voice_id": "com.apple.speech.synthesis.voice.moira",
-        "voice_provider": "system"
-    },
-    "grommash": {
-        "name": "Grommash",
-        "type": "Barbarian Chief",
-        "traits": "Fierce, loud, speaks with power, tribal leader",
-        "emoji": "🪓",
-        "voice_rate": 110,
-        "voice_pitch": 0.5,
-        "voice_volume": 1.0,
-        "voice_style": "barbaric_powerful",
-        "voice_accent": "tribal",
-        "speech_pattern": "loud_authoritative",
-        "voice_engine": "male_powerful",
-        "voice_id": "com.apple.speech.synthesis.voice.grandpa",
-        "voice_provider": "system"
-    }
-}
+# Generation backend: remote main_groq.py server or in-process (NPC_BACKEND_MODE)
+backend = create_backend()
 
-# AI Models
-MODELS = {
-    "llama3-8b-8192": {
-        "name": "llama3-8b-8192",
-        "description": "Fast, good for dialogue",
-        "speed": "Very Fast",
-        "quality": "Good"
-    },
-    "llama3-70b-8192": {
-        "name": "llama3-70b-8192",
-        "description": "More powerful, better responses",
-        "speed": "Fast",
-        "quality": "Excellent"
-    },
-    "llama3-8b-8192": {
-        "name": "llama3-8b-8192",
-        "description": "Balanced performance (Mixtral alternative)",
-        "speed": "Fast",
-        "quality": "Very Good"
-    },
-    "gemma2-9b-it": {
-        "name": "gemma2-9b-it",
-        "description": "Efficient and reliable",
-        "speed": "Very Fast",
-        "quality": "Good"
-    }
+# Shared character and model data, serialized once for the read-only endpoints.
+# It only changes between deploys, so browsers and CDNs may cache it.
+CHARACTERS = NPC_CHARACTERS
+CHARACTERS_RESPONSE = CachedResponse.from_json(CHARACTERS, cache_control=STATIC_CACHE_CONTROL)
+MODELS_RESPONSE = CachedResponse.from_json(MODELS, cache_control=STATIC_CACHE_CONTROL)
+VOICE_SETTINGS_RESPONSES = {
+    character_id: CachedResponse.from_json(voice_settings(character_id), cache_control=STATIC_CACHE_CONTROL)
+    for character_id in CHARACTERS
 }
 
+# Server-side speech: rendered with espeak-ng, cached on disk by (voice, text)
+TTS_MAX_CHARACTERS = 1000
+tts_cache = TTSCache(os.getenv("TTS_WEB_CACHE_DIR", os.path.join(TTS_CACHE_DIR, "web")))
+# espeak-ng processes at a time; cache misses beyond that get a 503
+TTS_SYNTHESIS_PROCESSES = int(os.getenv("TTS_WEB_SYNTHESIS_PROCESSES", str(2 * (os.cpu_count() or 2))))
+synthesis_slots = threading.BoundedSemaphore(TTS_SYNTHESIS_PROCESSES)
+
 @app.route('/')
 def index():
-    return render_template('index.html', characters=CHARACTERS, models=MODELS)
+    return flask_response(cached_template('index.html', characters=CHARACTERS, models=MODELS))
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -205,6 +48,7 @@ def chat():
         message = data.get('message', '')
         character = data.get('character', 'drogun')
         model = data.get('model', 'llama3-8b-8192')
+        user_id = data.get('user_id')
         
         if not message:
             return jsonify({'error': 'No message provided'}), 400
@@ -219,64 +63,92 @@ def chat():
         }
         
         # Call Groq API
-        response = requests.post('http://127.0.0.1:8002/generate', json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return jsonify({
-                'reply': result.get('reply', 'I didn\'t understand that.'),
-                'character': CHARACTERS[character]["name"],
-                'voice_settings': {
-                    'rate': CHARACTERS[character]["voice_rate"],
-                    'pitch': CHARACTERS[character]["voice_pitch"],
-                    'volume': CHARACTERS[character]["voice_volume"],
-                    'style': CHARACTERS[character]["voice_style"]
-                }
-            })
-        else:
-            return jsonify({'error': f'API Error: {response.status_code}'}), 500
+        # user_id pins the player to one upstream so its caches stay warm
+        result = backend.generate(payload, affinity_key=user_id)
+        return jsonify({
+            'reply': result.get('reply', 'I didn\'t understand that.'),
+            'character': CHARACTERS[character]["name"],
+            'audio_url': url_for('tts', character=character, text=result.get('reply', '')),
+            'voice_settings': {
+                'rate': CHARACTERS[character]["voice_rate"],
+                'pitch': CHARACTERS[character]["voice_pitch"],
+                'volume': CHARACTERS[character]["voice_volume"],
+                'style': CHARACTERS[character]["voice_style"]
+            }
+        })
             
-    except requests.exceptions.Timeout:
-        return jsonify({'error': 'Request timed out'}), 408
-    except requests.exceptions.ConnectionError:
-        return jsonify({'error': 'Cannot connect to AI service'}), 503
+    except BackendError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
+@app.route('/health')
+def health():
+    """Liveness check for the process supervisor; backend reachability is /api/status"""
+    return jsonify({'status': 'healthy', 'mode': backend.mode})
+
 @app.route('/api/status')
 def status():
-    try:
-        response = requests.get('http://127.0.0.1:8002/health', timeout=5)
-        if response.status_code == 200:
-            return jsonify({'status': 'online'})
-        else:
-            return jsonify({'status': 'offline'})
-    except:
-        return jsonify({'status': 'offline'})
+    return jsonify({'status': 'online' if backend.is_healthy() else 'offline', 'mode': backend.mode})
+
+@app.route('/api/tts', methods=['GET', 'POST'])
+def tts():
+    """Speak text in a character's voice as WAV; repeated lines are served from the disk cache"""
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    character = data.get('character', 'drogun')
+    text = (data.get('text') or '').strip()
+    if character not in CHARACTERS:
+        return jsonify({'error': 'Character not found'}), 404
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+    if len(text) > TTS_MAX_CHARACTERS:
+        return jsonify({'error': f'Text is limited to {TTS_MAX_CHARACTERS} characters'}), 400
+    
+    voice = espeak_voice(character)
+    path = tts_cache.get(text, voice)
+    if path:
+        response = send_file(path, mimetype='audio/wav', conditional=True)
+        response.headers['X-TTS-Cache'] = 'hit'
+    else:
+        if not synthesis_slots.acquire(blocking=False):
+            return jsonify({'error': 'Speech synthesis is busy, try again shortly'}), 503
+        try:
+            audio = stream_espeak(text, voice)
+            # Start synthesis now, so a missing or failing engine is still a clean error
+            first_chunk = next(audio)
+        except (RuntimeError, OSError, StopIteration) as e:
+            synthesis_slots.release()
+            return jsonify({'error': f'Speech synthesis failed: {e}'}), 503
+        stream = tts_cache.stream_render(text, voice, _prepend(first_chunk, audio))
+        # Sent chunked as espeak-ng produces it; playback starts before synthesis ends
+        response = Response(stream_with_context(stream), mimetype='audio/wav')
+        # The WSGI server closes the response once sent or abandoned, ending espeak-ng
+        response.call_on_close(synthesis_slots.release)
+        response.headers['X-TTS-Cache'] = 'miss'
+    response.headers['Cache-Control'] = STATIC_CACHE_CONTROL
+    return response
+
+def _prepend(first_chunk, chunks):
+    yield first_chunk
+    yield from chunks
 
 @app.route('/api/voice-settings/<character>')
-def voice_settings(character):
+def get_voice_settings(character):
     """Get voice settings for a character"""
-    if character in CHARACTERS:
-        return jsonify({
-            'rate': CHARACTERS[character]["voice_rate"],
-            'pitch': CHARACTERS[character]["voice_pitch"],
-            'volume': CHARACTERS[character]["voice_volume"],
-            'style': CHARACTERS[character]["voice_style"],
-            'name': CHARACTERS[character]["name"]
-        })
+    if character in VOICE_SETTINGS_RESPONSES:
+        return flask_response(VOICE_SETTINGS_RESPONSES[character])
     else:
         return jsonify({'error': 'Character not found'}), 404
 
 @app.route('/api/characters')
 def get_characters():
     """Get all available characters"""
-    return jsonify(CHARACTERS)
+    return flask_response(CHARACTERS_RESPONSE)
 
 @app.route('/api/models')
 def get_models():
     """Get all available models"""
-    return jsonify(MODELS)
+    return flask_response(MODELS_RESPONSE)
 
 @app.route('/api/voices')
 def get_voices():